@@ -7,16 +7,23 @@ import streamlit as st
 import pandas as pd
 from datetime import date   
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from sklearn.metrics import precision_recall_curve, auc
 import joblib
 import random
 from src.pipeline_components import DropCols, EnsureCategorical, EnsureNumeric, XGBWithAutoSPW, LogTransform
-from src import train_score_pipeline, apply_pipeline_to_new_data, proba_to_score, rating, decision_by_score, build_scoring_df, prepare_X_for_model, build_history_features
+from src.dashboard_api import apply_pipeline_to_new_data, rating, decision_by_score, build_scoring_df, prepare_X_for_model, build_history_features, ScoreCache, ModelRegistry, ScoreHistogram, DEFAULT_SCORE_CUTS, read_results, DASHBOARD_COLUMNS, what_if_grid, CohortIndex, load_cohorts
 import time
 
-score_df = pd.read_parquet("data/credit/score_df.parquet")
+
+def _plotly():
+    # plotly só é importado nas páginas com gráfico
+    import plotly.express as px
+    import plotly.graph_objects as go
+    return px, go
+
+# dataset particionado (src/results_store.py) se existir; senão o parquet único.
+# Nos dois casos só as colunas dos gráficos saem do disco.
+SCORE_RESULTS = "data/results/score_df" if os.path.isdir("data/results/score_df") else "data/credit/score_df.parquet"
+score_df = read_results(SCORE_RESULTS, columns=DASHBOARD_COLUMNS)
 
 @st.cache_resource
 def load_artifacts():
@@ -25,7 +32,85 @@ def load_artifacts():
     return pipeline, score_params
 
 
-pipeline, score_params = load_artifacts()
+@st.cache_resource
+def get_registry():
+    registry = ModelRegistry("models/registry")
+    if registry.active_pointer() is not None:
+        registry.refresh(background=False)
+    return registry
+
+
+# Registry (models/registry/ACTIVE) tem prioridade; sem ele, usa os arquivos fixos.
+# refresh() troca a versão em background quando ACTIVE muda, sem reiniciar o app.
+registry = get_registry()
+registry.refresh()
+# O bundle é lido UMA vez: uma troca em background entre duas leituras de
+# registry.active misturaria versão, pipeline e cortes de modelos diferentes.
+bundle = registry.active
+if bundle is not None:
+    model_version = bundle.version
+    pipeline, score_params = bundle.pipeline, bundle.score_params
+    score_cuts = bundle.score_cuts or DEFAULT_SCORE_CUTS
+else:
+    model_version = "v3.1"
+    pipeline, score_params = load_artifacts()
+    score_cuts = DEFAULT_SCORE_CUTS
+# uma fonte só de cortes: card, apply e what-if decidem com os mesmos valores
+score_params = {**score_params, "score_cuts": score_cuts}
+
+@st.cache_resource
+def get_score_cache():
+    # compartilhado entre sessões: simulações repetidas não re-executam o modelo
+    return ScoreCache(maxsize=10_000, ttl=3600)
+
+score_cache = get_score_cache()
+
+COHORT_INDEX_PATH = "models/cohort_index.joblib"
+COHORT_K = 100
+
+def results_mtime(path=SCORE_RESULTS) -> float:
+    # parquet único ou dataset particionado: o arquivo mais novo
+    if not os.path.isdir(path):
+        return os.path.getmtime(path)
+    return max((os.path.getmtime(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files),
+               default=os.path.getmtime(path))
+
+@st.cache_resource
+def get_cohort_index(model_version, results_mtime):
+    # kNN dos clientes escorados, salvo em models/ com a origem (modelo +
+    # score_df); o artefato só é reaproveitado se os dois forem os mesmos
+    fingerprint = {"model_version": model_version, "results_mtime": results_mtime}
+    if os.path.exists(COHORT_INDEX_PATH):
+        index = CohortIndex.load(COHORT_INDEX_PATH)
+        if index.fingerprint == fingerprint:
+            return index
+    index = CohortIndex.build(read_results(SCORE_RESULTS), fingerprint=fingerprint)
+    index.save(COHORT_INDEX_PATH)
+    return index
+
+# Curvas de safra do credit_record (src/vintage_analytics.py): o VintageEngine
+# grava data/vintage/ a cada mês; o app só lê o cohorts.json (poucos KB).
+VINTAGE_STATE_DIR = "data/vintage"
+VINTAGE_GROUP_MONTHS = 6
+VINTAGE_MAX_MOB = 36
+
+@st.cache_resource
+def _load_vintage_cohorts(mtime):
+    # mtime na chave do cache: o VintageEngine regrava o cohorts.json todo
+    # mês e o app passa a ler o novo sem reiniciar
+    return load_cohorts(VINTAGE_STATE_DIR)
+
+def get_vintage_cohorts():
+    path = os.path.join(VINTAGE_STATE_DIR, "cohorts.json")
+    if os.path.exists(path):
+        return _load_vintage_cohorts(os.path.getmtime(path))
+    return None
+
+@st.cache_data
+def agregados_vintage():
+    # score médio e default por vintage do score_df: uma vez, não a cada render
+    g = score_df.groupby("vintage")
+    return g["score"].mean().sort_index(), g["y_true"].mean().sort_index()
 
 @st.cache_resource
 def carregar_dados_modelo():    
@@ -33,6 +118,13 @@ def carregar_dados_modelo():
     return dados_teste['y_test'], dados_teste['proba']
 y_test, proba = carregar_dados_modelo()
 
+@st.cache_resource
+def curva_pr_modelo():
+    # histograma calculado uma vez; a página só desenha a curva
+    hist = ScoreHistogram.from_arrays(proba, y_test)
+    precision, recall, _ = hist.pr_curve()
+    return precision, recall, hist.pr_auc()
+
 def gerar_id():
     if "ids_gerados" not in st.session_state:
         st.session_state.ids_gerados = set()
@@ -102,7 +194,7 @@ with st.sidebar:
     st.divider()
     
     st.subheader("🤖 Status do Modelo")
-    st.info(f"Versão: v3.1")
+    st.info(f"Versão: {model_version}")
     
     col_s1, col_s2 = st.columns(2)
     col_s1.metric("AUC", "0.91", delta="Otimo", delta_color="normal")
@@ -191,7 +283,8 @@ if page == "Contexto do Problema":
         4. **Metodologia:** Valide as métricas técnicas e documentação.
         """)
 elif page == "Storytelling":
-    
+    px, go = _plotly()
+
     st.title("📈 Motor de Decisão de Crédito: Diagnóstico e Otimização de Política")
 
     st.divider()
@@ -256,11 +349,7 @@ elif page == "Storytelling":
 
     st.markdown("### 📈 Score médio (por Vintage)")
 
-    score_by_vintage = (
-        score_df.groupby("vintage")["score"]
-        .mean()
-        .sort_index()
-    )
+    score_by_vintage, bad_rate_by_vintage = agregados_vintage()
 
     col1, col2 = st.columns(2)
 
@@ -282,11 +371,6 @@ elif page == "Storytelling":
 
     with col2:
         # Taxa de Default
-        bad_rate_by_vintage = (
-            score_df.groupby("vintage")["y_true"]
-            .mean()
-            .sort_index()
-        )
         fig2 = go.Figure()
         fig2.add_trace(go.Scatter(
             x=bad_rate_by_vintage.index, 
@@ -300,6 +384,24 @@ elif page == "Storytelling":
         st.plotly_chart(fig2, use_container_width=True)
     st.error("**O Fato:** O risco está explodindo nas safras recentes. O score atual não está vendo o perigo.")
 
+    cohorts = get_vintage_cohorts()
+    if cohorts is not None:
+        st.markdown("### 🧬 Curvas de safra (bad rate acumulada por meses desde a originação)")
+        curvas = cohorts.curves(group_months=VINTAGE_GROUP_MONTHS, min_accounts=100, max_mob=VINTAGE_MAX_MOB)
+        fig3 = go.Figure()
+        for origin, curva in curvas.iterrows():
+            fig3.add_trace(go.Scatter(
+                x=curva.index,
+                y=curva.values,
+                mode='lines',
+                name=f'Safra de {cohorts.as_of - origin} meses atrás'
+            ))
+        update_layout_dark(fig3, "Bad rate acumulada por safra", "Bad rate acumulada",
+                           x_title="Meses desde a originação (MOB)")
+        st.plotly_chart(fig3, use_container_width=True)
+        st.caption(f"Safras de {VINTAGE_GROUP_MONTHS} meses, pelo primeiro mês da conta no credit_record; "
+                   "inadimplência = primeiro STATUS 2-5 (60+ dias).")
+
     st.subheader("🎯 Conclusão Estratégica")
     st.warning("""A política de **99% de aprovação** criou um ponto cego. Estamos atraindo o mesmo 'perfil', mas o comportamento de crédito degradou. 
                **A solução não é parar de emprestar, mas usar o novo modelo para filtrar o ruído.**""")
@@ -474,8 +576,7 @@ elif page == "Storytelling":
     st.markdown("### 🎯 Curva de Precisão vs. Recall")
 
     # 1. Calculando a curva (data['y_true'] e data['y_scores'] do seu modelo)
-    precision, recall, thresholds = precision_recall_curve(y_test, proba)
-    pr_auc = auc(recall, precision)
+    precision, recall, pr_auc = curva_pr_modelo()
 
     # 2. Criando o gráfico interativo
     fig_pr = go.Figure()
@@ -687,13 +788,12 @@ elif page == "Simulador":
                 "MONTHS_BALANCE": [months_balance]
             })
 
-        cuts = {"q90": 750, "q70": 650, "q40": 570, "q15": 450,
-                            "cut_reprovado": 450, "cut_manual": 570, "cut_restricao": 650}
+        cuts = score_cuts
 
         hist_features = build_history_features(dados_bancarios, window_months=12)
         df_scoring = build_scoring_df(dados_cliente, hist_features)
         X_new, ids = prepare_X_for_model(df_scoring)
-        df_scored = apply_pipeline_to_new_data(X_new, pipeline, score_params)
+        df_scored = apply_pipeline_to_new_data(X_new, pipeline, score_params, cache=score_cache, model_version=model_version)
 
         if ids is not None:
             df_scored["ID"] = ids.values
@@ -703,13 +803,18 @@ elif page == "Simulador":
         decisao = decision_by_score(score, cuts)
         rating_ = rating(score, cuts)
         textos_insight = {
-                "A - Excelente": "Perfil de altíssima fidelidade e baixíssimo risco histórico. Possui indicadores de estabilidade financeira superiores a 90% da base.",
-                "B - Bom": "Perfil com comportamento estável e baixo risco. Similar a 85% da base de clientes adimplentes do modelo.",
-                "C - Regular": "Perfil intermediário com oscilações pontuais. Requer monitoramento de limite, mas mantém score dentro da média do cluster.",
-                "D - Alerta": "Perfil com indicadores de volatilidade financeira. O modelo identificou padrões de comportamento que precedem atrasos em 40% dos casos similares.",
-                "E - Crítico": "Perfil de alto risco. Cluster caracterizado por baixa permanência no emprego e histórico de atrasos recorrentes."
+                "A - Excelente": "Perfil de altíssima fidelidade e baixíssimo risco histórico.",
+                "B - Bom": "Perfil com comportamento estável e baixo risco.",
+                "C - Regular": "Perfil intermediário com oscilações pontuais. Requer monitoramento de limite.",
+                "D - Risco": "Perfil com indicadores de volatilidade financeira.",
+                "E - Alto Risco": "Perfil de alto risco."
             }
 
+        # coorte real: os COHORT_K clientes da base mais parecidos com o simulado
+        cohort_index = get_cohort_index(model_version, results_mtime())
+        coorte, vizinhos = cohort_index.cohort(df_scoring, k=COHORT_K, income_scale="raw")
+        pct_coorte = CohortIndex.score_percentile(score, vizinhos["score"])
+
         st.success("✅ **Simulação Concluída!**")
         with st.container(border=True):
 
@@ -754,6 +859,50 @@ elif page == "Simulador":
             with col_biz:
                 st.write("**Análise de Comportamento**")
                 st.info(f"{insight_perfil}")
+
+            st.write(f"**Clientes similares ({int(coorte['cohort_n'])} mais parecidos da base)**")
+            col_c1, col_c2, col_c3 = st.columns(3)
+            with col_c1:
+                st.metric(
+                    "Inadimplência observada", f"{coorte['cohort_default_rate']*100:.1f}%",
+                    delta=f"{(coorte['cohort_default_rate'] - coorte['base_default_rate'])*100:+.1f} p.p. vs base",
+                    delta_color="inverse",
+                )
+                st.caption(f"{int(coorte['cohort_bad'])} de {int(coorte['cohort_n'])} similares inadimplentes "
+                           f"(base: {coorte['base_default_rate']*100:.2f}%)")
+            with col_c2:
+                st.metric("Score mediano dos similares", f"{coorte['cohort_score_p50']:.0f}")
+                st.caption(f"P10–P90: {coorte['cohort_score_p10']:.0f} – {coorte['cohort_score_p90']:.0f}")
+            with col_c3:
+                st.metric("Posição na coorte", f"{pct_coorte:.0f}%")
+                st.caption("dos similares têm score menor que o deste perfil")
+
+        with st.expander("🔀 Análise What-If"):
+            st.caption("Como o score reage a mudanças de renda e tempo de emprego (demais dados fixos).")
+            wi = what_if_grid(
+                dados_cliente, dados_bancarios, pipeline, score_params,
+                perturbations={
+                    "income": [0.5, 0.75, 1.25, 1.5, 2.0, 3.0],
+                    "years_employed": [0, 1, 2, 5, 10, 20],
+                },
+            )
+            surface = wi["surface"]
+            heat = surface.pivot(index="years_employed", columns="income", values="score")
+            px, _ = _plotly()
+            fig_wi = px.imshow(
+                heat, text_auto=".0f", aspect="auto", color_continuous_scale="RdYlGn",
+                labels=dict(x="Fator de renda", y="Tempo de emprego (anos)", color="Score"),
+            )
+            st.plotly_chart(fig_wi, use_container_width=True)
+
+            alcancaveis = wi["min_change"].query("reachable and dimension != 'joint'")
+            if len(alcancaveis):
+                st.dataframe(
+                    alcancaveis[["boundary", "cut", "direction", "dimension", "to_income", "to_years_employed", "score", "decision"]],
+                    hide_index=True, use_container_width=True,
+                )
+            else:
+                st.info("Nenhuma mudança dentro da grade cruza um corte de decisão.")
 elif page == "Metodologia":
     # --- CABEÇALHO ---
     st.title("📚 Metodologia de Análise de Crédito")
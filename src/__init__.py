@@ -1,5 +1,133 @@
-from src.scoring import fit_score_scale, proba_to_score, rating, decision_by_score
-from src.build_pipeline import build_pipeline
-from src.train_apply import train_score_pipeline, apply_pipeline_to_new_data
-from src.features_history import build_history_features
-from src.dataset_builder import build_scoring_df, prepare_X_for_model
+"""
+Pacote do credit scoring.
+
+Os nomes abaixo são carregados sob demanda (PEP 562): `from src import
+proba_to_score` importa só src.scoring (numpy), sem sklearn/xgboost/pyarrow.
+Para um papel específico, importe o entry point correspondente:
+
+    src.scoring_api    workers de scoring (histórico, validação, apply, cache)
+    src.training_api   treino, backtest e métricas
+    src.dashboard_api  o que o app/app.py usa
+"""
+import importlib
+
+# nome público -> módulo que o define
+_EXPORTS = {
+    # scoring
+    "fit_score_scale": "scoring",
+    "proba_to_score": "scoring",
+    "rating": "scoring",
+    "decision_by_score": "scoring",
+    "rating_array": "scoring",
+    "decision_array": "scoring",
+    "DEFAULT_SCORE_CUTS": "scoring",
+    "rating_codes": "scoring",
+    "decision_codes": "scoring",
+    # build_pipeline
+    "build_pipeline": "build_pipeline",
+    # train_apply
+    "train_score_pipeline": "train_apply",
+    "apply_pipeline_to_new_data": "train_apply",
+    "apply_pipeline_with_history": "train_apply",
+    # features_history
+    "build_history_features": "features_history",
+    "build_history_features_multi": "features_history",
+    "select_window": "features_history",
+    # dataset_builder
+    "build_scoring_df": "dataset_builder",
+    "prepare_X_for_model": "dataset_builder",
+    # score_cache
+    "ScoreCache": "score_cache",
+    "hash_feature_rows": "score_cache",
+    # dtypes
+    "compact_dtypes": "dtypes",
+    "memory_report": "dtypes",
+    "read_parquet_compact": "dtypes",
+    # shadow
+    "apply_shadow_scoring": "shadow",
+    # model_registry
+    "ModelRegistry": "model_registry",
+    "ModelBundle": "model_registry",
+    # train_external
+    "train_score_pipeline_external": "train_external",
+    # backtest
+    "rolling_origin_folds": "backtest",
+    "run_vintage_backtest": "backtest",
+    # metrics
+    "ScoreHistogram": "metrics",
+    # bootstrap
+    "bootstrap_auc_ks": "bootstrap",
+    "bootstrap_metrics_ci": "bootstrap",
+    # quantile_sketch
+    "KLLSketch": "quantile_sketch",
+    "score_cuts_from_sketch": "quantile_sketch",
+    # validation
+    "validate_clients": "validation",
+    "validate_records": "validation",
+    "SchemaError": "validation",
+    "REASON_CODES": "validation",
+    # arrow_apply
+    "apply_pipeline_arrow": "arrow_apply",
+    # results_store
+    "write_scored_batch": "results_store",
+    "read_results": "results_store",
+    "iter_result_batches": "results_store",
+    "export_score_df": "results_store",
+    "DASHBOARD_COLUMNS": "results_store",
+    # what_if
+    "what_if_grid": "what_if",
+    "DEFAULT_PERTURBATIONS": "what_if",
+    # stress_test
+    "run_stress_test": "stress_test",
+    "income_shock": "stress_test",
+    "delinquency_step": "stress_test",
+    "reset_years_employed": "stress_test",
+    "combine": "stress_test",
+    "DEFAULT_SCENARIOS": "stress_test",
+    # lookup_scorer
+    "LookupScorer": "lookup_scorer",
+    # db_loader
+    "ConnectionPool": "db_loader",
+    "sqlite_pool": "db_loader",
+    "duckdb_pool": "db_loader",
+    "postgres_pool": "db_loader",
+    "load_clients": "db_loader",
+    "load_records": "db_loader",
+    "iter_history_features": "db_loader",
+    "history_features_from_db": "db_loader",
+    "iter_scoring_batches": "db_loader",
+    # shared_memory
+    "SharedScoringState": "shared_memory",
+    "SharedScoringView": "shared_memory",
+    "init_worker": "shared_memory",
+    "score_batch": "shared_memory",
+    "unlink_stale": "shared_memory",
+    # abt_builder
+    "build_abt": "abt_builder",
+    "build_client_features": "abt_builder",
+    "build_history_target": "abt_builder",
+    "write_abt": "abt_builder",
+    "read_abt": "abt_builder",
+    "abt_diff": "abt_builder",
+    # cohort_index
+    "CohortIndex": "cohort_index",
+    # vintage_analytics
+    "VintageEngine": "vintage_analytics",
+    "CohortMatrix": "vintage_analytics",
+    "load_cohorts": "vintage_analytics",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{module}"), name)
+    globals()[name] = value  # próximas leituras não passam mais por aqui
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
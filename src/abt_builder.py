@@ -0,0 +1,383 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+
+from .features_history import BAD, STATUS_MAP
+
+
+# ------------------------------------------------------------
+# Definições (notebooks 02_data_cleaning e 03_feature_engineering)
+# ------------------------------------------------------------
+# Snapshot da ABT: features até SNAPSHOT, target = algum mês ruim (STATUS
+# 2-5) em [SNAPSHOT, 0], só para IDs com >= MIN_PERFORMANCE_MONTHS meses
+# observados nessa janela.
+SNAPSHOT = -6
+MIN_PERFORMANCE_MONTHS = 6
+WINDOW_MONTHS = 12
+
+CAT_COLS = ["NAME_INCOME_TYPE", "NAME_EDUCATION_TYPE", "NAME_FAMILY_STATUS", "NAME_HOUSING_TYPE", "OCCUPATION_TYPE"]
+
+CLIENT_COLUMNS = [
+    "ID", "CODE_GENDER", "years", "CNT_CHILDREN", "CNT_FAM_MEMBERS",
+    "FLAG_OWN_CAR", "FLAG_OWN_REALTY",
+    "NAME_INCOME_TYPE", "NAME_EDUCATION_TYPE",
+    "NAME_FAMILY_STATUS", "NAME_HOUSING_TYPE", "OCCUPATION_TYPE",
+    "years_employed", "amt_income_month", "renda_per_capita",
+    "no_formal_employment", "unclassified_occupation",
+    "target_heuristic",
+]
+HISTORY_COLUMNS = ["vintage", "max_status", "last_status", "n_months", "last_month", "last_bad"]
+ABT_COLUMNS = CLIENT_COLUMNS + HISTORY_COLUMNS + ["target"]
+
+RECORD_COLUMNS = ["ID", "MONTHS_BALANCE", "STATUS"]
+CHUNK_ROWS = 5_000_000
+
+
+# ------------------------------------------------------------
+# Cadastro (application_record bruto ou clients_clean)
+# ------------------------------------------------------------
+def build_client_features(applications: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cadastro -> colunas de cliente do model_df.
+
+    Aceita o application_record bruto (DAYS_BIRTH, DAYS_EMPLOYED,
+    AMT_INCOME_TOTAL, M/F, Y/N) ou o clients_clean (years, years_employed,
+    amt_income_month, renda_per_capita já derivados, target heurístico em
+    `target`). Daí em diante são os passos dos notebooks 02/03:
+    mapeamentos 0/1, Missing, clip de filhos/família, log1p da renda e as
+    flags de emprego.
+
+    Derivações do bruto (o clients_clean saiu de um SQL fora do repo):
+      - years = anos completos de -DAYS_BIRTH
+      - years_employed = -DAYS_EMPLOYED / 365 (2 casas); DAYS_EMPLOYED > 0
+        (365243 = sem vínculo) vira 0
+      - amt_income_month = AMT_INCOME_TOTAL / 12
+      - renda_per_capita = renda mensal / CNT_FAM_MEMBERS (antes do clip)
+    target_heuristic só existe se a entrada trouxer o target heurístico.
+    ID duplicado no cadastro: fica a primeira linha.
+    """
+    df = applications.drop_duplicates("ID", keep="first").copy()
+
+    if "DAYS_BIRTH" in df.columns:
+        df["years"] = (-df["DAYS_BIRTH"]) // 365
+        employed = -df["DAYS_EMPLOYED"]
+        df["years_employed"] = (employed / 365).round(2).where(employed > 0)
+        df["amt_income_month"] = df["AMT_INCOME_TOTAL"] / 12
+        df["renda_per_capita"] = df["amt_income_month"] / df["CNT_FAM_MEMBERS"]
+    if "target" in df.columns and "target_heuristic" not in df.columns:
+        df = df.rename(columns={"target": "target_heuristic"})
+
+    # 02_data_cleaning
+    df["CODE_GENDER"] = df["CODE_GENDER"].map({"M": 0, "F": 1})
+    df["FLAG_OWN_CAR"] = df["FLAG_OWN_CAR"].map({"N": 0, "Y": 1})
+    df["FLAG_OWN_REALTY"] = df["FLAG_OWN_REALTY"].map({"N": 0, "Y": 1})
+    df["OCCUPATION_TYPE"] = df["OCCUPATION_TYPE"].fillna("Missing")
+    df["years_employed"] = df["years_employed"].fillna(0)
+    for col in CAT_COLS:
+        df[col] = df[col].astype("category")
+    df["CNT_CHILDREN"] = df["CNT_CHILDREN"].clip(upper=6)
+    df["CNT_FAM_MEMBERS"] = df["CNT_FAM_MEMBERS"].clip(upper=7).astype(float)
+    df["amt_income_month"] = np.log1p(df["amt_income_month"])
+    df["renda_per_capita"] = np.log1p(df["renda_per_capita"])
+
+    # 03_feature_engineering
+    df["no_formal_employment"] = ((df["OCCUPATION_TYPE"] == "Missing") & (df["years_employed"] == 0)).astype(int)
+    df["unclassified_occupation"] = ((df["OCCUPATION_TYPE"] == "Missing") & (df["years_employed"] > 0)).astype(int)
+
+    cols = [c for c in CLIENT_COLUMNS if c in df.columns]
+    return df[cols].reset_index(drop=True)
+
+
+# ------------------------------------------------------------
+# Histórico: agregados parciais por ID (mergeáveis entre chunks)
+# ------------------------------------------------------------
+# Cada chunk vira uma linha por ID com:
+#   min_month     min(MONTHS_BALANCE <= 0)           -> vintage (min)
+#   perf_months   meses em [SNAPSHOT, 0]              -> filtro do target (soma)
+#   perf_bad      algum mês ruim em [SNAPSHOT, 0]     -> target (max)
+#   max_status, n_months, last_month, last_bad        (max, soma, max, max)
+#   last_status   STATUS no last_month do chunk       -> o do maior last_month;
+#                 empate fica com o chunk anterior (ordem do arquivo, como o
+#                 sort estável + first do notebook)
+_PARTIAL_AGG = {
+    "min_month": "min", "perf_months": "sum", "perf_bad": "max",
+    "max_status": "max", "n_months": "sum", "last_month": "max", "last_bad": "max",
+}
+
+
+def _status_codes(status: pd.Series) -> np.ndarray:
+    """
+    STATUS -> severidade int8 (STATUS_MAP; desconhecido/nulo -> 0). Categórico
+    (parquet lido como dictionary) mapeia só as categorias.
+    """
+    if isinstance(status.dtype, pd.CategoricalDtype):
+        lookup = pd.Series(status.cat.categories.astype(str)).map(STATUS_MAP).fillna(0).to_numpy(dtype=np.int8)
+        codes = status.cat.codes.to_numpy()
+        return np.where(codes < 0, 0, lookup[codes] if len(lookup) else 0).astype(np.int8)
+    return status.astype(str).map(STATUS_MAP).fillna(0).to_numpy(dtype=np.int8)
+
+
+def _chunk_aggregates(chunk: pd.DataFrame, snapshot: int = SNAPSHOT, window_months: int = WINDOW_MONTHS,
+                      legacy_window: bool = True) -> pd.DataFrame:
+    months = pd.to_numeric(chunk["MONTHS_BALANCE"], errors="coerce").to_numpy(dtype=float)
+    status = _status_codes(chunk["STATUS"])
+    ids = chunk["ID"].to_numpy()
+
+    past = months <= 0
+    perf = past & (months >= snapshot)
+    # legacy: o notebook aplica a janela sobre o frame já filtrado para [SNAPSHOT, 0]
+    lower = snapshot if legacy_window else snapshot - window_months
+    feat = past & (months <= snapshot) & (months >= lower)
+    bad = np.isin(status, list(BAD)).astype(np.int8)
+
+    def by_id(mask, **cols):
+        return pd.DataFrame(cols, index=pd.Index(ids[mask], name="ID")).groupby(level=0, sort=False)
+
+    parts = [
+        by_id(past, min_month=months[past]).min(),
+        by_id(perf, perf_bad=bad[perf]).agg(perf_months=("perf_bad", "size"), perf_bad=("perf_bad", "max")),
+        by_id(feat, status=status[feat], month=months[feat]).agg(
+            max_status=("status", "max"), n_months=("month", "size"), last_month=("month", "max")),
+        by_id(feat & (bad == 1), last_bad=months[feat & (bad == 1)]).max(),
+    ]
+    # STATUS do mês mais recente da janela (primeira ocorrência no arquivo)
+    w = pd.DataFrame({"ID": ids[feat], "month": months[feat], "last_status": status[feat]})
+    w = w.sort_values(["ID", "month"], ascending=[True, False], kind="stable")
+    parts.append(w.groupby("ID", sort=False)[["last_status"]].first())
+
+    return pd.concat(parts, axis=1)
+
+
+def _merge_aggregates(parts: list[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Junta agregados parciais (na ordem dos chunks) num só por ID.
+    """
+    if len(parts) == 1:
+        return parts[0]
+    df = pd.concat(parts)
+    out = df.groupby(level=0, sort=False).agg(_PARTIAL_AGG)
+
+    # last_status do chunk com maior last_month; empate -> chunk anterior
+    ls = df[["last_month", "last_status"]].dropna().reset_index()
+    ls = ls.sort_values(["ID", "last_month"], ascending=[True, False], kind="stable")
+    out["last_status"] = ls.groupby("ID", sort=False)["last_status"].first()
+    return out
+
+
+def _finalize_history(agg: pd.DataFrame, min_performance_months: int) -> pd.DataFrame:
+    """
+    Agregado final -> hist_features + target, com os defaults do notebook.
+    """
+    agg = agg[agg["min_month"].notna()]
+    hist = pd.DataFrame({"ID": agg.index.to_numpy().astype(np.int64)})
+    hist["vintage"] = np.abs(agg["min_month"].to_numpy()).astype(np.int64)
+    for c in ["max_status", "last_status", "n_months", "last_month"]:
+        hist[c] = agg[c].fillna(0).to_numpy().astype(np.int64)
+    hist["last_bad"] = agg["last_bad"].fillna(-1).to_numpy(dtype=float)
+
+    has_target = agg["perf_months"].fillna(0).to_numpy() >= min_performance_months
+    hist["target"] = agg["perf_bad"].fillna(0).to_numpy().astype(np.int64)
+    return hist[has_target].sort_values("ID").reset_index(drop=True)
+
+
+# ------------------------------------------------------------
+# Leitura em chunks
+# ------------------------------------------------------------
+def _record_tasks(records, chunk_rows: int):
+    """
+    (função, argumentos) por chunk. Parquet: cada worker lê seus row groups
+    (nada de dados trafegando entre processos); CSV: chunks do read_csv;
+    DataFrame: fatias.
+    """
+    if isinstance(records, pd.DataFrame):
+        for i in range(0, len(records), chunk_rows):
+            yield _identity, (records.iloc[i:i + chunk_rows],)
+        return
+
+    path = str(records)
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        meta = pq.ParquetFile(path).metadata
+        groups, rows = [], 0
+        for g in range(meta.num_row_groups):
+            groups.append(g)
+            rows += meta.row_group(g).num_rows
+            if rows >= chunk_rows:
+                yield _read_row_groups, (path, groups)
+                groups, rows = [], 0
+        if groups:
+            yield _read_row_groups, (path, groups)
+    else:
+        for chunk in pd.read_csv(path, usecols=RECORD_COLUMNS, dtype={"STATUS": str}, chunksize=chunk_rows):
+            yield _identity, (chunk,)
+
+
+def _identity(chunk):
+    return chunk
+
+
+def _read_row_groups(path: str, groups: list[int]) -> pd.DataFrame:
+    import pyarrow.parquet as pq
+    return pq.ParquetFile(path, read_dictionary=["STATUS"]).read_row_groups(groups, columns=RECORD_COLUMNS).to_pandas()
+
+
+def _aggregate_task(read, args, snapshot, window_months, legacy_window):
+    chunk = read(*args)
+    return len(chunk), _chunk_aggregates(chunk, snapshot, window_months, legacy_window)
+
+
+# ------------------------------------------------------------
+# API
+# ------------------------------------------------------------
+def build_history_target(
+    records,
+    snapshot: int = SNAPSHOT,
+    window_months: int = WINDOW_MONTHS,
+    min_performance_months: int = MIN_PERFORMANCE_MONTHS,
+    legacy_window: bool = True,
+    chunk_rows: int = CHUNK_ROWS,
+    n_jobs: int = -1,
+    merge_every: int = 8,
+    report: list | None = None,
+) -> pd.DataFrame:
+    """
+    credit_record (DataFrame ou caminho .csv/.parquet) -> uma linha por ID
+    com HISTORY_COLUMNS + target, processando chunks em paralelo.
+
+    Cada chunk vira agregados parciais por ID (_chunk_aggregates); os
+    parciais são somados à medida que chegam (a cada `merge_every`), então a
+    memória fica em O(IDs), não O(registros). Um mesmo ID pode estar em
+    vários chunks.
+
+    legacy_window=True reproduz o model_df: no notebook 03 a janela de
+    features ([SNAPSHOT - window_months, SNAPSHOT]) é aplicada a registros
+    já filtrados para [SNAPSHOT, 0], então só o mês SNAPSHOT entra
+    (n_months <= 1). False usa a janela inteira sobre o histórico completo.
+    """
+    t0 = time.perf_counter()
+    tasks = _record_tasks(records, chunk_rows)
+    results = Parallel(n_jobs=n_jobs, return_as="generator")(
+        delayed(_aggregate_task)(read, args, snapshot, window_months, legacy_window) for read, args in tasks
+    )
+
+    pending, merged, n_rows, n_chunks = [], None, 0, 0
+    for rows, part in results:
+        n_rows += rows
+        n_chunks += 1
+        pending.append(part)
+        if len(pending) >= merge_every:
+            merged = _merge_aggregates(([merged] if merged is not None else []) + pending)
+            pending = []
+    parts = ([merged] if merged is not None else []) + pending
+    if not parts:
+        return pd.DataFrame(columns=["ID", *HISTORY_COLUMNS, "target"])
+
+    hist = _finalize_history(_merge_aggregates(parts), min_performance_months)
+    if report is not None:
+        report.append({
+            "stage": "abt:history",
+            "record_rows": n_rows,
+            "chunks": n_chunks,
+            "ids": len(hist),
+            "seconds": time.perf_counter() - t0,
+        })
+    return hist
+
+
+def build_abt(
+    applications,
+    records,
+    out_dir: str | None = None,
+    snapshot: int = SNAPSHOT,
+    window_months: int = WINDOW_MONTHS,
+    min_performance_months: int = MIN_PERFORMANCE_MONTHS,
+    legacy_window: bool = True,
+    chunk_rows: int = CHUNK_ROWS,
+    n_jobs: int = -1,
+    partition_cols=("vintage",),
+    report: list | None = None,
+) -> pd.DataFrame:
+    """
+    ABT de treino (mesmas colunas do model_df) a partir dos arquivos brutos.
+
+    applications: application_record/clients_clean (DataFrame ou .csv/.parquet)
+    records: credit_record (DataFrame ou .csv/.parquet; lido em chunks)
+    out_dir: se informado, grava parquet particionado por `partition_cols`
+             (ler de volta com read_abt)
+
+    Junta como o notebook: cadastro INNER histórico INNER target (só IDs com
+    histórico e >= min_performance_months meses na janela de performance),
+    na ordem do cadastro. Ver build_client_features e build_history_target.
+    """
+    if not isinstance(applications, pd.DataFrame):
+        path = str(applications)
+        applications = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+
+    clients = build_client_features(applications)
+    hist = build_history_target(records, snapshot=snapshot, window_months=window_months,
+                                min_performance_months=min_performance_months, legacy_window=legacy_window,
+                                chunk_rows=chunk_rows, n_jobs=n_jobs, report=report)
+
+    abt = clients.merge(hist, on="ID", how="inner")
+    abt = abt[[c for c in ABT_COLUMNS if c in abt.columns]]
+
+    if out_dir is not None:
+        write_abt(abt, out_dir, partition_cols=partition_cols)
+    return abt
+
+
+def write_abt(abt: pd.DataFrame, out_dir: str, partition_cols=("vintage",)) -> None:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    os.makedirs(out_dir, exist_ok=True)
+    table = pa.Table.from_pandas(abt, preserve_index=False)
+    pq.write_to_dataset(table, out_dir, partition_cols=list(partition_cols) or None,
+                        existing_data_behavior="delete_matching")
+
+
+def read_abt(path: str) -> pd.DataFrame:
+    """
+    Lê a ABT particionada com os tipos do model_df (a coluna de partição
+    volta como int64), ordenada por ID.
+    """
+    import pyarrow.dataset as ds
+
+    df = ds.dataset(path, format="parquet", partitioning="hive").to_table().to_pandas()
+    for c in HISTORY_COLUMNS + ["target"]:
+        if c in df.columns and isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].astype(str).astype(float if c == "last_bad" else np.int64)
+    cols = [c for c in ABT_COLUMNS if c in df.columns]
+    return df[cols].sort_values("ID").reset_index(drop=True)
+
+
+def abt_diff(abt: pd.DataFrame, reference: pd.DataFrame) -> pd.DataFrame:
+    """
+    Paridade com uma ABT de referência (ex.: data/credit/model_df.parquet),
+    alinhando por ID. Uma linha por coluna: linhas divergentes e dtypes.
+    """
+    ids = np.intersect1d(abt["ID"], reference["ID"])
+    a = abt.set_index("ID").loc[ids]
+    b = reference.set_index("ID").loc[ids]
+
+    rows = []
+    for c in [c for c in reference.columns if c != "ID"]:
+        if c not in a.columns:
+            rows.append({"column": c, "mismatches": len(ids), "dtype": None, "reference_dtype": str(b[c].dtype)})
+            continue
+        x, y = a[c], b[c]
+        if isinstance(y.dtype, pd.CategoricalDtype) or isinstance(x.dtype, pd.CategoricalDtype):
+            diff = x.astype(str).to_numpy() != y.astype(str).to_numpy()
+        else:
+            diff = ~np.isclose(x.to_numpy(dtype=float), y.to_numpy(dtype=float), rtol=0, atol=1e-9, equal_nan=True)
+        rows.append({"column": c, "mismatches": int(diff.sum()), "dtype": str(x.dtype), "reference_dtype": str(y.dtype)})
+
+    out = pd.DataFrame(rows)
+    out.attrs.update({
+        "only_in_abt": len(np.setdiff1d(abt["ID"], reference["ID"])),
+        "only_in_reference": len(np.setdiff1d(reference["ID"], abt["ID"])),
+    })
+    return out
@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .features_history import build_history_features
+from .dtypes import downcast_floats, _arrow_table, FLOAT64_COLS
+from .scoring import proba_to_score, rating_codes, decision_codes, RATING_LABELS, DECISION_LABELS
+
+
+# ------------------------------------------------------------
+# Histórico (Arrow -> features)
+# ------------------------------------------------------------
+# mesmos defaults do _build_scoring_dataset para quem não tem histórico
+_HISTORY_ZERO_FILL = ["n_months", "vintage", "max_status", "last_status"]
+
+
+def _history_frame(records: pa.Table) -> tuple[pd.DataFrame, bool]:
+    """
+    Só as 3 colunas do histórico, sem passar por object:
+      - ID/MONTHS_BALANCE numéricos -> numpy sem cópia (quando não há nulos)
+      - STATUS dictionary -> pandas Categorical (códigos reaproveitados)
+
+    Retorna (frame, typed): typed=False quando ainda precisa de coerção.
+    """
+    records = records.select(["ID", "MONTHS_BALANCE", "STATUS"])
+    status = records.column("STATUS")
+    if pa.types.is_string(status.type) or pa.types.is_large_string(status.type):
+        records = records.set_column(2, "STATUS", pc.dictionary_encode(status))
+
+    typed = all(
+        pa.types.is_integer(records.column(c).type) and records.column(c).null_count == 0
+        for c in ("ID", "MONTHS_BALANCE")
+    ) and pa.types.is_dictionary(records.column("STATUS").type)
+    return records.to_pandas(), typed
+
+
+def _take_by_id(hist: pd.DataFrame, ids: np.ndarray) -> dict:
+    """
+    Left join por ID mantendo a ordem do cadastro (o join do Arrow reordena).
+    """
+    pos = pd.Index(hist["ID"].to_numpy()).get_indexer(ids)
+    take = pa.array(pos, mask=pos < 0)
+
+    cols = {}
+    for c in hist.columns:
+        if c == "ID":
+            continue
+        col = pa.array(hist[c].to_numpy(), from_pandas=True).take(take)
+        if c in _HISTORY_ZERO_FILL and col.null_count:
+            col = pc.fill_null(col, pa.scalar(0).cast(col.type))
+        cols[c] = col
+    return cols
+
+
+# ------------------------------------------------------------
+# Saídas do score
+# ------------------------------------------------------------
+def _score_columns(proba: np.ndarray, score_params: dict, score_clip=(300, 850), dtype="float64") -> dict:
+    """
+    proba_bad/score em float32 e rating/decision já como dictionary
+    (índice int8 + rótulos), sem materializar strings por linha.
+    """
+    cuts = score_params["score_cuts"]
+    score = proba_to_score(proba, score_params["A"], score_params["B"],
+                           clip_min=score_clip[0], clip_max=score_clip[1], dtype=dtype)
+
+    return {
+        "proba_bad": pa.array(proba.astype(np.float32)),
+        "score": pa.array(score.astype(np.float32)),
+        "rating": pa.DictionaryArray.from_arrays(rating_codes(score, cuts), RATING_LABELS),
+        "decision": pa.DictionaryArray.from_arrays(decision_codes(score, cuts), DECISION_LABELS),
+    }
+
+
+# ------------------------------------------------------------
+# Apply (Arrow de ponta a ponta)
+# ------------------------------------------------------------
+def apply_pipeline_arrow(
+    clients,
+    records,
+    pipeline,
+    score_params,
+    feature_columns: list[str],
+    window_months: int = 12,
+    score_clip=(300, 850),
+    cache=None,
+    model_version: str | None = None,
+    dtype: str = "float64",
+    dedup: bool = False,
+    report: list | None = None,
+) -> pa.Table:
+    """
+    Versão Arrow do apply_pipeline_with_history.
+
+    clients/records: pyarrow.Table ou RecordBatch (ex.: direto do parquet).
+      - colunas numéricas chegam ao booster sem cópia
+      - colunas dictionary (string) vão como categoria: o XGBoost recodifica
+        os códigos pelos valores das categorias guardadas no booster, então
+        o dicionário do lote não precisa ter a mesma ordem do treino
+      - o histórico só vira pandas nas 3 colunas usadas (STATUS como Categorical)
+    - dtype="float32" / dedup=True: mesmos modos do apply_pipeline_with_history
+
+    Retorna um pyarrow.Table: cadastro + features do histórico +
+    proba_bad, score, rating, decision.
+    """
+    clients = _arrow_table(clients)
+    records = _arrow_table(records)
+
+    frame, typed = _history_frame(records)
+    hist = build_history_features(frame, window_months=window_months, validated=typed)
+
+    scoring = clients
+    for name, col in _take_by_id(hist, clients.column("ID").to_numpy()).items():
+        if name in scoring.column_names:
+            scoring = scoring.drop_columns([name])
+        scoring = scoring.append_column(name, col)
+
+    # alinha colunas e ordem igual ao treino (ausente -> nulo = missing)
+    X = pa.table({
+        c: scoring.column(c) if c in scoring.column_names else pa.nulls(len(scoring), pa.float64())
+        for c in feature_columns
+    })
+
+    if dtype == "float32":
+        X = downcast_floats(X, skip=FLOAT64_COLS)
+
+    if cache is None and dtype == "float64" and not dedup:
+        proba = pipeline.predict_proba(X)[:, 1]
+    else:
+        # cache/dedup usam o hash das linhas (pandas)
+        from .train_apply import _predict_proba
+        hashed = cache is not None or dedup
+        proba = _predict_proba(pipeline, X.to_pandas() if hashed else X, score_params,
+                               cache=cache, model_version=model_version, dtype=dtype,
+                               dedup=dedup, report=report)
+
+    for name, col in _score_columns(np.asarray(proba), score_params, score_clip, dtype=dtype).items():
+        scoring = scoring.append_column(name, col)
+    return scoring
@@ -0,0 +1,200 @@
+import os
+import tempfile
+
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+
+from .build_pipeline import build_pipeline
+from .scoring import fit_score_scale, proba_to_score
+
+
+DEFAULT_CUTOFFS = (450, 500, 550, 570, 600, 650, 700, 750)
+
+
+# ------------------------------------------------------------
+# Agenda de folds (rolling origin por vintage)
+# ------------------------------------------------------------
+def rolling_origin_folds(
+    vintages,
+    n_folds: int = 5,
+    min_train_quantile: float = 0.5,
+    max_train_quantile: float = 0.9,
+) -> list[dict]:
+    """
+    Gera os cortes do backtest a partir da distribuição de vintage.
+
+    Fold k: treino em vintage <= cut_k, teste em cut_k < vintage <= cut_{k+1}
+    (o último fold testa até o fim). É o split do train_score_pipeline
+    (vintage <= quantile) repetido em várias origens.
+    """
+    v = pd.Series(vintages).dropna()
+    qs = np.linspace(min_train_quantile, max_train_quantile, n_folds)
+    cuts = sorted(set(float(c) for c in v.quantile(qs)))
+
+    folds = []
+    for k, cut in enumerate(cuts):
+        test_max = cuts[k + 1] if k + 1 < len(cuts) else float(v.max())
+        if test_max <= cut:
+            continue
+        folds.append({"fold": k, "train_max_vintage": cut, "test_max_vintage": test_max})
+    return folds
+
+
+# ------------------------------------------------------------
+# Dataset compartilhado (memmap)
+# ------------------------------------------------------------
+def _dump_shared(df: pd.DataFrame, path: str) -> None:
+    """
+    Grava o df como dict de arrays numpy (categóricas viram códigos) para os
+    workers abrirem com mmap_mode="r" -> leitura direta do page cache, sem
+    cópia pickled por processo.
+    """
+    arrays, categories = {}, {}
+    for c in df.columns:
+        s = df[c]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            arrays[c] = s.cat.codes.to_numpy()
+            categories[c] = list(s.cat.categories)
+        elif pd.api.types.is_numeric_dtype(s):
+            arrays[c] = s.to_numpy()
+        else:
+            cat = s.astype("category")
+            arrays[c] = cat.cat.codes.to_numpy()
+            categories[c] = list(cat.cat.categories)
+    joblib.dump({"arrays": arrays, "categories": categories, "columns": list(df.columns)}, path)
+
+
+def _load_rows(path: str, mask_fn) -> pd.DataFrame:
+    shared = joblib.load(path, mmap_mode="r")
+    arrays, categories = shared["arrays"], shared["categories"]
+    idx = np.flatnonzero(mask_fn(arrays))
+
+    out = {}
+    for c in shared["columns"]:
+        col = np.asarray(arrays[c][idx])
+        if c in categories:
+            col = pd.Categorical.from_codes(col, categories=categories[c])
+        out[c] = col
+    return pd.DataFrame(out)
+
+
+# ------------------------------------------------------------
+# Um fold (roda no worker)
+# ------------------------------------------------------------
+def _ks(y, proba) -> float:
+    order = np.argsort(-proba, kind="mergesort")
+    y = np.asarray(y)[order]
+    n_pos, n_neg = y.sum(), len(y) - y.sum()
+    if n_pos == 0 or n_neg == 0:
+        return float("nan")
+    return float(np.max(np.abs(np.cumsum(y) / n_pos - np.cumsum(1 - y) / n_neg)))
+
+
+def _run_fold(path, fold, target_col, vintage_col, cat_cols, drop_cols_model, A, B, score_clip, cutoffs, threads):
+    from sklearn.metrics import roc_auc_score
+    from threadpoolctl import threadpool_limits
+
+    with threadpool_limits(limits=threads):
+        cut, test_max = fold["train_max_vintage"], fold["test_max_vintage"]
+        train = _load_rows(path, lambda a: a[vintage_col] <= cut)
+        test = _load_rows(path, lambda a: (a[vintage_col] > cut) & (a[vintage_col] <= test_max))
+
+        X_train, y_train = train.drop(columns=[target_col]), train[target_col].astype(int)
+        X_test, y_test = test.drop(columns=[target_col]), test[target_col].astype(int)
+
+        pipeline = build_pipeline(cat_cols=cat_cols, drop_cols_model=drop_cols_model)
+        pipeline.named_steps["model"].xgb_params["n_jobs"] = threads
+        pipeline.fit(X_train, y_train)
+
+        proba_train = pipeline.predict_proba(X_train)[:, 1]
+        proba_test = pipeline.predict_proba(X_test)[:, 1]
+
+    def _auc(y, p):
+        return float(roc_auc_score(y, p)) if 0 < y.sum() < len(y) else float("nan")
+
+    auc_train, auc_test = _auc(y_train, proba_train), _auc(y_test, proba_test)
+    summary = {
+        **fold,
+        "n_train": len(train),
+        "n_test": len(test),
+        "bad_rate_test": float(y_test.mean()) if len(y_test) else float("nan"),
+        "auc_train": auc_train,
+        "auc_test": auc_test,
+        "gap_auc": auc_train - auc_test,
+        "ks_test": _ks(y_test.to_numpy(), proba_test),
+    }
+
+    score = proba_to_score(proba_test, A, B, clip_min=score_clip[0], clip_max=score_clip[1])
+    y = y_test.to_numpy()
+    by_cutoff = []
+    for c in cutoffs:
+        approved = score >= c
+        by_cutoff.append({
+            "fold": fold["fold"],
+            "cutoff": c,
+            "approval_rate": float(approved.mean()) if len(y) else float("nan"),
+            "bad_rate_approved": float(y[approved].mean()) if approved.any() else float("nan"),
+            "bad_rate_rejected": float(y[~approved].mean()) if (~approved).any() else float("nan"),
+        })
+
+    return summary, by_cutoff
+
+
+# ------------------------------------------------------------
+# Backtest
+# ------------------------------------------------------------
+def run_vintage_backtest(
+    df: pd.DataFrame,
+    target_col="target",
+    vintage_col="vintage",
+    n_folds: int = 5,
+    min_train_quantile: float = 0.5,
+    max_train_quantile: float = 0.9,
+    cat_cols=None,
+    drop_cols_model=None,
+    p_cut=0.90, s_cut=350,
+    p_good=0.05, s_good=850,
+    score_clip=(300, 850),
+    cutoffs=DEFAULT_CUTOFFS,
+    n_jobs: int = -1,
+    threads_per_worker: int = 1,
+    temp_dir: str | None = None,
+) -> dict:
+    """
+    Backtest rolling-origin por vintage, com os folds treinados em paralelo.
+
+    - o df é gravado uma vez em disco e aberto por memmap nos workers
+    - cada worker limita BLAS/OpenMP/XGBoost a `threads_per_worker` threads
+      (n_jobs * threads_per_worker ~ núcleos da máquina)
+
+    Retorna:
+      - "folds": DataFrame com AUC treino/teste, gap_auc, KS e bad rate por fold
+      - "by_cutoff": DataFrame com aprovação e bad rate por cutoff de score e fold
+      - "summary": média/desvio das métricas entre folds
+    """
+    cat_cols = list(cat_cols or [])
+    drop_cols_model = list(drop_cols_model or [])
+    folds = rolling_origin_folds(df[vintage_col], n_folds, min_train_quantile, max_train_quantile)
+    A, B = fit_score_scale(p_cut, s_cut, p_good, s_good)
+
+    with tempfile.TemporaryDirectory(dir=temp_dir) as tmp:
+        path = os.path.join(tmp, "backtest_data.joblib")
+        _dump_shared(df, path)
+
+        results = Parallel(n_jobs=n_jobs, backend="loky")(
+            delayed(_run_fold)(
+                path, fold, target_col, vintage_col, cat_cols, drop_cols_model,
+                A, B, score_clip, list(cutoffs), threads_per_worker,
+            )
+            for fold in folds
+        )
+
+    folds_df = pd.DataFrame([r[0] for r in results])
+    by_cutoff = pd.DataFrame([row for r in results for row in r[1]])
+
+    metric_cols = ["auc_train", "auc_test", "gap_auc", "ks_test", "bad_rate_test"]
+    summary = folds_df[metric_cols].agg(["mean", "std", "min", "max"]) if len(folds_df) else pd.DataFrame()
+
+    return {"folds": folds_df, "by_cutoff": by_cutoff, "summary": summary}
@@ -0,0 +1,1059 @@
+"""
+Benchmarks reproduzíveis em dados sintéticos.
+
+Uso:
+    python -m src.benchmarks dtypes --clients 100000
+    python -m src.benchmarks history --rows 1000000 5000000
+    python -m src.benchmarks validation --rows 10000000
+    python -m src.benchmarks multi --rows 2000000
+    python -m src.benchmarks arrow --clients 1000000
+    python -m src.benchmarks lookup --clients 1000000
+    python -m src.benchmarks float32 --clients 1000000
+    python -m src.benchmarks dedup --clients 1000000
+    python -m src.benchmarks db --clients 100000
+    python -m src.benchmarks imports
+    python -m src.benchmarks whatif
+    python -m src.benchmarks workers --clients 1000000 --workers 4
+    python -m src.benchmarks abt --records 10000000
+    python -m src.benchmarks cohort
+    python -m src.benchmarks vintage --records 10000000 --deltas 12
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+
+# ------------------------------------------------------------
+# Dados sintéticos
+# ------------------------------------------------------------
+STATUS_VALUES = np.array(["0", "1", "2", "3", "4", "5", "C", "X"])
+STATUS_PROBS = np.array([0.40, 0.05, 0.01, 0.005, 0.003, 0.002, 0.33, 0.20])
+
+
+def make_synthetic_records(n_rows: int, max_months: int = 60, seed: int = 42) -> pd.DataFrame:
+    """
+    Histórico sintético no formato do credit_record (ID, MONTHS_BALANCE, STATUS):
+    cada ID tem uma sequência contígua de meses terminando em algum mês <= 0.
+    """
+    rng = np.random.default_rng(seed)
+    months_per_id = rng.integers(1, max_months + 1, size=max(1, n_rows // (max_months // 2)))
+    months_per_id = months_per_id[np.cumsum(months_per_id) <= n_rows]
+
+    n_ids = len(months_per_id)
+    ids = np.repeat(5_000_000 + np.arange(n_ids, dtype=np.int64), months_per_id)
+
+    # offset do mês dentro de cada ID (0, 1, 2, ...) + último mês observado
+    starts = np.repeat(np.cumsum(months_per_id) - months_per_id, months_per_id)
+    offset = np.arange(len(ids)) - starts
+    last_month = np.repeat(-rng.integers(0, 6, size=n_ids), months_per_id)
+    months = last_month - offset
+
+    status = rng.choice(STATUS_VALUES, size=len(ids), p=STATUS_PROBS)
+    return pd.DataFrame({"ID": ids, "MONTHS_BALANCE": months, "STATUS": status})
+
+
+def _timeit(fn, repeat: int = 1):
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+# ------------------------------------------------------------
+# Schema compacto: tempo e memória
+# ------------------------------------------------------------
+def benchmark_compact_dtypes(n_clients: int = 100_000, score_path: str = "data/credit/score_df.parquet",
+                             repeat: int = 3) -> pd.DataFrame:
+    """
+    Mesmo pipeline em X com os dtypes originais (int64/float64) x o mesmo X
+    depois do compact_dtypes: memória da matriz e tempo do predict_proba, no
+    score_df e num cadastro sintético (model_df reamostrado). A paridade de
+    proba/score fica em tests/test_dtypes.py.
+    """
+    from .dtypes import compact_dtypes, memory_usage_mb
+
+    pipeline, _ = _load_pipeline_v3()
+    clients, feature_columns = make_synthetic_clients(n_clients)
+    history = pd.read_parquet("data/credit/model_df.parquet", columns=HISTORY_COLS)
+    clients[HISTORY_COLS] = history[HISTORY_COLS].sample(n_clients, replace=True, random_state=0).to_numpy()
+    clients = clients.astype({c: history[c].dtype for c in HISTORY_COLS})
+
+    datasets = {"score_df": pd.read_parquet(score_path), "synthetic": clients}
+    rows = []
+    for name, df in datasets.items():
+        wide = df.reindex(columns=feature_columns)
+        t_compact, compact = _timeit(lambda: compact_dtypes(wide), repeat)
+        t_wide, _ = _timeit(lambda: pipeline.predict_proba(wide), repeat)
+        t_small, _ = _timeit(lambda: pipeline.predict_proba(compact), repeat)
+        rows.append({
+            "dataset": name,
+            "rows": len(df),
+            "wide_mb": round(memory_usage_mb(wide), 2),
+            "compact_mb": round(memory_usage_mb(compact), 2),
+            "compact_dtypes_s": round(t_compact, 3),
+            "predict_wide_s": round(t_wide, 3),
+            "predict_compact_s": round(t_small, 3),
+        })
+    return pd.DataFrame(rows)
+
+
+# ------------------------------------------------------------
+# History features: pandas x SQL embarcado
+# ------------------------------------------------------------
+def benchmark_history_backends(
+    row_counts=(100_000, 1_000_000, 5_000_000),
+    backends=("pandas", "duckdb", "sqlite"),
+    window_months: int = 12,
+    repeat: int = 1,
+) -> pd.DataFrame:
+    """
+    Compara os backends de build_history_features lendo o mesmo parquet.
+
+    Cada backend SQL é conferido contra o pandas (paridade exata das
+    features); a coluna `parity` registra o resultado.
+    """
+    from .features_history import build_history_features
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in row_counts:
+            records = make_synthetic_records(n)
+            path = os.path.join(tmp, f"credit_record_{n}.parquet")
+            records.to_parquet(path, index=False, row_group_size=250_000)
+
+            reference = None
+            for backend in backends:
+                if backend == "pandas":
+                    fn = lambda: build_history_features(pd.read_parquet(path), window_months=window_months)
+                else:
+                    fn = lambda: build_history_features(path, window_months=window_months, backend=backend)
+
+                try:
+                    seconds, out = _timeit(fn, repeat=repeat)
+                except ImportError as e:
+                    rows.append({"rows": n, "backend": backend, "seconds": np.nan, "parity": str(e)})
+                    continue
+
+                if reference is None:
+                    reference = out.reset_index(drop=True)
+                    parity = True
+                else:
+                    parity = _frames_equal(reference, out.reset_index(drop=True))
+
+                rows.append({"rows": len(records), "backend": backend, "seconds": seconds, "parity": parity})
+
+    return pd.DataFrame(rows)
+
+
+def _frames_equal(a: pd.DataFrame, b: pd.DataFrame) -> bool:
+    try:
+        pd.testing.assert_frame_equal(a, b[a.columns], check_dtype=False)
+        return True
+    except AssertionError:
+        return False
+
+
+# ------------------------------------------------------------
+# Validação x history features
+# ------------------------------------------------------------
+def benchmark_validation(row_counts=(1_000_000, 10_000_000), window_months: int = 12, repeat: int = 1) -> pd.DataFrame:
+    """
+    Custo do validate_records comparado ao build_history_features
+    (com validated=True, que é o caminho que ele alimenta).
+
+    Também passa o MONTHS_BALANCE como Int64 (nullable) com 1% de NA: toda
+    linha com NA tem que ir para a quarentena (nullable_na == nullable_quarantined)
+    e o clean tem que seguir para o build_history_features.
+    """
+    from .features_history import build_history_features
+    from .validation import validate_records
+
+    rows = []
+    for n in row_counts:
+        df = make_synthetic_records(n)
+        t_val, (clean, quarantine) = _timeit(lambda: validate_records(df), repeat)
+        t_hist, _ = _timeit(lambda: build_history_features(clean, window_months, validated=True), repeat)
+        t_raw, _ = _timeit(lambda: build_history_features(df, window_months), repeat)
+
+        nullable = df.assign(MONTHS_BALANCE=df["MONTHS_BALANCE"].astype("Int64"))
+        na = np.random.default_rng(0).random(len(df)) < 0.01
+        nullable.loc[na, "MONTHS_BALANCE"] = pd.NA
+        clean_na, quarantine_na = validate_records(nullable)
+        build_history_features(clean_na, window_months, validated=True)
+        rows.append({
+            "rows": n,
+            "validate_s": round(t_val, 3),
+            "history_validated_s": round(t_hist, 3),
+            "history_raw_s": round(t_raw, 3),
+            "overhead_pct": round(100 * (t_val + t_hist - t_raw) / t_raw, 1),
+            "quarantined": len(quarantine),
+            "nullable_na": int(na.sum()),
+            "nullable_quarantined": len(quarantine_na),
+        })
+    return pd.DataFrame(rows)
+
+
+def benchmark_history_multi(row_counts=(2_000_000,), windows=(3, 6, 12, 24), repeat: int = 1) -> pd.DataFrame:
+    """
+    build_history_features_multi (uma passada) x uma chamada de
+    build_history_features por janela. Paridade por janela:
+      - select_window(multi, w) == build_history_features(window_months=w)
+      - colunas _wm do multi == left-merge do single-window nos IDs do multi
+        (IDs sem registro na janela ficam NaN nos dois)
+    """
+    from .features_history import build_history_features, build_history_features_multi, select_window
+
+    rows = []
+    for n in row_counts:
+        df = make_synthetic_records(n)
+        t_multi, multi = _timeit(lambda: build_history_features_multi(df, windows=windows), repeat)
+        t_single, singles = _timeit(lambda: {w: build_history_features(df, window_months=w) for w in windows}, repeat)
+
+        same_frame, same_merged, missing = True, True, 0
+        for w, single in singles.items():
+            same_frame &= select_window(multi, w).equals(single)
+            cols = [c for c in multi.columns if c.endswith(f"_{w}m")]
+            wide = multi[cols].to_numpy(dtype=float)
+            merged = multi[["ID"]].merge(single, on="ID", how="left")[[c[:-len(f"_{w}m")] for c in cols]]
+            same_merged &= np.array_equal(wide, merged.to_numpy(dtype=float), equal_nan=True)
+            missing += int(np.isnan(wide[:, 0]).sum())
+
+        rows.append({
+            "rows": n,
+            "windows": len(windows),
+            "multi_s": round(t_multi, 3),
+            "single_s": round(t_single, 3),
+            "speedup": round(t_single / t_multi, 2),
+            "ids": len(multi),
+            "id_window_gaps": missing,
+            "same_as_single": same_frame,
+            "same_after_merge": same_merged,
+        })
+    return pd.DataFrame(rows)
+
+
+# ------------------------------------------------------------
+# Apply: pandas x Arrow
+# ------------------------------------------------------------
+CAT_COLS = ["NAME_INCOME_TYPE", "NAME_EDUCATION_TYPE", "NAME_FAMILY_STATUS", "NAME_HOUSING_TYPE", "OCCUPATION_TYPE"]
+HISTORY_COLS = ["vintage", "max_status", "last_status", "n_months", "last_month", "last_bad"]
+
+
+def _load_pipeline_v3(models_dir: str = "models"):
+    """
+    O pickle v3 foi salvo de um script: as classes precisam estar no __main__
+    (mesmo truque do app/app.py).
+    """
+    import sys
+    import joblib
+    from . import pipeline_components as pc
+
+    main = sys.modules["__main__"]
+    for name in ["DropCols", "EnsureCategorical", "EnsureNumeric", "XGBWithAutoSPW", "LogTransform"]:
+        setattr(main, name, getattr(pc, name))
+    pipeline = joblib.load(os.path.join(models_dir, "credit_pipeline_v3.pkl"))
+    score_params = joblib.load(os.path.join(models_dir, "score_params_v3.pkl"))
+    return pipeline, score_params
+
+
+def make_synthetic_clients(n_clients: int, model_df_path: str = "data/credit/model_df.parquet", seed: int = 42):
+    """
+    Cadastro sintético reamostrando linhas do model_df (IDs novos 0..n-1).
+    """
+    base = pd.read_parquet(model_df_path)
+    feature_columns = [c for c in base.columns if c not in ("ID", "target", "target_heuristic")]
+    base = base.drop(columns=["target", "target_heuristic", *HISTORY_COLS])
+    rng = np.random.default_rng(seed)
+    clients = base.iloc[rng.integers(0, len(base), n_clients)].reset_index(drop=True)
+    clients["ID"] = np.arange(n_clients)
+    return clients, feature_columns
+
+
+def benchmark_arrow_apply(client_counts=(100_000, 1_000_000), records_per_client: int = 10, repeat: int = 1) -> pd.DataFrame:
+    """
+    parquet -> apply_pipeline_with_history -> resultado, nos dois caminhos:
+      - pandas: read_table().to_pandas() e saída DataFrame
+      - arrow: read_table(read_dictionary=categóricas) e saída pyarrow.Table
+    """
+    import pyarrow.parquet as pq
+    from .train_apply import apply_pipeline_with_history
+
+    pipeline, score_params = _load_pipeline_v3()
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in client_counts:
+            clients, feature_columns = make_synthetic_clients(n)
+            records = make_synthetic_records(n * records_per_client)
+            records["ID"] = records["ID"] % n
+            records = records.drop_duplicates(["ID", "MONTHS_BALANCE"])
+            p_cli, p_rec = os.path.join(tmp, f"clients_{n}.parquet"), os.path.join(tmp, f"records_{n}.parquet")
+            pq.write_table(pa_table(clients), p_cli)
+            pq.write_table(pa_table(records), p_rec)
+
+            def run_pandas():
+                return apply_pipeline_with_history(
+                    pq.read_table(p_cli).to_pandas(), pq.read_table(p_rec).to_pandas(),
+                    pipeline, score_params, feature_columns,
+                )
+
+            def run_arrow():
+                return apply_pipeline_with_history(
+                    pq.read_table(p_cli, read_dictionary=CAT_COLS), pq.read_table(p_rec, read_dictionary=["STATUS"]),
+                    pipeline, score_params, feature_columns,
+                )
+
+            t_pd, out_pd = _timeit(run_pandas, repeat)
+            t_pa, out_pa = _timeit(run_arrow, repeat)
+            rows.append({
+                "clients": n,
+                "records": len(records),
+                "pandas_s": round(t_pd, 3),
+                "arrow_s": round(t_pa, 3),
+                "speedup": round(t_pd / t_pa, 2),
+                "max_abs_diff_proba": float(np.abs(out_pa.column("proba_bad").to_numpy() - out_pd["proba_bad"].to_numpy()).max()),
+            })
+    return pd.DataFrame(rows)
+
+
+def benchmark_lookup_scorer(client_counts=(100_000, 1_000_000), repeat: int = 3) -> pd.DataFrame:
+    """
+    Inferência: booster XGBoost x LookupScorer (tabelas), na mesma matriz já
+    pré-processada (só o último passo do pipeline é cronometrado).
+
+    Paridade: proba dentro de LOOKUP_PROBA_ATOL, score dentro de
+    SCORE_FLOAT32_ATOL e nenhuma decisão diferente fora dessa faixa em torno
+    de um corte (coluna ok).
+    """
+    from .lookup_scorer import LookupScorer, LOOKUP_PROBA_ATOL
+    from .scoring import proba_to_score, decision_codes, SCORE_FLOAT32_ATOL
+
+    pipeline, score_params = _load_pipeline_v3()
+    model = pipeline.steps[-1][1]
+    scorer = LookupScorer.from_pipeline(pipeline)
+    scorer.preprocess = None
+    cuts = score_params["score_cuts"]
+    decision_cuts = np.array([cuts["cut_reprovado"], cuts["cut_manual"], cuts["cut_restricao"]])
+
+    def to_score(proba):
+        return proba_to_score(proba, score_params["A"], score_params["B"], clip_min=300, clip_max=850)
+
+    rows = []
+    for n in client_counts:
+        clients, feature_columns = make_synthetic_clients(n)
+        X = clients.reindex(columns=feature_columns)
+        for _, step in pipeline.steps[:-1]:
+            X = step.transform(X)
+
+        t_xgb, p_xgb = _timeit(lambda: model.predict_proba(X)[:, 1], repeat)
+        t_lut, p_lut = _timeit(lambda: scorer.predict_proba(X)[:, 1], repeat)
+        s_xgb, s_lut = to_score(p_xgb), to_score(p_lut)
+        mismatch = decision_codes(s_xgb, cuts) != decision_codes(s_lut, cuts)
+        near_cut = np.abs(s_xgb[:, None] - decision_cuts).min(axis=1) <= SCORE_FLOAT32_ATOL
+
+        max_proba = float(np.abs(p_xgb - p_lut).max())
+        max_score = float(np.abs(s_xgb - s_lut).max())
+        rows.append({
+            "clients": n,
+            "tables": scorer.n_tables,
+            "xgboost_s": round(t_xgb, 3),
+            "lookup_s": round(t_lut, 3),
+            "speedup": round(t_xgb / t_lut, 2),
+            "max_abs_diff_proba": max_proba,
+            "max_abs_diff_score": max_score,
+            "bit_equal_pct": round(100 * float((p_xgb == p_lut).mean()), 1),
+            "decision_mismatch": int(mismatch.sum()),
+            "mismatch_off_cut": int((mismatch & ~near_cut).sum()),
+            "ok": max_proba <= LOOKUP_PROBA_ATOL and max_score <= SCORE_FLOAT32_ATOL and not (mismatch & ~near_cut).any(),
+        })
+    return pd.DataFrame(rows)
+
+
+def _peak_mb(fn):
+    import tracemalloc
+    tracemalloc.start()
+    try:
+        out = fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return peak / 1024 ** 2, out
+
+
+def benchmark_float32(client_counts=(100_000, 1_000_000), records_per_client: int = 10, repeat: int = 1) -> pd.DataFrame:
+    """
+    apply_pipeline_with_history em dtype="float64" x "float32": tempo, pico
+    de memória (tracemalloc) e diferença de score/decisão.
+
+    A comparação de score é feita no proba_to_score (antes do compact_dtypes
+    das saídas); divergências de decisão fora da faixa SCORE_FLOAT32_ATOL em
+    torno de um corte são contadas à parte (devem ser 0).
+    """
+    from .train_apply import apply_pipeline_with_history, _prepare_features, _predict_proba
+    from .scoring import proba_to_score, decision_codes, SCORE_FLOAT32_ATOL
+
+    pipeline, score_params = _load_pipeline_v3()
+    cuts = score_params["score_cuts"]
+    decision_cuts = np.array([cuts["cut_reprovado"], cuts["cut_manual"], cuts["cut_restricao"]])
+    rows = []
+    for n in client_counts:
+        clients, feature_columns = make_synthetic_clients(n)
+        records = make_synthetic_records(n * records_per_client)
+        records["ID"] = records["ID"] % n
+        records = records.drop_duplicates(["ID", "MONTHS_BALANCE"])
+
+        def run(dtype):
+            return apply_pipeline_with_history(clients, records, pipeline, score_params, feature_columns, dtype=dtype)
+
+        t64, _ = _timeit(lambda: run("float64"), repeat)
+        t32, _ = _timeit(lambda: run("float32"), repeat)
+        mb64, _ = _peak_mb(lambda: run("float64"))
+        mb32, _ = _peak_mb(lambda: run("float32"))
+
+        _, X = _prepare_features(clients, records, feature_columns)
+        proba = _predict_proba(pipeline, X, score_params)
+        s64 = proba_to_score(proba, score_params["A"], score_params["B"])
+        s32 = proba_to_score(proba, score_params["A"], score_params["B"], dtype=np.float32)
+        mismatch = decision_codes(s64, cuts) != decision_codes(s32, cuts)
+        near_cut = np.abs(s64[:, None] - decision_cuts).min(axis=1) <= SCORE_FLOAT32_ATOL
+
+        rows.append({
+            "clients": n,
+            "float64_s": round(t64, 3),
+            "float32_s": round(t32, 3),
+            "speedup": round(t64 / t32, 2),
+            "float64_peak_mb": round(mb64, 1),
+            "float32_peak_mb": round(mb32, 1),
+            "max_abs_diff_score": float(np.abs(s64 - s32).max()),
+            "decision_mismatch": int(mismatch.sum()),
+            "mismatch_off_cut": int((mismatch & ~near_cut).sum()),
+        })
+    return pd.DataFrame(rows)
+
+
+def benchmark_dedup(client_counts=(100_000, 1_000_000), records_per_client: int = 10, repeat: int = 1) -> pd.DataFrame:
+    """
+    apply_pipeline_with_history com e sem dedup=True.
+
+    Os clientes sintéticos reamostram o model_df, então o cadastro repete
+    como na base real; clientes sem histórico (maioria em produção) são os
+    que mais colapsam. Saídas devem ser idênticas.
+    """
+    from .train_apply import apply_pipeline_with_history
+
+    pipeline, score_params = _load_pipeline_v3()
+    rows = []
+    for n in client_counts:
+        clients, feature_columns = make_synthetic_clients(n)
+        records = make_synthetic_records(n * records_per_client)
+        records["ID"] = records["ID"] % n
+        records = records.drop_duplicates(["ID", "MONTHS_BALANCE"])
+
+        report = []
+        t_all, out_all = _timeit(lambda: apply_pipeline_with_history(
+            clients, records, pipeline, score_params, feature_columns), repeat)
+        t_dd, out_dd = _timeit(lambda: apply_pipeline_with_history(
+            clients, records, pipeline, score_params, feature_columns, dedup=True, report=report), repeat)
+        rows.append({
+            "clients": n,
+            "unique_rows": report[-1]["unique_rows"],
+            "dedup_ratio": round(report[-1]["dedup_ratio"], 3),
+            "all_rows_s": round(t_all, 3),
+            "dedup_s": round(t_dd, 3),
+            "speedup": round(t_all / t_dd, 2),
+            "identical": bool(out_all.equals(out_dd)),
+        })
+    return pd.DataFrame(rows)
+
+
+def _write_db(engine: str, path: str, records: pd.DataFrame) -> None:
+    if engine == "sqlite":
+        import sqlite3
+        con = sqlite3.connect(path)
+        records.to_sql("credit_record", con, index=False, chunksize=100_000)
+        con.execute("CREATE INDEX ix_credit_record_id ON credit_record (ID)")
+        con.commit()
+    else:
+        import duckdb
+        con = duckdb.connect(path)
+        con.register("records_df", records)
+        con.execute("CREATE TABLE credit_record AS SELECT * FROM records_df")
+    con.close()
+
+
+def benchmark_db_loader(client_counts=(100_000,), records_per_client: int = 20, window_months: int = 12,
+                        engines=("sqlite", "duckdb")) -> pd.DataFrame:
+    """
+    Histórico do banco -> history features, três jeitos:
+      - row_by_row: uma consulta por cliente (fetch linha a linha)
+      - full_pull: SELECT * da tabela inteira e filtro da janela em pandas
+      - loader: src/db_loader (janela filtrada no banco, lotes em streaming)
+    """
+    from .db_loader import sqlite_pool, duckdb_pool, history_features_from_db, _stream
+    from .features_history import build_history_features
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in client_counts:
+            records = make_synthetic_records(n * records_per_client)
+            records["ID"] = records["ID"] % n
+            records = records.drop_duplicates(["ID", "MONTHS_BALANCE"])
+            records["STATUS"] = records["STATUS"].astype(str)
+            ref = build_history_features(records, window_months=window_months)
+
+            for engine in engines:
+                path = os.path.join(tmp, f"credit_{engine}_{n}.db")
+                _write_db(engine, path, records)
+                make_pool = sqlite_pool if engine == "sqlite" else duckdb_pool
+
+                with make_pool(path) as pool:
+                    def row_by_row():
+                        parts = []
+                        with pool.connection() as con:
+                            for i in range(n):
+                                cur = con.cursor()
+                                cur.execute("SELECT ID, MONTHS_BALANCE, STATUS FROM credit_record WHERE ID = ?", (i,))
+                                parts.extend(iter(cur.fetchone, None))
+                                cur.close()
+                        df = pd.DataFrame(parts, columns=["ID", "MONTHS_BALANCE", "STATUS"])
+                        return build_history_features(df, window_months=window_months)
+
+                    def full_pull():
+                        with pool.connection() as con:
+                            df = pd.concat(list(_stream(con, "SELECT * FROM credit_record")), ignore_index=True)
+                        return build_history_features(df, window_months=window_months)
+
+                    def loader():
+                        return history_features_from_db(pool, window_months=window_months)
+
+                    for method, fn in [("row_by_row", row_by_row), ("full_pull", full_pull), ("loader", loader)]:
+                        t, out = _timeit(fn)
+                        rows.append({
+                            "engine": engine, "clients": n, "records": len(records), "method": method,
+                            "seconds": round(t, 3),
+                            "matches": bool(out.sort_values("ID").reset_index(drop=True)
+                                            .equals(ref.sort_values("ID").reset_index(drop=True))),
+                        })
+    return pd.DataFrame(rows)
+
+
+# orçamento de import (ms, menor de `repeat` processos novos) e dependências
+# que não podem entrar no caminho de scoring
+IMPORT_BUDGET_MS = {"src.scoring": 250, "src.scoring_api": 1000}
+HEAVY_MODULES = ("sklearn", "xgboost", "scipy", "plotly", "streamlit", "duckdb", "joblib")
+
+
+def _importtime(module: str) -> tuple[float, set]:
+    """
+    `python -X importtime -c "import <module>"` num processo novo.
+    Retorna (ms acumulados dos imports de src.*, pacotes de topo importados).
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=root, check=True,
+    )
+    total_us, packages = 0, set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        name = name[1:]  # depois do separador, a indentação marca o aninhamento
+        packages.add(name.strip().split(".")[0])
+        if not name.startswith(" ") and name.split(".")[0] == "src":
+            total_us += int(cumulative)
+    return total_us / 1000, packages
+
+
+def benchmark_import_time(budgets: dict | None = None, repeat: int = 3) -> pd.DataFrame:
+    """
+    Tempo de import dos entry points (src.scoring, src.scoring_api, ...) contra
+    o orçamento, e quais dependências pesadas (HEAVY_MODULES) cada um puxa.
+    """
+    budgets = IMPORT_BUDGET_MS if budgets is None else budgets
+    modules = list(budgets) + [m for m in ("src", "src.training_api", "src.dashboard_api") if m not in budgets]
+    rows = []
+    for module in modules:
+        runs = [_importtime(module) for _ in range(repeat)]
+        ms = min(r[0] for r in runs)
+        heavy = sorted(runs[0][1] & set(HEAVY_MODULES))
+        budget = budgets.get(module)
+        rows.append({
+            "module": module,
+            "import_ms": round(ms, 1),
+            "budget_ms": budget,
+            "heavy_deps": ",".join(heavy) or "-",
+            "ok": None if budget is None else bool(ms <= budget and not heavy),
+        })
+    return pd.DataFrame(rows)
+
+
+# ------------------------------------------------------------
+# Workers do pool: pickle por worker x memória compartilhada
+# ------------------------------------------------------------
+_BENCH_WORKER = {}
+
+
+def _private_mb() -> float:
+    """
+    Memória privada do processo (Private_Clean + Private_Dirty, Linux):
+    páginas de memória compartilhada não entram.
+    """
+    with open("/proc/self/smaps_rollup") as fh:
+        kb = sum(int(line.split()[1]) for line in fh if line.startswith(("Private_Clean", "Private_Dirty")))
+    return kb / 1024
+
+
+def _init_pickle_worker(pipeline_path: str, hist_path: str) -> None:
+    import joblib
+    t0, m0 = time.perf_counter(), _private_mb()
+    _BENCH_WORKER["pipeline"] = joblib.load(pipeline_path)
+    _BENCH_WORKER["hist"] = pd.read_parquet(hist_path)
+    _BENCH_WORKER["init"] = (time.perf_counter() - t0, _private_mb() - m0)
+
+
+def _init_shared_worker(manifest: dict) -> None:
+    from .shared_memory import init_worker
+    t0, m0 = time.perf_counter(), _private_mb()
+    init_worker(manifest)
+    _BENCH_WORKER["init"] = (time.perf_counter() - t0, _private_mb() - m0)
+
+
+def _score_pickle_worker(df_clients: pd.DataFrame, feature_columns: list[str]) -> np.ndarray:
+    from .train_apply import _merge_history, _align_to_training_schema
+    from .dtypes import compact_dtypes
+    df = compact_dtypes(_merge_history(compact_dtypes(df_clients.copy()), _BENCH_WORKER["hist"]))
+    return _BENCH_WORKER["pipeline"].predict_proba(_align_to_training_schema(df, feature_columns))[:, 1]
+
+
+def _score_shared_worker(df_clients: pd.DataFrame, feature_columns: list[str]) -> np.ndarray:
+    from .shared_memory import worker_view
+    return worker_view().score_clients(df_clients)["proba_bad"].to_numpy()
+
+
+def _worker_stats(_) -> tuple:
+    time.sleep(0.2)  # cada tarefa cai num worker diferente
+    return (os.getpid(), *_BENCH_WORKER["init"], _private_mb())
+
+
+def benchmark_shared_workers(client_counts=(1_000_000,), workers: int = 4, records_per_client: int = 10) -> pd.DataFrame:
+    """
+    Pool de processos (fork) escorando lotes do cadastro, em dois modos:
+      - pickle: cada worker faz joblib.load do pipeline e lê o próprio
+        history_features (parquet)
+      - shared: init_worker(manifest) anexa ao booster/histórico publicados
+        por SharedScoringState (src/shared_memory.py)
+
+    Por modo: tempo de init do worker, memória privada que o init somou e a
+    memória privada do worker depois de escorar (média entre os workers).
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing as mp
+    from .features_history import build_history_features
+    from .shared_memory import SharedScoringState
+
+    pipeline, score_params = _load_pipeline_v3()
+    ctx = mp.get_context("fork")
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in client_counts:
+            clients, feature_columns = make_synthetic_clients(n)
+            records = make_synthetic_records(n * records_per_client)
+            records["ID"] = records["ID"] % n
+            hist = build_history_features(records.drop_duplicates(["ID", "MONTHS_BALANCE"]))
+            del records
+            hist_path = os.path.join(tmp, f"hist_{n}.parquet")
+            hist.to_parquet(hist_path, index=False)
+            batches = [clients.iloc[i:i + 50_000] for i in range(0, n, 50_000)]
+
+            with SharedScoringState.publish(pipeline, score_params, feature_columns, history=hist) as state:
+                modes = {
+                    "pickle": (_init_pickle_worker, (os.path.join("models", "credit_pipeline_v3.pkl"), hist_path),
+                               _score_pickle_worker),
+                    "shared": (_init_shared_worker, (state.manifest,), _score_shared_worker),
+                }
+                proba = {}
+                for mode, (init, initargs, task) in modes.items():
+                    t0 = time.perf_counter()
+                    with ProcessPoolExecutor(workers, mp_context=ctx, initializer=init, initargs=initargs) as pool:
+                        proba[mode] = np.concatenate(list(pool.map(task, batches, [feature_columns] * len(batches))))
+                        stats = {s[0]: s[1:] for s in pool.map(_worker_stats, range(workers * 4))}
+                    total = time.perf_counter() - t0
+                    init_s, init_mb, private_mb = np.asarray(list(stats.values())).mean(axis=0)
+                    rows.append({
+                        "clients": n, "mode": mode, "workers": len(stats),
+                        "init_ms": round(init_s * 1000, 1),
+                        "init_private_mb": round(init_mb, 1),
+                        "worker_private_mb": round(private_mb, 1),
+                        "total_s": round(total, 2),
+                        "shared_mb": round(state.nbytes / 1024 ** 2, 1) if mode == "shared" else 0.0,
+                    })
+                rows[-1]["proba_equal"] = rows[-2]["proba_equal"] = bool(np.array_equal(proba["pickle"], proba["shared"]))
+    return pd.DataFrame(rows)
+
+
+# ------------------------------------------------------------
+# ABT (arquivos brutos -> model_df)
+# ------------------------------------------------------------
+def make_synthetic_applications(ids, model_df_path: str = "data/credit/model_df.parquet", seed: int = 42):
+    """
+    Cadastro no formato clients_clean (entrada do notebook 02) reamostrando o
+    model_df: renda de volta para R$, M/F, Y/N, target heurístico em `target`.
+    """
+    base = pd.read_parquet(model_df_path)
+    rng = np.random.default_rng(seed)
+    df = base.iloc[rng.integers(0, len(base), len(ids))].reset_index(drop=True)
+    df["ID"] = np.asarray(ids)
+    df["CODE_GENDER"] = np.where(df["CODE_GENDER"] == 1, "F", "M")
+    df["FLAG_OWN_CAR"] = np.where(df["FLAG_OWN_CAR"] == 1, "Y", "N")
+    df["FLAG_OWN_REALTY"] = np.where(df["FLAG_OWN_REALTY"] == 1, "Y", "N")
+    df["amt_income_month"] = np.expm1(df["amt_income_month"])
+    df["renda_per_capita"] = np.expm1(df["renda_per_capita"])
+    df["OCCUPATION_TYPE"] = df["OCCUPATION_TYPE"].astype(object).replace("Missing", None)
+    df["contact"] = 1
+    df = df.drop(columns=["target"]).rename(columns={"target_heuristic": "target"})
+    cols = ["ID", "CODE_GENDER", "FLAG_OWN_CAR", "FLAG_OWN_REALTY", "CNT_CHILDREN", "NAME_INCOME_TYPE",
+            "NAME_EDUCATION_TYPE", "NAME_FAMILY_STATUS", "NAME_HOUSING_TYPE", "OCCUPATION_TYPE", "CNT_FAM_MEMBERS",
+            "years", "years_employed", "amt_income_month", "renda_per_capita", "contact", "target"]
+    return df[cols].astype({c: object for c in ["NAME_INCOME_TYPE", "NAME_EDUCATION_TYPE", "NAME_FAMILY_STATUS",
+                                                 "NAME_HOUSING_TYPE"]})
+
+
+def _notebook_abt(clients: pd.DataFrame, df_record: pd.DataFrame) -> pd.DataFrame:
+    """
+    Referência: as células dos notebooks 02/03 (clients_clean + credit_record
+    -> model_df), sem mudanças de lógica.
+    """
+    from .abt_builder import build_client_features
+    df = build_client_features(clients)
+
+    SNAPSHOT = -6
+    vintage = (
+        df_record[df_record["MONTHS_BALANCE"] <= 0]
+        .groupby("ID")["MONTHS_BALANCE"].min().abs()
+        .rename("vintage")
+        .reset_index()
+    )
+    credit_df = df_record.copy()
+    credit_df = credit_df[(credit_df["MONTHS_BALANCE"] <= 0) & (credit_df["MONTHS_BALANCE"] >= SNAPSHOT)]
+    credit_df["bad_flag"] = credit_df["STATUS"].isin(["2", "3", "4", "5"]).astype(int)
+    hist = credit_df.groupby("ID").agg(target=("bad_flag", "max"), meses_obs=("MONTHS_BALANCE", "count")).reset_index()
+    hist = hist[hist["meses_obs"] >= 6]
+    target_df = hist[["ID", "target"]]
+
+    from .features_history import BAD, STATUS_MAP
+    df_record = credit_df.copy()
+    df_record["MONTHS_BALANCE"] = pd.to_numeric(df_record["MONTHS_BALANCE"], errors="coerce")
+    df_record["STATUS"] = df_record["STATUS"].astype(str)
+    w = df_record[(df_record["MONTHS_BALANCE"] <= SNAPSHOT) & (df_record["MONTHS_BALANCE"] >= SNAPSHOT - 12)].copy()
+    w["STATUS"] = w["STATUS"].map(STATUS_MAP).fillna(0).astype(int)
+    w = w.sort_values(["ID", "MONTHS_BALANCE"], ascending=[True, False])
+    agg = w.groupby("ID").agg(
+        max_status=("STATUS", "max"), last_status=("STATUS", "first"),
+        n_months=("MONTHS_BALANCE", "count"), last_month=("MONTHS_BALANCE", "max"),
+    ).reset_index()
+    tmp_bad = w[w["STATUS"].isin(BAD)].copy()
+    last_bad = tmp_bad.groupby("ID")["MONTHS_BALANCE"].max().rename("last_bad").reset_index()
+    hist_features = vintage.merge(agg, on="ID", how="left").merge(last_bad, on="ID", how="left")
+    hist_features["last_bad"] = hist_features["last_bad"].fillna(-1)
+    for c in ["max_status", "last_status", "n_months", "last_month"]:
+        hist_features[c] = pd.to_numeric(hist_features[c], errors="coerce").fillna(0).astype(int)
+
+    final_df = df.merge(hist_features, on="ID", how="inner")
+    return final_df.merge(target_df, on="ID", how="inner")
+
+
+def benchmark_abt(record_counts=(1_000_000, 10_000_000), chunk_rows: int = 1_000_000, n_jobs: int = -1,
+                  reference: bool = True) -> pd.DataFrame:
+    """
+    credit_record sintético (parquet em row groups) -> build_abt, contra a
+    referência dos notebooks em memória. Paridade por abt_diff (todas as
+    colunas, alinhado por ID) e ida/volta pelo parquet particionado.
+    """
+    import pyarrow.parquet as pq
+    from .abt_builder import build_abt, read_abt, abt_diff
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in record_counts:
+            records = make_synthetic_records(n)
+            records["STATUS"] = records["STATUS"].astype(str)
+            clients = make_synthetic_applications(np.unique(records["ID"].to_numpy()))
+            rec_path = os.path.join(tmp, f"records_{n}.parquet")
+            pq.write_table(pa_table(records), rec_path, row_group_size=min(chunk_rows, 1_000_000))
+
+            report = []
+            t_build, abt = _timeit(lambda: build_abt(clients, rec_path, out_dir=os.path.join(tmp, f"abt_{n}"),
+                                                     chunk_rows=chunk_rows, n_jobs=n_jobs, report=report))
+            row = {"record_rows": n, "abt_rows": len(abt), "chunks": report[-1]["chunks"],
+                   "build_s": round(t_build, 2), "rows_per_s": int(n / t_build)}
+
+            back = read_abt(os.path.join(tmp, f"abt_{n}"))
+            row["roundtrip_mismatches"] = int(abt_diff(back, abt)["mismatches"].sum())
+            if reference:
+                t_ref, ref = _timeit(lambda: _notebook_abt(clients, records))
+                diff = abt_diff(abt, ref)
+                row.update({
+                    "notebook_s": round(t_ref, 2),
+                    "same_ids": bool(diff.attrs["only_in_abt"] == diff.attrs["only_in_reference"] == 0),
+                    "mismatches": int(diff["mismatches"].sum()),
+                    "same_dtypes": bool((diff["dtype"] == diff["reference_dtype"]).all()),
+                })
+            rows.append(row)
+            del records, clients, abt, back
+    return pd.DataFrame(rows)
+
+
+# ------------------------------------------------------------
+# Coorte (kNN do simulador)
+# ------------------------------------------------------------
+def benchmark_cohort_index(score_path: str = "data/credit/score_df.parquet", k: int = 100,
+                           n_queries: int = 200) -> pd.DataFrame:
+    """
+    CohortIndex (BallTree) x força bruta (todas as distâncias) para um
+    solicitante por vez, como no simulador. Paridade: mesmas distâncias
+    dos k vizinhos.
+    """
+    from .cohort_index import CohortIndex
+
+    score_df = pd.read_parquet(score_path)
+    t_build, index = _timeit(lambda: CohortIndex.build(score_df))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cohort.joblib")
+        index.save(path)
+        size_kb = os.path.getsize(path) / 1024
+        t_load, index = _timeit(lambda: CohortIndex.load(path))
+
+    encoded = index.encode(score_df)
+    rows = score_df.sample(n_queries, random_state=0)
+    tree_ms, brute_ms, same = [], [], True
+    for i in range(len(rows)):
+        one = rows.iloc[[i]]
+        t0 = time.perf_counter()
+        _, nb = index.cohort(one, k=k)
+        tree_ms.append((time.perf_counter() - t0) * 1000)
+
+        t0 = time.perf_counter()
+        d = np.sqrt(((encoded - index.encode(one)) ** 2).sum(axis=1))
+        brute = np.sort(d)[:k]
+        brute_ms.append((time.perf_counter() - t0) * 1000)
+        same &= bool(np.allclose(brute, nb["distance"].to_numpy()))
+
+    return pd.DataFrame([{
+        "rows": len(score_df), "dims": encoded.shape[1], "k": k,
+        "build_s": round(t_build, 2), "load_ms": round(t_load * 1000, 1), "artifact_kb": round(size_kb),
+        "query_p50_ms": round(float(np.median(tree_ms)), 2), "query_p99_ms": round(float(np.quantile(tree_ms, 0.99)), 2),
+        "brute_p50_ms": round(float(np.median(brute_ms)), 2), "same_neighbors": same,
+    }])
+
+
+def benchmark_vintage(n_records: int = 10_000_000, n_deltas: int = 12, seed: int = 42) -> pd.DataFrame:
+    """
+    Curvas de safra: recálculo completo x VintageEngine.update mês a mês.
+    Carga inicial até o mês -n_deltas; cada mês seguinte chega como delta
+    (MONTHS_BALANCE=0, as_of=mês). Paridade: matriz final igual à do
+    recálculo completo, e reaplicar um delta não muda nada.
+    """
+    from .vintage_analytics import VintageEngine, load_cohorts
+
+    records = make_synthetic_records(n_records, seed=seed)
+    t_full, full = _timeit(lambda: VintageEngine.from_records(records, as_of=0))
+
+    initial = records[records["MONTHS_BALANCE"] <= -n_deltas].copy()
+    initial["MONTHS_BALANCE"] += n_deltas
+    engine = VintageEngine.from_records(initial, as_of=-n_deltas)
+    deltas = [
+        (m, records[records["MONTHS_BALANCE"] == m].assign(MONTHS_BALANCE=0))
+        for m in range(-n_deltas + 1, 1)
+    ]
+    update_s = []
+    for as_of, delta in deltas:
+        t, _ = _timeit(lambda: engine.update(delta, as_of=as_of))
+        update_s.append(t)
+    same = engine.matrix == full.matrix
+    engine.update(deltas[len(deltas) // 2][1], as_of=deltas[len(deltas) // 2][0])
+    idempotent = engine.matrix == full.matrix
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine.save(tmp)
+        cohorts_kb = os.path.getsize(os.path.join(tmp, "cohorts.json")) / 1024
+        accounts_mb = os.path.getsize(os.path.join(tmp, "accounts.parquet")) / 1024 ** 2
+        t_load, matrix = _timeit(lambda: load_cohorts(tmp), repeat=5)
+        t_curves, _ = _timeit(lambda: matrix.curves(), repeat=5)
+
+    return pd.DataFrame([{
+        "records": len(records), "accounts": len(full.accounts), "cohorts": int((full.matrix.n_accounts > 0).sum()),
+        "full_s": round(t_full, 2), "update_ms_mean": round(float(np.mean(update_s)) * 1000, 1),
+        "delta_rows_mean": int(np.mean([len(d) for _, d in deltas])),
+        "same_matrix": same, "idempotent": idempotent,
+        "cohorts_kb": round(cohorts_kb, 1), "accounts_mb": round(accounts_mb, 1),
+        "load_ms": round(t_load * 1000, 2), "curves_ms": round(t_curves * 1000, 2),
+    }])
+
+
+def benchmark_what_if(statuses=("0", "1", "2", "5", "C", "X"), n_months: int = 12, repeat: int = 3) -> pd.DataFrame:
+    """
+    what_if_grid (perturbações padrão) para um cliente do model_df com o
+    mês mais recente em cada STATUS, incluindo "C"/"X". Paridade: o score
+    da variante base é o do apply_pipeline_with_history nos registros
+    originais (C/X valem 0 nas features do histórico).
+    """
+    from .what_if import what_if_grid
+    from .features_history import STATUS_MAP
+    from .train_apply import apply_pipeline_with_history
+
+    pipeline, score_params = _load_pipeline_v3()
+    clients, feature_columns = make_synthetic_clients(1)
+
+    rows = []
+    for status in statuses:
+        records = pd.DataFrame({
+            "ID": 0,
+            "MONTHS_BALANCE": -np.arange(n_months),
+            "STATUS": [status] + ["0"] * (n_months - 1),
+        })
+        t, out = _timeit(lambda: what_if_grid(clients, records, pipeline, score_params, income_scale="log"), repeat)
+        direct = apply_pipeline_with_history(clients, records, pipeline, score_params, feature_columns)
+        rows.append({
+            "latest_status": status,
+            "base_STATUS": out["base"]["STATUS"],
+            "expected_STATUS": float(STATUS_MAP[status]),
+            "variants": len(out["surface"]),
+            "what_if_ms": round(t * 1000, 1),
+            "base_score": round(out["base"]["score"], 3),
+            "apply_score": round(float(direct["score"].iloc[0]), 3),
+            "same_score": bool(np.isclose(out["base"]["score"], float(direct["score"].iloc[0]), atol=1e-3)),
+        })
+    return pd.DataFrame(rows)
+
+
+def pa_table(df: pd.DataFrame):
+    import pyarrow as pa
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+# ------------------------------------------------------------
+# CLI
+# ------------------------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do projeto de credit scoring")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    p_dt = sub.add_parser("dtypes", help="schema compacto x dtypes originais: memória e tempo de predict")
+    p_dt.add_argument("--clients", type=int, default=100_000)
+
+    p_hist = sub.add_parser("history", help="pandas x duckdb x sqlite nas history features")
+    p_hist.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000, 5_000_000])
+    p_hist.add_argument("--backends", nargs="+", default=["pandas", "duckdb", "sqlite"])
+    p_hist.add_argument("--repeat", type=int, default=1)
+
+    p_val = sub.add_parser("validation", help="custo da validação/quarentena do histórico")
+    p_val.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    p_val.add_argument("--repeat", type=int, default=1)
+
+    p_multi = sub.add_parser("multi", help="history features multi-janela x uma chamada por janela (paridade)")
+    p_multi.add_argument("--rows", type=int, nargs="+", default=[2_000_000])
+    p_multi.add_argument("--repeat", type=int, default=1)
+
+    p_arrow = sub.add_parser("arrow", help="apply com entrada/saída pandas x Arrow")
+    p_arrow.add_argument("--clients", type=int, nargs="+", default=[100_000, 1_000_000])
+    p_arrow.add_argument("--repeat", type=int, default=1)
+
+    p_lookup = sub.add_parser("lookup", help="inferência booster x tabelas depth-2")
+    p_lookup.add_argument("--clients", type=int, nargs="+", default=[100_000, 1_000_000])
+    p_lookup.add_argument("--repeat", type=int, default=3)
+
+    p_f32 = sub.add_parser("float32", help="apply em float64 x float32 (tempo, memória, paridade)")
+    p_f32.add_argument("--clients", type=int, nargs="+", default=[100_000, 1_000_000])
+    p_f32.add_argument("--repeat", type=int, default=1)
+
+    p_dedup = sub.add_parser("dedup", help="apply com e sem deduplicação de vetores de features")
+    p_dedup.add_argument("--clients", type=int, nargs="+", default=[100_000, 1_000_000])
+    p_dedup.add_argument("--repeat", type=int, default=1)
+
+    p_db = sub.add_parser("db", help="histórico do banco: linha a linha x tabela inteira x db_loader")
+    p_db.add_argument("--clients", type=int, nargs="+", default=[100_000])
+    p_db.add_argument("--engines", nargs="+", default=["sqlite", "duckdb"])
+
+    p_imp = sub.add_parser("imports", help="tempo de import dos entry points x orçamento (-X importtime)")
+    p_imp.add_argument("--repeat", type=int, default=3)
+
+    p_wrk = sub.add_parser("workers", help="pool de processos: pickle por worker x memória compartilhada")
+    p_wrk.add_argument("--clients", type=int, nargs="+", default=[1_000_000])
+    p_wrk.add_argument("--workers", type=int, default=4)
+
+    p_abt = sub.add_parser("abt", help="ABT dos arquivos brutos em chunks x notebooks (paridade, tempo)")
+    p_abt.add_argument("--records", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    p_abt.add_argument("--chunk-rows", type=int, default=1_000_000)
+    p_abt.add_argument("--jobs", type=int, default=-1)
+    p_abt.add_argument("--no-reference", action="store_true", help="só o builder (ex.: 100M linhas)")
+
+    p_coh = sub.add_parser("cohort", help="kNN de clientes similares: BallTree x força bruta")
+    p_coh.add_argument("--k", type=int, default=100)
+    p_coh.add_argument("--queries", type=int, default=200)
+
+    p_wif = sub.add_parser("whatif", help="what-if com o último STATUS em 0-5/C/X: base = apply")
+    p_wif.add_argument("--repeat", type=int, default=3)
+
+    p_vin = sub.add_parser("vintage", help="curvas de safra: recálculo completo x updates mensais incrementais")
+    p_vin.add_argument("--records", type=int, default=10_000_000)
+    p_vin.add_argument("--deltas", type=int, default=12)
+
+    args = parser.parse_args(argv)
+
+    if args.bench == "dtypes":
+        print(benchmark_compact_dtypes(args.clients).to_string(index=False))
+    elif args.bench == "history":
+        print(benchmark_history_backends(args.rows, args.backends, repeat=args.repeat).to_string(index=False))
+    elif args.bench == "validation":
+        print(benchmark_validation(args.rows, repeat=args.repeat).to_string(index=False))
+    elif args.bench == "multi":
+        out = benchmark_history_multi(args.rows, repeat=args.repeat)
+        print(out.to_string(index=False))
+        if not (out["same_as_single"] & out["same_after_merge"]).all():
+            sys.exit(1)
+    elif args.bench == "arrow":
+        print(benchmark_arrow_apply(args.clients, repeat=args.repeat).to_string(index=False))
+    elif args.bench == "lookup":
+        out = benchmark_lookup_scorer(args.clients, repeat=args.repeat)
+        print(out.to_string(index=False))
+        if not out["ok"].all():
+            sys.exit(1)
+    elif args.bench == "float32":
+        print(benchmark_float32(args.clients, repeat=args.repeat).to_string(index=False))
+    elif args.bench == "dedup":
+        print(benchmark_dedup(args.clients, repeat=args.repeat).to_string(index=False))
+    elif args.bench == "db":
+        print(benchmark_db_loader(args.clients, engines=args.engines).to_string(index=False))
+    elif args.bench == "workers":
+        print(benchmark_shared_workers(args.clients, workers=args.workers).to_string(index=False))
+    elif args.bench == "abt":
+        print(benchmark_abt(args.records, chunk_rows=args.chunk_rows, n_jobs=args.jobs,
+                            reference=not args.no_reference).to_string(index=False))
+    elif args.bench == "cohort":
+        print(benchmark_cohort_index(k=args.k, n_queries=args.queries).to_string(index=False))
+    elif args.bench == "whatif":
+        out = benchmark_what_if(repeat=args.repeat)
+        print(out.to_string(index=False))
+        if not (out["same_score"] & (out["base_STATUS"] == out["expected_STATUS"])).all():
+            sys.exit(1)
+    elif args.bench == "vintage":
+        print(benchmark_vintage(args.records, n_deltas=args.deltas).to_string(index=False))
+    elif args.bench == "imports":
+        out = benchmark_import_time(repeat=args.repeat)
+        print(out.to_string(index=False))
+        # falha (exit 1) se algum entry point estourar o orçamento
+        if (out["ok"] == False).any():  # noqa: E712
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import numpy as np
+from joblib import Parallel, delayed
+
+
+# ------------------------------------------------------------
+# Preparação: scores ordenados agrupados por empate
+# ------------------------------------------------------------
+def _tie_groups(y, proba):
+    """
+    Ordena as probas uma vez e conta bons/maus por valor distinto.
+
+    Como AUC e KS só dependem da ordem, reamostrar linhas equivale a
+    reamostrar essas contagens:
+      - Poisson(1) por linha  -> Poisson(n_pos_g) / Poisson(n_neg_g) por grupo
+      - multinomial por linha -> multinomial sobre as células (grupo, classe)
+    """
+    y = np.asarray(y).astype(bool)
+    _, inverse = np.unique(np.asarray(proba, dtype=np.float64), return_inverse=True)
+    n_groups = inverse.max() + 1 if len(inverse) else 0
+    pos = np.bincount(inverse[y], minlength=n_groups).astype(np.float64)
+    neg = np.bincount(inverse[~y], minlength=n_groups).astype(np.float64)
+    return pos, neg
+
+
+def _weighted_auc_ks(wp: np.ndarray, wn: np.ndarray):
+    """
+    AUC e KS para B reamostras de uma vez.
+
+    wp, wn: (B, G) pesos de maus/bons por grupo de empate (proba crescente).
+    AUC = P(proba_mau > proba_bom) + 0.5 P(empate)  (estatística de Mann-Whitney)
+    """
+    tot_p = wp.sum(axis=1)
+    tot_n = wn.sum(axis=1)
+    cum_n = np.cumsum(wn, axis=1)
+    neg_below = cum_n - wn
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        auc = (wp * (neg_below + 0.5 * wn)).sum(axis=1) / (tot_p * tot_n)
+        cdf_p = np.cumsum(wp, axis=1) / tot_p[:, None]
+        cdf_n = cum_n / tot_n[:, None]
+        ks = np.abs(cdf_p - cdf_n).max(axis=1)
+    return auc, ks
+
+
+def _bootstrap_chunk(pos, neg, n_boot, method, seed):
+    rng = np.random.default_rng(seed)
+    if method == "poisson":
+        wp = rng.poisson(pos, size=(n_boot, len(pos)))
+        wn = rng.poisson(neg, size=(n_boot, len(neg)))
+    elif method == "multinomial":
+        counts = np.concatenate([pos, neg])
+        n = counts.sum()
+        draws = rng.multinomial(int(n), counts / n, size=n_boot)
+        wp, wn = draws[:, :len(pos)], draws[:, len(pos):]
+    else:
+        raise ValueError(f"method inválido: {method!r} (use 'poisson' ou 'multinomial')")
+    return _weighted_auc_ks(wp.astype(np.float64), wn.astype(np.float64))
+
+
+# ------------------------------------------------------------
+# API
+# ------------------------------------------------------------
+def bootstrap_auc_ks(
+    y,
+    proba,
+    n_boot: int = 2000,
+    method: str = "poisson",
+    max_cells: int = 20_000_000,
+    n_jobs: int = 1,
+    seed: int = 42,
+) -> dict:
+    """
+    Distribuição bootstrap de AUC e KS, vetorizada.
+
+    - method: "poisson" (pesos Poisson(1), padrão) ou "multinomial"
+      (reamostragem clássica com reposição de n linhas)
+    - max_cells: limita B x G por bloco (memória); os blocos rodam em
+      `n_jobs` processos com sementes independentes (SeedSequence)
+
+    Retorna {"auc": ndarray(n_boot), "ks": ndarray(n_boot)}.
+    """
+    pos, neg = _tie_groups(y, proba)
+    chunk = max(1, min(n_boot, max_cells // max(len(pos), 1)))
+    sizes = [min(chunk, n_boot - start) for start in range(0, n_boot, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    if n_jobs == 1 or len(sizes) == 1:
+        parts = [_bootstrap_chunk(pos, neg, s, method, sd) for s, sd in zip(sizes, seeds)]
+    else:
+        parts = Parallel(n_jobs=n_jobs)(
+            delayed(_bootstrap_chunk)(pos, neg, s, method, sd) for s, sd in zip(sizes, seeds)
+        )
+
+    return {
+        "auc": np.concatenate([p[0] for p in parts]),
+        "ks": np.concatenate([p[1] for p in parts]),
+    }
+
+
+def percentile_ci(samples, alpha: float = 0.05) -> tuple[float, float]:
+    s = np.asarray(samples, dtype=float)
+    s = s[~np.isnan(s)]
+    if len(s) == 0:
+        return float("nan"), float("nan")
+    lo, hi = np.quantile(s, [alpha / 2, 1 - alpha / 2])
+    return float(lo), float(hi)
+
+
+def bootstrap_metrics_ci(
+    y_train,
+    proba_train,
+    y_test,
+    proba_test,
+    n_boot: int = 2000,
+    alpha: float = 0.05,
+    method: str = "poisson",
+    n_jobs: int = 1,
+    seed: int = 42,
+) -> dict:
+    """
+    Intervalos de confiança (percentil) para auc_train, auc_test, gap_auc e ks_test.
+
+    Treino e teste são reamostrados de forma independente; o gap de cada
+    réplica é auc_train_b - auc_test_b.
+
+    Retorna {métrica: {"point", "lo", "hi", "std"}} + "n_boot"/"alpha".
+    """
+    seq_train, seq_test = np.random.SeedSequence(seed).spawn(2)
+    bt = bootstrap_auc_ks(y_train, proba_train, n_boot, method, n_jobs=n_jobs,
+                          seed=seq_train.generate_state(1)[0])
+    bs = bootstrap_auc_ks(y_test, proba_test, n_boot, method, n_jobs=n_jobs,
+                          seed=seq_test.generate_state(1)[0])
+
+    point_train = _weighted_auc_ks(*(a[None, :] for a in _tie_groups(y_train, proba_train)))
+    point_test = _weighted_auc_ks(*(a[None, :] for a in _tie_groups(y_test, proba_test)))
+
+    samples = {
+        "auc_train": (float(point_train[0][0]), bt["auc"]),
+        "auc_test": (float(point_test[0][0]), bs["auc"]),
+        "gap_auc": (float(point_train[0][0] - point_test[0][0]), bt["auc"] - bs["auc"]),
+        "ks_test": (float(point_test[1][0]), bs["ks"]),
+    }
+
+    out = {"n_boot": int(n_boot), "alpha": float(alpha)}
+    for name, (point, s) in samples.items():
+        lo, hi = percentile_ci(s, alpha)
+        out[name] = {"point": point, "lo": lo, "hi": hi, "std": float(np.nanstd(s))}
+    return out
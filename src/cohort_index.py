@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+
+
+# ------------------------------------------------------------
+# Encoding
+# ------------------------------------------------------------
+# Vetor de cada cliente = numéricas padronizadas (z-score da base) +
+# categóricas one-hot com peso 1/sqrt(2): trocar de categoria custa 1 na
+# distância, o mesmo que 1 desvio padrão numa numérica. Renda no formato do
+# score_df/model_df (log1p).
+NUMERIC_FEATURES = [
+    "CODE_GENDER", "years", "CNT_CHILDREN", "CNT_FAM_MEMBERS", "FLAG_OWN_CAR", "FLAG_OWN_REALTY",
+    "years_employed", "amt_income_month", "renda_per_capita", "no_formal_employment", "unclassified_occupation",
+    "max_status", "last_status", "n_months",
+]
+CATEGORICAL_FEATURES = ["NAME_INCOME_TYPE", "NAME_EDUCATION_TYPE", "NAME_FAMILY_STATUS", "NAME_HOUSING_TYPE",
+                        "OCCUPATION_TYPE"]
+INCOME_COLS = ["amt_income_month", "renda_per_capita"]
+
+COHORT_K = 100
+SCORE_QUANTILES = (0.10, 0.25, 0.50, 0.75, 0.90)
+FORMAT_VERSION = 1
+
+
+class CohortIndex:
+    """
+    kNN sobre os clientes escorados (score_df): para um solicitante, os k
+    clientes históricos mais parecidos, a inadimplência observada (y_true)
+    e a distribuição de score deles.
+
+    - build(score_df): encoding + BallTree (sklearn), uma vez
+    - save/load: artefato joblib (árvore, encoder e desfechos por linha;
+      sem as features dos clientes)
+    - query(clients, k): uma linha de estatísticas da coorte por cliente
+    - neighbors(client, k): os vizinhos (distância, y_true, score, decision)
+    - cohort(client, k): as duas coisas com UMA consulta na árvore
+    - fingerprint: de onde o índice saiu (ex.: versão do modelo + score_df),
+      salvo no artefato para quem carrega decidir se ainda vale
+
+    income_scale="raw": renda em R$ (simulador do app), vira log1p aqui;
+    "log": renda já em log (score_df, model_df). Mesmo contrato do what_if_grid.
+    """
+    def __init__(self, numeric: dict, categories: dict, tree, outcomes: pd.DataFrame,
+                 fingerprint: dict | None = None):
+        self.numeric = numeric
+        self.categories = categories
+        self.tree = tree
+        self.outcomes = outcomes
+        self.fingerprint = fingerprint
+        self.base_default_rate = float(outcomes["y_true"].mean()) if len(outcomes) else float("nan")
+
+    # --------------------------- build ---------------------------
+    @classmethod
+    def build(cls, score_df: pd.DataFrame, numeric_features=None, categorical_features=None,
+              target_col: str = "y_true", leaf_size: int = 40,
+              fingerprint: dict | None = None) -> "CohortIndex":
+        from sklearn.neighbors import BallTree
+
+        numeric_features = [c for c in (numeric_features or NUMERIC_FEATURES) if c in score_df.columns]
+        categorical_features = [c for c in (categorical_features or CATEGORICAL_FEATURES) if c in score_df.columns]
+
+        numeric = {}
+        for c in numeric_features:
+            x = score_df[c].to_numpy(dtype=float)
+            std = np.nanstd(x)
+            numeric[c] = (float(np.nanmedian(x)), float(np.nanmean(x)), float(std) if std > 0 else 1.0)
+        categories = {
+            c: sorted(score_df[c].dropna().astype(str).unique().tolist())
+            for c in categorical_features
+        }
+
+        outcomes = pd.DataFrame({
+            "y_true": score_df[target_col].to_numpy(dtype=np.int8),
+            "score": score_df["score"].to_numpy(dtype=np.float32),
+        })
+        if "decision" in score_df.columns:
+            outcomes["decision"] = score_df["decision"].astype("category").to_numpy()
+
+        index = cls(numeric, categories, None, outcomes, fingerprint=fingerprint)
+        index.tree = BallTree(index.encode(score_df, income_scale="log"), leaf_size=leaf_size)
+        return index
+
+    def encode(self, df: pd.DataFrame, income_scale: str = "log") -> np.ndarray:
+        if income_scale not in ("log", "raw"):
+            raise ValueError("income_scale deve ser 'raw' ou 'log'")
+        blocks = []
+        for c, (median, mean, std) in self.numeric.items():
+            x = df[c].to_numpy(dtype=float) if c in df.columns else np.full(len(df), np.nan)
+            if income_scale == "raw" and c in INCOME_COLS:
+                x = np.log1p(np.clip(x, 0, None))
+            x = np.where(np.isnan(x), median, x)
+            blocks.append(((x - mean) / std)[:, None])
+
+        weight = 1 / np.sqrt(2)
+        for c, cats in self.categories.items():
+            values = df[c].astype(str).str.lower() if c in df.columns else pd.Series([""] * len(df))
+            # sem diferenciar maiúsculas ("MISSING" do simulador = "Missing");
+            # categoria fora da base -> vetor zero (meio caminho de todas)
+            codes = pd.Index([v.lower() for v in cats]).get_indexer(values)
+            onehot = np.zeros((len(df), len(cats)))
+            hit = codes >= 0
+            onehot[np.flatnonzero(hit), codes[hit]] = weight
+            blocks.append(onehot)
+        return np.hstack(blocks) if blocks else np.zeros((len(df), 0))
+
+    # --------------------------- consulta ---------------------------
+    def _knn(self, clients: pd.DataFrame, k: int, income_scale: str):
+        k = min(k, len(self.outcomes))
+        return self.tree.query(self.encode(clients, income_scale=income_scale), k=k)
+
+    def query(self, clients: pd.DataFrame, k: int = COHORT_K, income_scale: str = "log") -> pd.DataFrame:
+        """
+        Estatísticas da coorte (k vizinhos) por cliente:
+          cohort_n, cohort_bad, cohort_default_rate, base_default_rate,
+          cohort_score_mean, cohort_score_pXX, mean_distance
+        """
+        return self._stats(*self._knn(clients, k, income_scale), index=clients.index)
+
+    def _stats(self, dist: np.ndarray, idx: np.ndarray, index) -> pd.DataFrame:
+        y = self.outcomes["y_true"].to_numpy()[idx]
+        s = self.outcomes["score"].to_numpy()[idx]
+
+        out = pd.DataFrame({
+            "cohort_n": np.full(len(idx), idx.shape[1]),
+            "cohort_bad": y.sum(axis=1),
+            "cohort_default_rate": y.mean(axis=1),
+            "base_default_rate": self.base_default_rate,
+            "cohort_score_mean": s.mean(axis=1),
+        }, index=index)
+        for q, v in zip(SCORE_QUANTILES, np.quantile(s, SCORE_QUANTILES, axis=1)):
+            out[f"cohort_score_p{int(q * 100)}"] = v
+        out["mean_distance"] = dist.mean(axis=1)
+        return out
+
+    def neighbors(self, client: pd.DataFrame, k: int = COHORT_K, income_scale: str = "log") -> pd.DataFrame:
+        """
+        Os k vizinhos do primeiro cliente de `client` (posição no score_df,
+        distância e desfechos), do mais próximo ao mais distante.
+        """
+        dist, idx = self._knn(client.iloc[:1], k, income_scale)
+        return self._neighbors(dist[0], idx[0])
+
+    def _neighbors(self, dist: np.ndarray, idx: np.ndarray) -> pd.DataFrame:
+        out = self.outcomes.iloc[idx].reset_index(drop=True)
+        out.insert(0, "row", idx)
+        out.insert(1, "distance", dist)
+        return out
+
+    def cohort(self, client: pd.DataFrame, k: int = COHORT_K, income_scale: str = "log"):
+        """
+        (estatísticas, vizinhos) do primeiro cliente de `client`: o mesmo que
+        query(...).iloc[0] e neighbors(...), com uma consulta só.
+        """
+        client = client.iloc[:1]
+        dist, idx = self._knn(client, k, income_scale)
+        return self._stats(dist, idx, index=client.index).iloc[0], self._neighbors(dist[0], idx[0])
+
+    @staticmethod
+    def score_percentile(score: float, cohort_scores) -> float:
+        """
+        % da coorte com score abaixo de `score`.
+        """
+        cohort_scores = np.asarray(cohort_scores)
+        return float((cohort_scores < score).mean() * 100) if len(cohort_scores) else float("nan")
+
+    # --------------------------- artefato ---------------------------
+    def save(self, path) -> None:
+        import joblib
+        joblib.dump({
+            "version": FORMAT_VERSION,
+            "numeric": self.numeric,
+            "categories": self.categories,
+            "tree": self.tree,
+            "outcomes": self.outcomes,
+            "fingerprint": self.fingerprint,
+        }, path)
+
+    @classmethod
+    def load(cls, path) -> "CohortIndex":
+        import joblib
+        state = joblib.load(path)
+        if state.get("version") != FORMAT_VERSION:
+            raise ValueError(f"cohort index versão {state.get('version')} (esperado {FORMAT_VERSION})")
+        return cls(state["numeric"], state["categories"], state["tree"], state["outcomes"],
+                   fingerprint=state.get("fingerprint"))
+
+    def __len__(self) -> int:
+        return len(self.outcomes)
@@ -0,0 +1,16 @@
+"""
+Entry point do dashboard (app/app.py): leitura de resultados, simulador,
+what-if, coorte de similares, curvas de safra e registry. plotly fica no app,
+importado só nas páginas com gráfico.
+"""
+from src.scoring import rating, decision_by_score, DEFAULT_SCORE_CUTS
+from src.train_apply import apply_pipeline_to_new_data
+from src.features_history import build_history_features
+from src.dataset_builder import build_scoring_df, prepare_X_for_model
+from src.score_cache import ScoreCache
+from src.model_registry import ModelRegistry
+from src.metrics import ScoreHistogram
+from src.results_store import read_results, DASHBOARD_COLUMNS
+from src.what_if import what_if_grid
+from src.cohort_index import CohortIndex
+from src.vintage_analytics import CohortMatrix, load_cohorts
@@ -1,29 +1,41 @@
 import pandas as pd
 
 from .features_history import build_history_features
+from .dtypes import compact_dtypes
 
-def build_scoring_df(df_clients_new: pd.DataFrame, hist_features: pd.DataFrame) -> pd.DataFrame:
+def build_scoring_df(
+    df_clients_new: pd.DataFrame,
+    hist_features: pd.DataFrame,
+    report: list | None = None,
+    validated: bool = False,
+) -> pd.DataFrame:
     """
     Monta o dataset de scoring (produção):
     - merge cadastro + features do histórico (já pré-calculadas)
     - aplica defaults
     - garante preenchimento dos status NUMÉRICOS
+    - aplica o schema compacto (src/dtypes.py) no cadastro e no resultado
+
+    validated=True: cadastro já veio de validate_clients (src/validation.py),
+    já está no schema compacto.
     """
+    if not validated:
+        df_clients_new = compact_dtypes(df_clients_new, stage="scoring:clients", report=report)
     df_new = df_clients_new.merge(hist_features, on="ID", how="left")
 
     # defaults (igual produção real)
     if "n_months" in df_new.columns:
-        df_new["n_months"] = df_new["n_months"].fillna(0).astype(int)
+        df_new["n_months"] = df_new["n_months"].fillna(0)
 
     if "vintage" in df_new.columns:
-        df_new["vintage"] = df_new["vintage"].fillna(0).astype(int)
+        df_new["vintage"] = df_new["vintage"].fillna(0)
 
     # ✅ status NUMÉRICOS (novo)
     for c in ["max_status_num", "last_status_num"]:
         if c in df_new.columns:
-            df_new[c] = df_new[c].fillna(0).astype(int)
+            df_new[c] = df_new[c].fillna(0)
 
-    return df_new
+    return compact_dtypes(df_new, stage="scoring:merged", report=report)
 
 def _build_scoring_dataset(
     df_clients: pd.DataFrame,
@@ -46,17 +58,17 @@ def _build_scoring_dataset(
 
     # Defaults para quem NÃO tem histórico
     if "n_months" in df.columns:
-        df["n_months"] = df["n_months"].fillna(0).astype(int)
+        df["n_months"] = df["n_months"].fillna(0)
 
     if "vintage" in df.columns:
-        df["vintage"] = df["vintage"].fillna(0).astype(int)
+        df["vintage"] = df["vintage"].fillna(0)
 
     # ✅ status NUMÉRICOS (novo)
     for c in ["max_status", "last_status", "n_months", "vintage", "last_month"]:
         if c in df.columns:
             df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0)
 
-    return df
+    return compact_dtypes(df)
 
 def prepare_X_for_model(df_new: pd.DataFrame):
     """
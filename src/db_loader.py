@@ -0,0 +1,403 @@
+import queue
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from .dtypes import compact_dtypes
+from .features_history import build_history_features
+
+
+# ------------------------------------------------------------
+# Tabelas de origem (mesmos nomes do ambiente PostgreSQL)
+# ------------------------------------------------------------
+CLIENTS_TABLE = "clients"
+RECORDS_TABLE = "credit_record"
+RECORD_COLUMNS = ["ID", "MONTHS_BALANCE", "STATUS"]
+
+# IN (...) com no máximo esse número de parâmetros por consulta
+# (SQLite aceita 32766, PostgreSQL 65535)
+ID_PARAMS_PER_QUERY = 5_000
+
+
+# ------------------------------------------------------------
+# Pool de conexões
+# ------------------------------------------------------------
+class ConnectionPool:
+    """
+    Pool simples (thread-safe) de conexões DB-API.
+
+    connect: função sem argumentos que abre uma conexão nova
+    size: máximo de conexões abertas; acima disso connection() espera
+          alguém devolver
+    on_close: chamado no close() depois de fechar as conexões (ex.: fechar
+              a base do duckdb)
+
+    Uso:
+        with sqlite_pool("credit.db") as pool:
+            df = load_clients(pool, ids=[...])
+    """
+    def __init__(self, connect, size: int = 4, on_close=None):
+        if size < 1:
+            raise ValueError("size deve ser >= 1")
+        self._connect = connect
+        self.size = size
+        self._on_close = on_close
+        self._idle = queue.LifoQueue()
+        self._opened = []
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._opened) < self.size:
+                con = self._connect()
+                self._opened.append(con)
+                return con
+        return self._idle.get()
+
+    @contextmanager
+    def connection(self):
+        con = self._acquire()
+        try:
+            yield con
+        finally:
+            self._idle.put(con)
+
+    def close(self) -> None:
+        with self._lock:
+            for con in self._opened:
+                con.close()
+            self._opened.clear()
+            self._idle = queue.LifoQueue()
+        if self._on_close is not None:
+            self._on_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def sqlite_pool(path: str, size: int = 4) -> ConnectionPool:
+    """
+    Pool sobre um arquivo SQLite (":memory:" não é compartilhado entre
+    conexões; use um arquivo).
+    """
+    import sqlite3
+    return ConnectionPool(lambda: sqlite3.connect(path, check_same_thread=False), size=size)
+
+
+def duckdb_pool(path: str = ":memory:", size: int = 4) -> ConnectionPool:
+    """
+    Pool sobre uma base DuckDB: cada conexão do pool é um cursor da mesma
+    base (o jeito do duckdb de usar uma base em várias threads).
+    """
+    try:
+        import duckdb
+    except ImportError as e:
+        raise ImportError("duckdb_pool requer o pacote duckdb (pip install duckdb)") from e
+
+    base = duckdb.connect(path)
+    return ConnectionPool(base.cursor, size=size, on_close=base.close)
+
+
+def postgres_pool(dsn: str, size: int = 4) -> ConnectionPool:
+    """
+    Pool sobre o PostgreSQL (psycopg 3). As leituras usam cursor nomeado
+    (server-side): o servidor manda `chunk_size` linhas por vez.
+    """
+    try:
+        import psycopg
+    except ImportError as e:
+        raise ImportError("postgres_pool requer o pacote psycopg (pip install 'psycopg[binary]')") from e
+
+    return ConnectionPool(lambda: psycopg.connect(dsn), size=size)
+
+
+# ------------------------------------------------------------
+# Leitura em lotes (sem linha a linha, sem puxar a tabela inteira)
+# ------------------------------------------------------------
+def _dialect(con) -> str:
+    module = type(con).__module__.split(".")[0].lstrip("_")
+    if module in ("psycopg", "psycopg2"):
+        return "postgres"
+    return module  # "sqlite3", "duckdb", ...
+
+
+def _placeholder(con) -> str:
+    return "%s" if _dialect(con) == "postgres" else "?"
+
+
+def _ident(con, name: str) -> str:
+    """
+    Nome de coluna no SQL. No PostgreSQL nomes sem aspas viram minúsculas
+    (ID -> id), e as tabelas vêm com ID/MONTHS_BALANCE/STATUS em maiúsculas:
+    lá a coluna vai entre aspas.
+    """
+    return f'"{name}"' if _dialect(con) == "postgres" else name
+
+
+# nomes canônicos das colunas que o pipeline usa (o banco pode devolver em
+# outra caixa, ex.: id/months_balance/status no PostgreSQL)
+_CANONICAL = {c.lower(): c for c in RECORD_COLUMNS}
+
+
+def _canonical_columns(columns) -> list[str]:
+    return [_CANONICAL.get(str(c).lower(), c) for c in columns]
+
+
+def _stream(con, sql: str, params=(), chunk_size: int = 100_000):
+    """
+    Executa `sql` e devolve DataFrames de até `chunk_size` linhas.
+
+    - duckdb: Arrow direto (RecordBatchReader), sem objetos Python por linha
+    - PostgreSQL: cursor nomeado (server-side) com fetchmany
+    - demais DB-API (sqlite3): fetchmany no cursor
+    """
+    dialect = _dialect(con)
+    if dialect == "duckdb":
+        for batch in con.execute(sql, list(params)).to_arrow_reader(chunk_size):
+            if batch.num_rows:
+                df = batch.to_pandas()
+                df.columns = _canonical_columns(df.columns)
+                yield df
+        return
+
+    if dialect == "postgres":
+        cur = con.cursor(name=f"credit_{uuid.uuid4().hex[:12]}")
+        cur.itersize = chunk_size
+    else:
+        cur = con.cursor()
+    try:
+        cur.execute(sql, tuple(params))
+        columns = None
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if columns is None:
+                columns = _canonical_columns(d[0] for d in cur.description)
+            if not rows:
+                break
+            yield pd.DataFrame.from_records(rows, columns=columns)
+    finally:
+        cur.close()
+        if dialect == "postgres":
+            con.rollback()  # encerra a transação aberta pelo cursor nomeado
+
+
+def _id_chunks(ids, size: int = ID_PARAMS_PER_QUERY):
+    ids = np.unique(np.asarray(ids, dtype=np.int64))
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def _where(conditions: list[str]) -> str:
+    return f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+
+def _records_sql(con, table: str, months, id_count: int = 0) -> tuple[str, list]:
+    ph = _placeholder(con)
+    id_col, month_col = _ident(con, "ID"), _ident(con, "MONTHS_BALANCE")
+    conditions, params = [], []
+    if months is not None:
+        conditions.append(f"{month_col} BETWEEN {ph} AND {ph}")
+        params += [int(months[0]), int(months[1])]
+    if id_count:
+        conditions.append(f"{id_col} IN ({', '.join([ph] * id_count)})")
+    cols = ", ".join(_ident(con, c) for c in RECORD_COLUMNS)
+    sql = f"SELECT {cols} FROM {table} {_where(conditions)} ORDER BY {id_col}"
+    return sql, params
+
+
+def _fetch_by_ids(pool, make_sql, ids, chunk_size: int) -> pd.DataFrame:
+    """
+    Uma consulta por fatia de IDs (IN com no máximo ID_PARAMS_PER_QUERY).
+    """
+    parts = []
+    with pool.connection() as con:
+        for chunk in _id_chunks(ids):
+            sql, params = make_sql(con, len(chunk))
+            parts.extend(_stream(con, sql, params + chunk.tolist(), chunk_size))
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+
+def _prefetch(fn, items, workers: int):
+    """
+    map(fn, items) em threads, na ordem, com no máximo `workers` tarefas
+    adiantadas (memória limitada mesmo com milhões de IDs).
+    """
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        pending = deque()
+        for item in items:
+            pending.append(ex.submit(fn, item))
+            if len(pending) >= workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+# ------------------------------------------------------------
+# API: cadastro e histórico
+# ------------------------------------------------------------
+def load_clients(
+    pool: ConnectionPool,
+    ids=None,
+    columns: list[str] | None = None,
+    table: str = CLIENTS_TABLE,
+    chunk_size: int = 100_000,
+) -> pd.DataFrame:
+    """
+    Cadastro (df_clients) dos `ids` informados (ou da tabela toda), lido em
+    lotes de `chunk_size` e já no schema compacto.
+    """
+    def make_sql(con, id_count=0):
+        id_col = _ident(con, "ID")
+        cols = ", ".join(_ident(con, c) for c in columns) if columns else "*"
+        where = f"WHERE {id_col} IN ({', '.join([_placeholder(con)] * id_count)})" if id_count else ""
+        return f"SELECT {cols} FROM {table} {where} ORDER BY {id_col}", []
+
+    if ids is None:
+        with pool.connection() as con:
+            parts = list(_stream(con, make_sql(con)[0], (), chunk_size))
+        df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+    else:
+        df = _fetch_by_ids(pool, make_sql, ids, chunk_size)
+    return compact_dtypes(df)
+
+
+def load_records(
+    pool: ConnectionPool,
+    ids=None,
+    months: tuple[int, int] | None = (-12, 0),
+    table: str = RECORDS_TABLE,
+    chunk_size: int = 500_000,
+) -> pd.DataFrame:
+    """
+    Histórico (df_record) dos `ids` (ou de todos) no intervalo de meses
+    `months` = (início, fim) em MONTHS_BALANCE (0 = mês de referência).
+    O filtro de meses vai para o banco: só a janela usada sai do servidor.
+    """
+    def make_sql(con, id_count=0):
+        return _records_sql(con, table, months, id_count)
+
+    if ids is None:
+        with pool.connection() as con:
+            sql, params = make_sql(con)
+            parts = list(_stream(con, sql, params, chunk_size))
+        df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=RECORD_COLUMNS)
+    else:
+        df = _fetch_by_ids(pool, make_sql, ids, chunk_size)
+        if df.empty:
+            df = pd.DataFrame(columns=RECORD_COLUMNS)
+    return compact_dtypes(df)
+
+
+# ------------------------------------------------------------
+# API: histórico -> features em streaming
+# ------------------------------------------------------------
+def _complete_ids(chunks):
+    """
+    Lotes ordenados por ID -> lotes só com IDs completos (as linhas do último
+    ID de cada lote esperam o lote seguinte, que pode continuar o mesmo ID).
+    """
+    carry = None
+    for chunk in chunks:
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        ids = chunk["ID"].to_numpy()
+        cut = int(np.searchsorted(ids, ids[-1], side="left"))
+        carry = chunk.iloc[cut:]
+        if cut:
+            yield chunk.iloc[:cut]
+    if carry is not None and len(carry):
+        yield carry
+
+
+def iter_history_features(
+    pool: ConnectionPool,
+    ids=None,
+    window_months: int = 12,
+    table: str = RECORDS_TABLE,
+    chunk_size: int = 500_000,
+):
+    """
+    Features do histórico (build_history_features) por lote, direto do banco:
+    o SQL já filtra a janela e ordena por ID, cada lote é cortado na fronteira
+    de ID e vai para o builder sem montar o histórico inteiro em memória.
+
+    ids: lista de IDs (consultas IN em paralelo pelo pool) ou None (carteira
+         toda, numa leitura única ordenada)
+    """
+    months = (-int(window_months), 0)
+
+    if ids is None:
+        with pool.connection() as con:
+            sql, params = _records_sql(con, table, months)
+            for chunk in _complete_ids(_stream(con, sql, params, chunk_size)):
+                yield build_history_features(chunk, window_months=window_months)
+        return
+
+    def fetch(chunk_ids):
+        with pool.connection() as con:
+            sql, params = _records_sql(con, table, months, len(chunk_ids))
+            parts = list(_stream(con, sql, params + chunk_ids.tolist(), chunk_size))
+        return pd.concat(parts, ignore_index=True) if parts else None
+
+    for records in _prefetch(fetch, _id_chunks(ids), workers=pool.size):
+        if records is not None:
+            yield build_history_features(records, window_months=window_months)
+
+
+def history_features_from_db(pool: ConnectionPool, ids=None, window_months: int = 12, **kwargs) -> pd.DataFrame:
+    """
+    Mesmo que iter_history_features, concatenado (saída igual a
+    build_history_features(load_records(...))).
+    """
+    parts = list(iter_history_features(pool, ids=ids, window_months=window_months, **kwargs))
+    if not parts:
+        return build_history_features(pd.DataFrame(columns=RECORD_COLUMNS), window_months=window_months)
+    return pd.concat(parts, ignore_index=True)
+
+
+def iter_scoring_batches(
+    pool: ConnectionPool,
+    ids=None,
+    window_months: int = 12,
+    batch_ids: int = 100_000,
+    clients_table: str = CLIENTS_TABLE,
+    records_table: str = RECORDS_TABLE,
+    chunk_size: int = 500_000,
+):
+    """
+    Lotes (df_clients, df_record) prontos para apply_pipeline_with_history,
+    com o histórico completo de cada cliente do lote (job noturno em memória
+    limitada). Os lotes seguintes já vão sendo lidos pelo pool enquanto o
+    atual é escorado.
+
+    ids=None: todos os IDs do cadastro.
+    """
+    if ids is None:
+        with pool.connection() as con:
+            id_col = _ident(con, "ID")
+            ids = pd.concat(
+                list(_stream(con, f"SELECT {id_col} FROM {clients_table} ORDER BY {id_col}", (), chunk_size)),
+                ignore_index=True,
+            )["ID"].to_numpy()
+    ids = np.unique(np.asarray(ids, dtype=np.int64))
+
+    def fetch(batch):
+        clients = load_clients(pool, ids=batch, table=clients_table, chunk_size=chunk_size)
+        records = load_records(pool, ids=batch, months=(-int(window_months), 0),
+                               table=records_table, chunk_size=chunk_size)
+        return clients, records
+
+    batches = (ids[i:i + batch_ids] for i in range(0, len(ids), batch_ids))
+    yield from _prefetch(fetch, batches, workers=pool.size)
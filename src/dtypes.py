@@ -0,0 +1,177 @@
+import numpy as np
+import pandas as pd
+
+
+# ------------------------------------------------------------
+# Schema compacto (ingestão)
+# ------------------------------------------------------------
+# int8: status, meses e flags/contagens pequenas
+INT8_COLS = [
+    "STATUS", "MONTHS_BALANCE",
+    "max_status", "last_status", "n_months", "last_month", "vintage", "last_bad",
+    "CODE_GENDER", "years", "CNT_CHILDREN", "FLAG_OWN_CAR", "FLAG_OWN_REALTY",
+    "no_formal_employment", "unclassified_occupation",
+    "target", "target_heuristic", "y_true",
+]
+
+# int32: identificadores
+INT32_COLS = ["ID"]
+
+# float32: features contínuas e saídas do score
+# (o XGBoost já trabalha em float32, então o score não muda)
+FLOAT32_COLS = [
+    "CNT_FAM_MEMBERS", "years_employed",
+    "proba_bad", "score",
+]
+
+# Ficam em float64: passam por LogTransform ANTES do booster, e log1p de um
+# valor já arredondado para float32 muda o lado do split em ~4% das linhas.
+FLOAT64_COLS = ["amt_income_month", "renda_per_capita"]
+
+# Paridade do schema compacto: proba no schema compacto x dtypes originais
+# (tests/test_dtypes.py). O score segue o SCORE_FLOAT32_ATOL do scoring.py.
+COMPACT_PROBA_ATOL = 1e-6
+
+# category: rótulos (entradas do modelo e saídas de negócio)
+CATEGORY_COLS = [
+    "NAME_INCOME_TYPE",
+    "NAME_EDUCATION_TYPE",
+    "NAME_FAMILY_STATUS",
+    "NAME_HOUSING_TYPE",
+    "OCCUPATION_TYPE",
+    "rating",
+    "decision",
+]
+
+COMPACT_SCHEMA = {
+    **{c: "int8" for c in INT8_COLS},
+    **{c: "int32" for c in INT32_COLS},
+    **{c: "float32" for c in FLOAT32_COLS},
+    **{c: "category" for c in CATEGORY_COLS},
+}
+
+
+def _downcast_int(s: pd.Series, dtype: str) -> pd.Series:
+    """
+    Converte para o inteiro do schema sem overflow:
+      - com NaN -> float32 (inteiros até 2^24 continuam exatos)
+      - fora do range do dtype -> menor inteiro que comporta os valores
+    """
+    if s.isna().any():
+        return s.astype("float32")
+
+    info = np.iinfo(dtype)
+    if len(s) and (s.min() < info.min or s.max() > info.max):
+        return pd.to_numeric(s, downcast="integer")
+    return s.astype(dtype)
+
+
+def compact_dtypes(
+    df: pd.DataFrame,
+    schema: dict | None = None,
+    stage: str | None = None,
+    report: list | None = None,
+) -> pd.DataFrame:
+    """
+    Aplica o schema compacto nas colunas presentes (as demais ficam como estão).
+
+    Colunas não numéricas em posições numéricas do schema não são coagidas
+    aqui (isso é papel da validação/coerção de cada etapa).
+
+    stage/report: se `report` for uma lista, adiciona uma linha com a memória
+    antes/depois desta etapa (ver memory_report).
+    """
+    schema = COMPACT_SCHEMA if schema is None else schema
+    before = memory_usage_mb(df) if report is not None else None
+
+    out = df.copy()
+    for c, dtype in schema.items():
+        if c not in out.columns:
+            continue
+        s = out[c]
+        if dtype == "category":
+            if not isinstance(s.dtype, pd.CategoricalDtype):
+                out[c] = s.astype("category")
+        elif not pd.api.types.is_numeric_dtype(s) or pd.api.types.is_bool_dtype(s):
+            continue
+        elif dtype.startswith("int"):
+            if pd.api.types.is_float_dtype(s) and not np.array_equal(s.dropna(), np.floor(s.dropna())):
+                out[c] = s.astype("float32")
+            else:
+                out[c] = _downcast_int(s, dtype)
+        else:
+            out[c] = s.astype(dtype)
+
+    if report is not None:
+        report.append({
+            "stage": stage or f"stage_{len(report)}",
+            "rows": len(out),
+            "mb_before": before,
+            "mb_after": memory_usage_mb(out),
+        })
+    return out
+
+
+# ------------------------------------------------------------
+# Arrow (pyarrow.Table / RecordBatch)
+# ------------------------------------------------------------
+def _is_arrow(X) -> bool:
+    # sem importar pyarrow: o caminho pandas não paga o import
+    return type(X).__module__.startswith("pyarrow") and hasattr(X, "schema")
+
+
+def _arrow_table(X):
+    import pyarrow as pa
+    return pa.Table.from_batches([X]) if isinstance(X, pa.RecordBatch) else X
+
+
+def _arrow_set(table, name, col):
+    return table.set_column(table.schema.get_field_index(name), name, col)
+
+
+def downcast_floats(X, skip=()):
+    """
+    float64 -> float32 em todas as colunas, menos `skip` (modo float32 do
+    scoring). Aceita DataFrame ou pyarrow.Table.
+
+    Na matriz que entra no booster é sem perda: o XGBoost converte cada
+    valor para float32 de qualquer forma.
+    """
+    if _is_arrow(X):
+        import pyarrow as pa
+        for i, field in enumerate(X.schema):
+            if pa.types.is_float64(field.type) and field.name not in skip:
+                X = X.set_column(i, field.name, X.column(i).cast(pa.float32()))
+        return X
+
+    cols = [c for c in X.columns if X[c].dtype == np.float64 and c not in skip]
+    return X.astype({c: np.float32 for c in cols}) if cols else X
+
+
+# ------------------------------------------------------------
+# Memória
+# ------------------------------------------------------------
+def memory_usage_mb(df: pd.DataFrame) -> float:
+    return float(df.memory_usage(deep=True).sum()) / 1024 ** 2
+
+
+def memory_report(report: list) -> pd.DataFrame:
+    """
+    Consolida as linhas coletadas por compact_dtypes(report=...) em um
+    DataFrame com a economia por etapa.
+    """
+    rep = pd.DataFrame(report, columns=["stage", "rows", "mb_before", "mb_after"])
+    rep["mb_saved"] = rep["mb_before"] - rep["mb_after"]
+    rep["pct_saved"] = np.where(rep["mb_before"] > 0, rep["mb_saved"] / rep["mb_before"], 0.0)
+    return rep
+
+
+# ------------------------------------------------------------
+# Loaders parquet
+# ------------------------------------------------------------
+def read_parquet_compact(path, columns=None, report: list | None = None) -> pd.DataFrame:
+    """
+    Lê um parquet (apenas `columns`, se informado) já no schema compacto.
+    """
+    df = pd.read_parquet(path, columns=columns)
+    return compact_dtypes(df, stage=f"read:{path}", report=report)
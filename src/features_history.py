@@ -1,18 +1,47 @@
+import numpy as np
 import pandas as pd
 
+from .dtypes import compact_dtypes, COMPACT_SCHEMA
+
 BAD = {2, 3, 4, 5}
 STATUS_MAP = {"0":0,"1":1,"2":2,"3":3,"4":4,"5":5,"C":0,"X":0}
 
-def build_history_features(df_record: pd.DataFrame, window_months: int = 12) -> pd.DataFrame:
-    cr = df_record.copy()
-    cr["STATUS"] = cr["STATUS"].astype(str)
-    cr["MONTHS_BALANCE"] = cr["MONTHS_BALANCE"].astype(int)
+def build_history_features(
+    df_record: pd.DataFrame,
+    window_months: int = 12,
+    report: list | None = None,
+    backend: str = "pandas",
+    validated: bool = False,
+) -> pd.DataFrame:
+    """
+    Features do histórico de crédito (janela dos últimos `window_months`).
+
+    Entrada e saída seguem o schema compacto de src/dtypes.py
+    (ID int32, status/meses int8). `report` coleta a memória por etapa.
+
+    backend: "pandas" (padrão) ou um motor SQL embarcado ("duckdb"/"sqlite",
+    ver src/features_history_sql.py). Nos backends SQL, df_record também
+    pode ser o caminho de um parquet.
+
+    validated=True: df_record já saiu de validate_records (src/validation.py),
+    tipado e limpo; pula as coerções de STATUS/MONTHS_BALANCE.
+    """
+    if backend != "pandas":
+        from .features_history_sql import build_history_features_sql
+        return build_history_features_sql(df_record, window_months=window_months, engine=backend, report=report)
+
+    cr = df_record[["ID", "MONTHS_BALANCE", "STATUS"]]
+    if not validated:
+        cr = cr.copy()
+        cr["STATUS"] = cr["STATUS"].astype(str)
+        cr["MONTHS_BALANCE"] = cr["MONTHS_BALANCE"].astype(int)
+        cr = compact_dtypes(cr, stage="history:records", report=report)
 
     w = cr[(cr["MONTHS_BALANCE"] <= 0) & (cr["MONTHS_BALANCE"] >= -window_months)].copy()
     w = w.sort_values(["ID", "MONTHS_BALANCE"], ascending=[True, False])
 
     # ✅ transforma STATUS em severidade numérica
-    w["STATUS"] = w["STATUS"].map(STATUS_MAP).fillna(0).astype(int)
+    w["STATUS"] = w["STATUS"].map(STATUS_MAP).fillna(0).astype("int8")
 
     agg = (
         w.groupby("ID")
@@ -47,4 +76,113 @@ def build_history_features(df_record: pd.DataFrame, window_months: int = 12) ->
         .merge(last_bad, on="ID", how="left")
     )
     out["last_bad"] = out["last_bad"].fillna(-1)
-    return out
+    return compact_dtypes(out, stage="history:features", report=report)
+
+
+HISTORY_FEATURES = ["max_status", "last_status", "n_months", "last_month", "vintage", "last_bad"]
+
+
+def build_history_features_multi(
+    df_record: pd.DataFrame,
+    windows=(3, 6, 12, 24),
+    features=None,
+    report: list | None = None,
+    validated: bool = False,
+) -> pd.DataFrame:
+    """
+    Features do histórico para várias janelas com UMA ordenação e UMA passada.
+
+    Com os registros ordenados por (ID, MONTHS_BALANCE desc), a janela de
+    `w` meses de cada ID é um prefixo do seu bloco. Então basta:
+      - contar quantos registros de cada ID caem em cada janela
+      - um máximo acumulado de STATUS por ID (max_status de qualquer prefixo)
+      - a posição do primeiro mês ruim de cada ID (last_bad)
+
+    Saída: uma linha por ID com registro na maior janela e colunas com sufixo
+    da janela (ex.: max_status_12m). Para a janela w, os IDs com registro
+    nela têm os mesmos valores de build_history_features(window_months=w);
+    IDs sem registro naquela janela ficam com NaN em todas as colunas dela,
+    como depois do left-merge do apply (onde o build_history_features nem
+    gera a linha). select_window(out, w) devolve exatamente o frame do
+    build_history_features(window_months=w).
+
+    features: subconjunto de HISTORY_FEATURES (padrão: todas).
+    validated: entrada já passou por validate_records (sem coerções).
+    """
+    windows = sorted({int(w) for w in windows})
+    features = list(features or HISTORY_FEATURES)
+    max_window = windows[-1]
+
+    cr = df_record[["ID", "MONTHS_BALANCE", "STATUS"]]
+    months = cr["MONTHS_BALANCE"].to_numpy() if validated else cr["MONTHS_BALANCE"].astype(int).to_numpy()
+    keep = (months <= 0) & (months >= -max_window)
+
+    ids = cr["ID"].to_numpy()[keep]
+    months = months[keep]
+    status = cr["STATUS"] if validated else cr["STATUS"].astype(str)
+    status = status[keep].map(STATUS_MAP).fillna(0).to_numpy(dtype="int8")
+
+    # única ordenação: ID asc, mês desc (estável, como o sort do pandas)
+    order = np.lexsort((-months, ids))
+    ids, months, status = ids[order], months[order], status[order]
+
+    n = len(ids)
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]]) if n else np.array([], dtype=int)
+    ends = np.r_[starts[1:], n]
+    group = np.repeat(np.arange(len(starts)), ends - starts)
+
+    # máximo acumulado por ID: desloca cada grupo acima do anterior (status < 8)
+    cummax = np.maximum.accumulate(status.astype(np.int64) + group * 8) - group * 8
+
+    # primeira posição (= mês mais recente) com status ruim em cada ID
+    bad_pos = np.where(np.isin(status, list(BAD)), np.arange(n), n)
+    first_bad = np.minimum.reduceat(bad_pos, starts) if n else bad_pos
+
+    out = {"ID": ids[starts]}
+    for w in windows:
+        # registros na janela = prefixo do bloco (meses em ordem desc)
+        count = np.add.reduceat((months >= -w).astype(np.int64), starts) if n else np.zeros(0, int)
+        has = count > 0
+        last = np.where(has, starts + count - 1, starts)
+
+        values = {
+            "max_status": np.where(has, cummax[last], 0),
+            "last_status": np.where(has, status[starts], 0),
+            "n_months": count,
+            "last_month": np.where(has, months[starts], np.nan),
+            "vintage": np.where(has, np.abs(months[last]), 0),
+            "last_bad": np.where(first_bad < starts + count, months[np.minimum(first_bad, n - 1)], -1),
+        }
+        for f in features:
+            # sem registro na janela: NaN (o single-window não tem a linha)
+            out[f"{f}_{w}m"] = values[f] if has.all() else np.where(has, values[f], np.nan)
+
+    out = pd.DataFrame(out)
+    return compact_dtypes(out, schema=_multi_window_schema(out.columns), stage="history:multi", report=report)
+
+
+def select_window(multi: pd.DataFrame, window_months: int) -> pd.DataFrame:
+    """
+    Colunas de UMA janela do build_history_features_multi, sem sufixo e só
+    com os IDs que têm registro nela: igual ao build_history_features.
+    """
+    suffix = f"_{int(window_months)}m"
+    cols = [c for c in multi.columns if c.endswith(suffix)]
+    if not cols:
+        raise KeyError(f"janela {window_months} ausente no frame multi-janela")
+    out = multi[["ID", *cols]].rename(columns={c: c[:-len(suffix)] for c in cols})
+    out = out[out[out.columns[1]].notna()].reset_index(drop=True)
+    # volta para os inteiros do schema (NaN só existia nas linhas removidas)
+    return compact_dtypes(out.astype({c: "int64" for c in out.columns[1:]}))
+
+
+def _multi_window_schema(columns) -> dict:
+    """
+    Schema compacto para as colunas com sufixo de janela (max_status_12m -> int8).
+    """
+    schema = {"ID": COMPACT_SCHEMA["ID"]}
+    for c in columns:
+        base = c.rsplit("_", 1)[0]
+        if base in COMPACT_SCHEMA:
+            schema[c] = COMPACT_SCHEMA[base]
+    return schema
@@ -0,0 +1,189 @@
+import os
+import sqlite3
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from .dtypes import compact_dtypes
+from .features_history import BAD, STATUS_MAP
+
+
+# ------------------------------------------------------------
+# SQL (mesma lógica do build_history_features em pandas)
+# ------------------------------------------------------------
+# Janela -> severidade numérica -> ROW_NUMBER p/ último status -> agregação.
+# Espelha o que era feito no PostgreSQL (window functions + CTEs).
+#
+# Meses repetidos no mesmo ID: o pandas (sort estável) fica com o STATUS da
+# primeira linha na ordem de entrada. `tie_break` são as colunas dessa ordem
+# (ex.: _row), usadas como desempate do ROW_NUMBER; sem elas o motor escolhe
+# qualquer uma das linhas empatadas.
+_HISTORY_SQL = """
+WITH w AS (
+    SELECT
+        ID,
+        MONTHS_BALANCE,
+        CASE CAST(STATUS AS VARCHAR)
+            {status_cases}
+            ELSE 0
+        END AS status_num{tie_select}
+    FROM {source}
+    WHERE MONTHS_BALANCE <= 0 AND MONTHS_BALANCE >= {min_month}
+),
+ranked AS (
+    SELECT
+        ID,
+        MONTHS_BALANCE,
+        status_num,
+        ROW_NUMBER() OVER (PARTITION BY ID ORDER BY MONTHS_BALANCE DESC{tie_order}) AS rn
+    FROM w
+)
+SELECT
+    ID,
+    MAX(status_num)                                        AS max_status,
+    MAX(CASE WHEN rn = 1 THEN status_num END)              AS last_status,
+    COUNT(*)                                               AS n_months,
+    MAX(MONTHS_BALANCE)                                    AS last_month,
+    ABS(MIN(MONTHS_BALANCE))                               AS vintage,
+    COALESCE(MAX(CASE WHEN status_num IN ({bad}) THEN MONTHS_BALANCE END), -1) AS last_bad
+FROM ranked
+GROUP BY ID
+ORDER BY ID
+"""
+
+
+def history_features_sql(source: str, window_months: int = 12, tie_break=()) -> str:
+    """
+    Gera o SQL das features do histórico sobre `source` (tabela, view ou
+    table function como read_parquet(...)). tie_break: colunas de `source`
+    com a ordem de entrada (desempate de meses repetidos, como no pandas).
+    """
+    status_cases = "\n            ".join(
+        f"WHEN '{k}' THEN {v}" for k, v in STATUS_MAP.items() if v != 0
+    )
+    return _HISTORY_SQL.format(
+        source=source,
+        status_cases=status_cases,
+        min_month=-int(window_months),
+        bad=", ".join(str(b) for b in sorted(BAD)),
+        tie_select="".join(f",\n        {c}" for c in tie_break),
+        tie_order="".join(f", {c}" for c in tie_break),
+    )
+
+
+# ------------------------------------------------------------
+# Backends
+# ------------------------------------------------------------
+def build_history_features_sql(
+    source,
+    window_months: int = 12,
+    engine: str = "duckdb",
+    memory_limit: str | None = "2GB",
+    temp_directory: str | None = None,
+    threads: int | None = None,
+    batch_size: int = 1_000_000,
+    report: list | None = None,
+) -> pd.DataFrame:
+    """
+    Calcula as mesmas features de build_history_features em um motor SQL embarcado.
+
+    source:
+      - DataFrame com ID, MONTHS_BALANCE, STATUS; ou
+      - caminho/glob de parquet (lido direto pelo motor, sem passar por pandas)
+
+    engine:
+      - "duckdb": lê o parquet com pushdown do filtro em MONTHS_BALANCE e faz
+        spill em disco quando passa de `memory_limit` (out-of-core)
+      - "sqlite": carrega em lotes (filtrados no parquet via pyarrow) num
+        arquivo temporário e roda o mesmo SQL
+
+    report: como no build_history_features; só a etapa "history:features"
+    (os registros ficam no motor, não passam por um DataFrame).
+    """
+    if engine == "duckdb":
+        out = _run_duckdb(source, window_months, memory_limit, temp_directory, threads)
+    elif engine == "sqlite":
+        out = _run_sqlite(source, window_months, temp_directory, batch_size)
+    else:
+        raise ValueError(f"engine inválido: {engine!r} (use 'duckdb' ou 'sqlite')")
+
+    out["last_bad"] = out["last_bad"].fillna(-1)
+    return compact_dtypes(out, stage="history:features", report=report)
+
+
+def _run_duckdb(source, window_months, memory_limit, temp_directory, threads) -> pd.DataFrame:
+    try:
+        import duckdb
+    except ImportError as e:
+        raise ImportError("backend 'duckdb' requer o pacote duckdb (pip install duckdb)") from e
+
+    con = duckdb.connect()
+    try:
+        if memory_limit:
+            con.execute(f"SET memory_limit = '{memory_limit}'")
+        if temp_directory:
+            con.execute(f"SET temp_directory = '{temp_directory}'")
+        if threads:
+            con.execute(f"SET threads = {int(threads)}")
+
+        if isinstance(source, pd.DataFrame):
+            records = source[["ID", "MONTHS_BALANCE", "STATUS"]].assign(_row=np.arange(len(source)))
+            con.register("credit_record", records)
+            src, tie_break = "credit_record", ("_row",)
+        else:
+            src = f"read_parquet('{os.fspath(source)}', filename = true, file_row_number = true)"
+            tie_break = ("filename", "file_row_number")
+
+        return con.execute(history_features_sql(src, window_months, tie_break=tie_break)).df()
+    finally:
+        con.close()
+
+
+def _run_sqlite(source, window_months, temp_directory, batch_size) -> pd.DataFrame:
+    with tempfile.TemporaryDirectory(dir=temp_directory) as tmp:
+        con = sqlite3.connect(os.path.join(tmp, "credit_record.db"))
+        try:
+            con.execute("CREATE TABLE credit_record (ID INTEGER, MONTHS_BALANCE INTEGER, STATUS TEXT, _row INTEGER)")
+            for batch in _iter_record_batches(source, window_months, batch_size):
+                batch = batch.assign(STATUS=batch["STATUS"].astype(str))
+                con.executemany(
+                    "INSERT INTO credit_record VALUES (?, ?, ?, ?)",
+                    batch[["ID", "MONTHS_BALANCE", "STATUS", "_row"]].itertuples(index=False, name=None),
+                )
+            con.commit()
+            # SQLite não tem VARCHAR, mas aceita o CAST por afinidade de tipo
+            return pd.read_sql_query(history_features_sql("credit_record", window_months, tie_break=("_row",)), con)
+        finally:
+            con.close()
+
+
+def _iter_record_batches(source, window_months, batch_size):
+    """
+    Lotes de (ID, MONTHS_BALANCE, STATUS, _row) já filtrados pela janela;
+    _row é a posição na entrada (desempate de meses repetidos).
+    Para parquet o filtro vai para o scanner (pula row groups fora da janela).
+    """
+    if isinstance(source, pd.DataFrame):
+        cr = source[["ID", "MONTHS_BALANCE", "STATUS"]].assign(_row=np.arange(len(source)))
+        cr = cr[(cr["MONTHS_BALANCE"] <= 0) & (cr["MONTHS_BALANCE"] >= -window_months)]
+        for start in range(0, len(cr), batch_size):
+            yield cr.iloc[start:start + batch_size]
+        return
+
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(os.fspath(source), format="parquet")
+    month = ds.field("MONTHS_BALANCE")
+    scanner = dataset.scanner(
+        columns=["ID", "MONTHS_BALANCE", "STATUS"],
+        filter=(month <= 0) & (month >= -window_months),
+        batch_size=batch_size,
+    )
+    # a ordem dos lotes é a do arquivo; o filtro já saiu, então _row numera
+    # só as linhas da janela (basta para desempatar na mesma ordem)
+    row = 0
+    for rb in scanner.to_batches():
+        if rb.num_rows:
+            yield rb.to_pandas().assign(_row=np.arange(row, row + rb.num_rows))
+            row += rb.num_rows
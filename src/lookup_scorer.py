@@ -0,0 +1,278 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+
+# ------------------------------------------------------------
+# Booster -> tabelas (compilação)
+# ------------------------------------------------------------
+# Com max_depth=2 cada árvore olha no máximo 2 features: a raiz (f1) e um
+# filho por lado (f2 à esquerda, f3 à direita). A contribuição da árvore é
+#     [x vai à esquerda na raiz] * g_esq(f2) + [x vai à direita] * g_dir(f3)
+# = T(f1, f2) + T(f1, f3). Somando todas as árvores sobra:
+#     margem = bias + Σ_f U_f[bin_f] + Σ_(a,b) P_ab[bin_a, bin_b]
+#
+# Bins por feature:
+#   numérica:   0..K pelos K thresholds usados (x < t vai à esquerda),
+#               K+1 = missing
+#   categórica: 0..C-1 = código da categoria no treino, C = missing
+#               (categoria fora do treino -> ValueError, como no XGBoost;
+#               o validate_clients já põe esses clientes em quarentena)
+FORMAT_VERSION = 1
+
+# Paridade com o booster: as tabelas somam as mesmas folhas, mas em outra
+# ordem e em float64 (o XGBoost acumula árvore a árvore em float32), então a
+# igualdade bit a bit não é alcançável. A diferença fica no arredondamento do
+# float32 da margem (~1e-7 na proba); o score segue o SCORE_FLOAT32_ATOL do
+# scoring.py. `benchmarks lookup` falha se algum dos dois for excedido.
+LOOKUP_PROBA_ATOL = 1e-6
+
+
+def _parse_base_score(value) -> float:
+    # XGBoost >= 3 grava como "[5E-1]"
+    return float(str(value).strip("[]").split(",")[0])
+
+
+def _booster_categories(booster) -> dict:
+    cats = {}
+    for name, arr in booster.get_categories(export_to_arrow=True).to_arrow():
+        if arr is not None:
+            cats[name] = [str(v) for v in arr.to_pylist()]
+    return cats
+
+
+class _Feature:
+    def __init__(self, name: str, kind: str, thresholds=None, categories=None):
+        self.name = name
+        self.kind = kind
+        self.thresholds = np.asarray(thresholds if thresholds is not None else [], dtype=np.float32)
+        self.categories = list(categories or [])
+
+    @property
+    def n_bins(self) -> int:
+        if self.kind == "categorical":
+            return len(self.categories) + 1
+        return len(self.thresholds) + 2
+
+    @property
+    def missing_bin(self) -> int:
+        return len(self.categories) if self.kind == "categorical" else len(self.thresholds) + 1
+
+    def go_left(self, tree: dict, node: int, cat_sets: dict) -> np.ndarray:
+        """
+        Para cada bin desta feature: o nó `node` manda para a esquerda?
+        """
+        left = np.zeros(self.n_bins, dtype=bool)
+        if self.kind == "categorical":
+            right = np.zeros(len(self.categories), dtype=bool)
+            right[[c for c in cat_sets[node] if c < len(self.categories)]] = True
+            left[: len(self.categories)] = ~right
+            left[self.missing_bin] = bool(tree["default_left"][node])
+        else:
+            t = np.float32(tree["split_conditions"][node])
+            k = int(np.searchsorted(self.thresholds, t))
+            left[: k + 1] = True  # bin b <=> t_{b-1} <= x < t_b
+            left[self.missing_bin] = bool(tree["default_left"][node])
+        return left
+
+    def to_dict(self) -> dict:
+        out = {"name": self.name, "type": self.kind}
+        if self.kind == "categorical":
+            out["categories"] = self.categories
+        else:
+            out["thresholds"] = [float(t) for t in self.thresholds]
+        return out
+
+
+def _categorical_sets(tree: dict) -> dict:
+    sets = {}
+    for node, start, size in zip(tree["categories_nodes"], tree["categories_segments"], tree["categories_sizes"]):
+        sets[node] = tree["categories"][start:start + size]
+    return sets
+
+
+def _node_values(tree, node, features, cat_sets) -> tuple[int | None, np.ndarray | float]:
+    """
+    (feature, valor por bin) de um filho da raiz; folha -> (None, constante).
+    """
+    left, right = tree["left_children"][node], tree["right_children"][node]
+    if left == -1:
+        return None, float(tree["split_conditions"][node])
+    if tree["left_children"][left] != -1 or tree["left_children"][right] != -1:
+        raise ValueError("árvore com profundidade > 2: o LookupScorer exige max_depth <= 2")
+    f = tree["split_indices"][node]
+    go_left = features[f].go_left(tree, node, cat_sets)
+    return f, np.where(go_left, np.float64(tree["split_conditions"][left]), np.float64(tree["split_conditions"][right]))
+
+
+# ------------------------------------------------------------
+# Scorer
+# ------------------------------------------------------------
+class LookupScorer:
+    """
+    Modelo depth-2 compilado em tabelas (unárias + pares) sobre bins inteiros.
+
+    - compile(booster) / from_pipeline(pipeline): lê as árvores do booster
+    - predict_margin / predict_proba: binning (searchsorted / códigos de
+      categoria) + uma soma de gathers por tabela
+    - to_json / from_json: artefato legível (thresholds, categorias e tabelas)
+
+    from_pipeline guarda os passos de pré-processamento do pipeline (lista de
+    passos, não vão para o JSON); predict_proba devolve (n, 2) como o
+    sklearn, então o scorer pode substituir o pipeline no apply.
+
+    Paridade: as árvores são exatamente as mesmas; a proba difere do booster
+    no máximo LOOKUP_PROBA_ATOL (ordem/precisão da soma).
+    """
+    def __init__(self, features, bias: float, unary: dict, pairwise: dict, preprocess=None):
+        self.features = features
+        self.bias = float(bias)
+        self.unary = unary
+        self.pairwise = pairwise
+        self.preprocess = preprocess
+
+    # --------------------------- compilação ---------------------------
+    @classmethod
+    def compile(cls, booster, preprocess=None) -> "LookupScorer":
+        model = json.loads(booster.save_raw(raw_format="json"))
+        learner = model["learner"]
+        if learner["objective"]["name"] != "binary:logistic":
+            raise ValueError("LookupScorer suporta apenas binary:logistic")
+
+        trees = learner["gradient_booster"]["model"]["trees"]
+        names = learner["feature_names"]
+        types = learner["feature_types"]
+        categories = _booster_categories(booster)
+
+        thresholds = {i: set() for i in range(len(names))}
+        for tree in trees:
+            for node, f in enumerate(tree["split_indices"]):
+                if tree["left_children"][node] != -1 and tree["split_type"][node] == 0:
+                    thresholds[f].add(np.float32(tree["split_conditions"][node]))
+
+        features = [
+            _Feature(n, "categorical", categories=categories.get(n, []))
+            if t == "c" else _Feature(n, "numeric", thresholds=sorted(thresholds[i]))
+            for i, (n, t) in enumerate(zip(names, types))
+        ]
+
+        p0 = _parse_base_score(learner["learner_model_param"]["base_score"])
+        bias = float(np.log(p0 / (1 - p0)))
+        unary, pairwise = {}, {}
+
+        def add_unary(f, values):
+            unary[f] = unary.get(f, np.zeros(features[f].n_bins)) + values
+
+        def add_pair(a, b, table):
+            if a > b:
+                a, b, table = b, a, table.T
+            pairwise[(a, b)] = pairwise.get((a, b), np.zeros((features[a].n_bins, features[b].n_bins))) + table
+
+        for tree in trees:
+            if tree["left_children"][0] == -1:
+                bias += float(tree["split_conditions"][0])
+                continue
+            cat_sets = _categorical_sets(tree)
+            f1 = tree["split_indices"][0]
+            root_left = features[f1].go_left(tree, 0, cat_sets)
+
+            for child, mask in ((tree["left_children"][0], root_left), (tree["right_children"][0], ~root_left)):
+                f2, values = _node_values(tree, child, features, cat_sets)
+                if f2 is None or f2 == f1:
+                    # folha, ou filho que divide de novo na mesma feature
+                    add_unary(f1, np.where(mask, values, 0.0))
+                else:
+                    add_pair(f1, f2, np.outer(mask, values))
+
+        return cls(features, bias, unary, pairwise, preprocess=preprocess)
+
+    @classmethod
+    def from_pipeline(cls, pipeline) -> "LookupScorer":
+        """
+        Compila o XGBoost do último passo e mantém os demais como pré-processamento.
+        """
+        model = pipeline.steps[-1][1]
+        model = getattr(model, "model_", model)
+        # os passos, não o Pipeline fatiado (que o sklearn considera não ajustado)
+        return cls.compile(model.get_booster(), preprocess=[step for _, step in pipeline.steps[:-1]])
+
+    # --------------------------- binning ---------------------------
+    def _bins(self, X: pd.DataFrame) -> list[np.ndarray]:
+        bins = []
+        for feat in self.features:
+            col = X[feat.name]
+            if feat.kind == "categorical":
+                s = col if isinstance(col.dtype, pd.CategoricalDtype) else col.astype("category")
+                codes = s.cat.codes.to_numpy()
+                lookup = pd.Index(feat.categories).get_indexer(s.cat.categories.astype(str))
+                unknown = s.cat.categories[lookup < 0]
+                if len(unknown) and np.isin(codes, np.flatnonzero(lookup < 0)).any():
+                    raise ValueError(f"{feat.name}: categorias fora do treino: {list(unknown)}")
+                b = np.where(codes < 0, feat.missing_bin, lookup[codes] if len(lookup) else 0)
+            else:
+                x = col.to_numpy(dtype=np.float32, na_value=np.nan)
+                b = np.searchsorted(feat.thresholds, x, side="right")
+                b[np.isnan(x)] = feat.missing_bin
+            bins.append(b.astype(np.intp))
+        return bins
+
+    # --------------------------- predição ---------------------------
+    def predict_margin(self, X: pd.DataFrame) -> np.ndarray:
+        for step in self.preprocess or []:
+            X = step.transform(X)
+        bins = self._bins(X)
+
+        margin = np.full(len(X), self.bias)
+        for f, table in self.unary.items():
+            margin += table[bins[f]]
+        for (a, b), table in self.pairwise.items():
+            margin += table.ravel()[bins[a] * table.shape[1] + bins[b]]
+        return margin
+
+    def predict_proba(self, X: pd.DataFrame) -> np.ndarray:
+        p = 1.0 / (1.0 + np.exp(-self.predict_margin(X)))
+        p = p.astype(np.float32)
+        return np.column_stack([1 - p, p])
+
+    # --------------------------- artefato ---------------------------
+    def to_dict(self) -> dict:
+        names = [f.name for f in self.features]
+        return {
+            "format": "depth2-lookup",
+            "version": FORMAT_VERSION,
+            "bias": self.bias,
+            "features": [f.to_dict() for f in self.features],
+            "unary": {names[f]: t.tolist() for f, t in sorted(self.unary.items())},
+            "pairwise": [
+                {"features": [names[a], names[b]], "table": t.tolist()}
+                for (a, b), t in sorted(self.pairwise.items())
+            ],
+        }
+
+    def to_json(self, path) -> None:
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(self.to_dict(), fh, ensure_ascii=False, indent=1)
+
+    @classmethod
+    def from_dict(cls, d: dict, preprocess=None) -> "LookupScorer":
+        features = [
+            _Feature(f["name"], f["type"], thresholds=f.get("thresholds"), categories=f.get("categories"))
+            for f in d["features"]
+        ]
+        index = {f.name: i for i, f in enumerate(features)}
+        unary = {index[n]: np.asarray(t, dtype=np.float64) for n, t in d["unary"].items()}
+        pairwise = {
+            (index[p["features"][0]], index[p["features"][1]]): np.asarray(p["table"], dtype=np.float64)
+            for p in d["pairwise"]
+        }
+        return cls(features, d["bias"], unary, pairwise, preprocess=preprocess)
+
+    @classmethod
+    def from_json(cls, path, preprocess=None) -> "LookupScorer":
+        with open(path, encoding="utf-8") as fh:
+            return cls.from_dict(json.load(fh), preprocess=preprocess)
+
+    @property
+    def n_tables(self) -> int:
+        return len(self.unary) + len(self.pairwise)
@@ -0,0 +1,215 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import joblib
+import pandas as pd
+
+
+ACTIVE_FILE = "ACTIVE"
+MANIFEST_FILE = "manifest.json"
+WARMUP_FILE = "warmup.parquet"
+BUNDLE_FILES = {
+    "pipeline": "pipeline.pkl",
+    "score_params": "score_params.pkl",
+    "feature_columns": "feature_columns.pkl",
+    "score_cuts": "score_cuts.pkl",
+}
+
+
+@dataclass(frozen=True)
+class ModelBundle:
+    """
+    Tudo que o scoring precisa de uma versão, carregado junto.
+    Imutável: uma requisição que pegou o bundle termina com ele mesmo
+    que outra versão seja ativada no meio do caminho.
+    """
+    version: str
+    pipeline: object
+    score_params: dict
+    feature_columns: list
+    score_cuts: dict
+    manifest: dict = field(default_factory=dict)
+
+
+# ------------------------------------------------------------
+# Registry local (arquivos)
+# ------------------------------------------------------------
+class ModelRegistry:
+    """
+    Registry de modelos em disco:
+
+        <root>/
+          ACTIVE                  -> nome da versão ativa
+          v3/
+            manifest.json
+            pipeline.pkl, score_params.pkl, feature_columns.pkl, score_cuts.pkl
+            warmup.parquet        -> amostra usada no aquecimento (opcional)
+
+    - publish(): grava a versão num diretório temporário e renomeia (atômico)
+    - activate(): carrega + aquece a nova versão (opcionalmente em background)
+      e só então troca a referência ativa; quem já pegou o bundle antigo
+      termina com ele
+    - refresh(): detecta mudança no arquivo ACTIVE (feita por outro processo)
+      e ativa a nova versão em background
+    """
+    def __init__(self, root="models/registry"):
+        self.root = os.fspath(root)
+        self._lock = threading.Lock()
+        self._active: ModelBundle | None = None
+        self._loading: dict[str, Future] = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-registry")
+
+    # --------------------------- escrita ---------------------------
+    def publish(
+        self,
+        version: str,
+        pipeline,
+        score_params: dict,
+        feature_columns: list,
+        score_cuts: dict | None = None,
+        warmup_X: pd.DataFrame | None = None,
+        metadata: dict | None = None,
+    ) -> str:
+        """
+        Publica uma versão completa (pipeline + score_params + schema + cortes).
+        Versões são imutáveis: publicar de novo o mesmo nome é erro.
+        """
+        target = self._version_dir(version)
+        if os.path.exists(target):
+            raise FileExistsError(f"versão {version!r} já publicada em {target}")
+
+        os.makedirs(self.root, exist_ok=True)
+        score_cuts = score_cuts if score_cuts is not None else score_params.get("score_cuts", {})
+
+        tmp = tempfile.mkdtemp(prefix=f".{version}.", dir=self.root)
+        try:
+            joblib.dump(pipeline, os.path.join(tmp, BUNDLE_FILES["pipeline"]))
+            joblib.dump(score_params, os.path.join(tmp, BUNDLE_FILES["score_params"]))
+            joblib.dump(list(feature_columns), os.path.join(tmp, BUNDLE_FILES["feature_columns"]))
+            joblib.dump(score_cuts, os.path.join(tmp, BUNDLE_FILES["score_cuts"]))
+            if warmup_X is not None:
+                warmup_X[list(feature_columns)].to_parquet(os.path.join(tmp, WARMUP_FILE), index=False)
+
+            manifest = {
+                "version": version,
+                "published_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "n_features": len(feature_columns),
+                "has_warmup": warmup_X is not None,
+                **(metadata or {}),
+            }
+            with open(os.path.join(tmp, MANIFEST_FILE), "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+            os.replace(tmp, target)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        return target
+
+    def set_active_pointer(self, version: str) -> None:
+        """
+        Grava ACTIVE de forma atômica (outros workers pegam via refresh()).
+        """
+        if not os.path.isdir(self._version_dir(version)):
+            raise FileNotFoundError(f"versão {version!r} não publicada")
+        tmp = os.path.join(self.root, f".{ACTIVE_FILE}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(tmp, os.path.join(self.root, ACTIVE_FILE))
+
+    # --------------------------- leitura ---------------------------
+    def versions(self) -> list[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            d for d in os.listdir(self.root)
+            if not d.startswith(".") and os.path.isfile(os.path.join(self.root, d, MANIFEST_FILE))
+        )
+
+    def active_pointer(self) -> str | None:
+        path = os.path.join(self.root, ACTIVE_FILE)
+        if not os.path.isfile(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return f.read().strip() or None
+
+    def load(self, version: str) -> ModelBundle:
+        d = self._version_dir(version)
+        with open(os.path.join(d, MANIFEST_FILE), encoding="utf-8") as f:
+            manifest = json.load(f)
+        parts = {k: joblib.load(os.path.join(d, fname)) for k, fname in BUNDLE_FILES.items()}
+        return ModelBundle(version=version, manifest=manifest, **parts)
+
+    def warmup(self, bundle: ModelBundle, warmup_X: pd.DataFrame | None = None) -> None:
+        """
+        Roda uma predição para pagar o custo de primeira chamada (alocação do
+        booster, threads do XGBoost) antes da versão receber tráfego.
+        """
+        if warmup_X is None:
+            path = os.path.join(self._version_dir(bundle.version), WARMUP_FILE)
+            if not os.path.isfile(path):
+                return
+            warmup_X = pd.read_parquet(path)
+        bundle.pipeline.predict_proba(warmup_X[bundle.feature_columns])
+
+    # --------------------------- versão ativa ---------------------------
+    @property
+    def active(self) -> ModelBundle | None:
+        return self._active
+
+    @property
+    def active_version(self) -> str | None:
+        bundle = self._active
+        return bundle.version if bundle is not None else None
+
+    def activate(self, version: str, warmup_X: pd.DataFrame | None = None, background: bool = False):
+        """
+        Carrega, aquece e troca a versão ativa.
+
+        background=True retorna um Future (a versão atual continua atendendo
+        até a nova estar pronta). Se o carregamento ou o aquecimento falhar,
+        a versão ativa não muda.
+        """
+        if not background:
+            return self._load_and_swap(version, warmup_X)
+
+        with self._lock:
+            fut = self._loading.get(version)
+            if fut is None or fut.done():
+                fut = self._executor.submit(self._load_and_swap, version, warmup_X)
+                self._loading[version] = fut
+        return fut
+
+    def refresh(self, background: bool = True):
+        """
+        Sincroniza com o arquivo ACTIVE. Barato (só lê um arquivo pequeno);
+        pode ser chamado a cada requisição.
+        """
+        version = self.active_pointer()
+        if version is None or version == self.active_version:
+            return None
+        return self.activate(version, background=background)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    # --------------------------- internos ---------------------------
+    def _load_and_swap(self, version: str, warmup_X=None) -> ModelBundle:
+        bundle = self.load(version)
+        self.warmup(bundle, warmup_X)
+        with self._lock:
+            # troca de referência: atômica para quem lê self.active
+            self._active = bundle
+            self._loading.pop(version, None)
+        return bundle
+
+    def _version_dir(self, version: str) -> str:
+        if not version or os.sep in version or version.startswith("."):
+            raise ValueError(f"nome de versão inválido: {version!r}")
+        return os.path.join(self.root, version)
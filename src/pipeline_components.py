@@ -1,9 +1,13 @@
 
 import numpy as np
 import pandas as pd
-import xgboost as xgb
 from sklearn.base import BaseEstimator, ClassifierMixin, TransformerMixin
 
+# helpers Arrow (pyarrow.Table / RecordBatch) ficam em dtypes: o scoring
+# usa sem importar sklearn
+from .dtypes import _is_arrow, _arrow_table, _arrow_set
+
+
 #Transformers / Estimator
 
 class DropCols(BaseEstimator, TransformerMixin):
@@ -14,6 +18,9 @@ class DropCols(BaseEstimator, TransformerMixin):
         return self
 
     def transform(self, X):
+        if _is_arrow(X):
+            X = _arrow_table(X)
+            return X.drop_columns([c for c in self.cols_to_drop if c in X.column_names])
         X = X.copy()
         cols = [c for c in self.cols_to_drop if c in X.columns]
         return X.drop(columns=cols, errors="ignore")
@@ -31,12 +38,35 @@ class EnsureNumeric(BaseEstimator, TransformerMixin):
         return self
 
     def transform(self, X):
+        if _is_arrow(X):
+            return self._transform_arrow(_arrow_table(X))
         X = X.copy()
         for c in self.num_cols:
             if c in X.columns:
                 X[c] = pd.to_numeric(X[c], errors="coerce").fillna(self.fillna_value)
         return X
 
+    def _transform_arrow(self, X):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        for c in self.num_cols:
+            if c not in X.column_names:
+                continue
+            col = X.column(c)
+            if not (pa.types.is_integer(col.type) or pa.types.is_floating(col.type)):
+                col = pa.chunked_array([pd.to_numeric(col.to_pandas(), errors="coerce").to_numpy()])
+            if pa.types.is_floating(col.type):
+                # NaN conta como ausente (igual ao fillna do pandas)
+                nan = pc.is_nan(col)
+                if pc.any(nan).as_py():
+                    col = pc.if_else(nan, None, col)
+            if col.null_count:
+                col = pc.fill_null(col, pa.scalar(self.fillna_value).cast(col.type))
+            if col is not X.column(c):
+                X = _arrow_set(X, c, col)
+        return X
+
 class LogTransform(BaseEstimator, TransformerMixin):
     """
     Aplica log1p em colunas numéricas.
@@ -48,6 +78,13 @@ class LogTransform(BaseEstimator, TransformerMixin):
         return self
 
     def transform(self, X):
+        if _is_arrow(X):
+            import pyarrow.compute as pc
+            X = _arrow_table(X)
+            for c in self.cols:
+                if c in X.column_names:
+                    X = _arrow_set(X, c, pc.log1p(pc.max_element_wise(X.column(c), 0, skip_nulls=False)))
+            return X
         X = X.copy()
         for c in self.cols:
             if c in X.columns:
@@ -67,6 +104,16 @@ class EnsureCategorical(BaseEstimator, TransformerMixin):
         return self
 
     def transform(self, X):
+        if _is_arrow(X):
+            # colunas dictionary já chegam como categoria: o XGBoost recodifica
+            # pelos valores usando as categorias guardadas no booster
+            import pyarrow as pa
+            import pyarrow.compute as pc
+            X = _arrow_table(X)
+            for c in self.cat_cols:
+                if c in X.column_names and not pa.types.is_dictionary(X.column(c).type):
+                    X = _arrow_set(X, c, pc.dictionary_encode(X.column(c).cast(pa.string())))
+            return X
         X = X.copy()
         for c in self.cat_cols:
             if c in X.columns:
@@ -93,6 +140,7 @@ class XGBWithAutoSPW(BaseEstimator, ClassifierMixin):
         params = dict(self.xgb_params)
         params.setdefault("scale_pos_weight", self.scale_pos_weight_)
 
+        import xgboost as xgb  # só no fit; o predict usa o model_ já carregado
         self.model_ = xgb.XGBClassifier(**params)
         self.model_.fit(X, y)
         return self
@@ -0,0 +1,149 @@
+import numpy as np
+
+
+# ------------------------------------------------------------
+# KLL sketch (quantis aproximados, mergeable)
+# ------------------------------------------------------------
+class KLLSketch:
+    """
+    Sketch KLL (Karnin-Lang-Liberty) para quantis em streaming.
+
+    - update() aceita lotes (arrays) e pode ser chamado quantas vezes quiser
+    - merge() combina sketches de lotes/workers diferentes
+    - memória O(k * log(n/k)), sem ordenação global
+
+    Erro de rank normalizado (≈99% de confiança, calibração do Apache
+    DataSketches): eps ≈ 2.296 / k^0.9723  -> k=200: ~1.3%, k=2000: ~0.15%.
+    """
+    def __init__(self, k: int = 200, c: float = 2 / 3, seed: int | None = None):
+        self.k = int(k)
+        self.c = float(c)
+        self.n = 0
+        self.compactors = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    # --------------------------- acumulação ---------------------------
+    def update(self, values) -> "KLLSketch":
+        v = np.asarray(values, dtype=np.float64).ravel()
+        v = v[~np.isnan(v)]
+        if len(v):
+            self.compactors[0] = np.concatenate([self.compactors[0], v])
+            self.n += len(v)
+            self._compress()
+        return self
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        out = KLLSketch(k=min(self.k, other.k), c=self.c)
+        out._rng = self._rng
+        depth = max(len(self.compactors), len(other.compactors))
+        out.compactors = [
+            np.concatenate([
+                self.compactors[h] if h < len(self.compactors) else np.empty(0),
+                other.compactors[h] if h < len(other.compactors) else np.empty(0),
+            ])
+            for h in range(depth)
+        ]
+        out.n = self.n + other.n
+        out._compress()
+        return out
+
+    __add__ = merge
+
+    def _capacity(self, h: int) -> int:
+        depth = len(self.compactors) - h - 1
+        return max(int(np.ceil(self.k * self.c ** depth)), 2)
+
+    def _compress(self) -> None:
+        h = 0
+        while h < len(self.compactors):
+            buf = self.compactors[h]
+            if len(buf) >= self._capacity(h):
+                if h + 1 == len(self.compactors):
+                    self.compactors.append(np.empty(0))
+                buf = np.sort(buf)
+                # com tamanho ímpar, o maior item fica neste nível
+                keep = buf[-1:] if len(buf) % 2 else buf[:0]
+                pairs = buf[: len(buf) - len(keep)]
+                promoted = pairs[self._rng.integers(0, 2)::2]
+                self.compactors[h] = keep
+                self.compactors[h + 1] = np.concatenate([self.compactors[h + 1], promoted])
+                # capacidades dependem da profundidade: recomeça de baixo
+                h = 0
+                continue
+            h += 1
+
+    # --------------------------- consulta ---------------------------
+    def _weighted_items(self):
+        items = np.concatenate(self.compactors)
+        weights = np.concatenate([np.full(len(b), 2 ** h, dtype=np.float64) for h, b in enumerate(self.compactors)])
+        order = np.argsort(items, kind="mergesort")
+        return items[order], np.cumsum(weights[order])
+
+    def quantile(self, q):
+        """
+        Quantil(is) aproximado(s). q escalar ou array em [0, 1].
+        """
+        if self.n == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else float("nan")
+        items, cum = self._weighted_items()
+        q = np.clip(np.asarray(q, dtype=np.float64), 0, 1)
+        idx = np.searchsorted(cum, q * cum[-1], side="left")
+        out = items[np.minimum(idx, len(items) - 1)]
+        return out if np.ndim(out) else float(out)
+
+    def rank(self, value) -> float:
+        """
+        Fração aproximada de itens <= value.
+        """
+        if self.n == 0:
+            return float("nan")
+        items, cum = self._weighted_items()
+        i = np.searchsorted(items, value, side="right")
+        return float(cum[i - 1] / cum[-1]) if i > 0 else 0.0
+
+    @property
+    def rank_error(self) -> float:
+        return 2.296 / self.k ** 0.9723
+
+    @property
+    def size(self) -> int:
+        return int(sum(len(b) for b in self.compactors))
+
+
+# ------------------------------------------------------------
+# score_cuts a partir da população escorada
+# ------------------------------------------------------------
+# rating: q90 = 90º percentil do score (top 10% vira "A"), etc.
+# decisão: mesma correspondência dos cortes padrão (450/570/650)
+RATING_QUANTILES = {"q90": 0.90, "q70": 0.70, "q40": 0.40, "q15": 0.15}
+DECISION_FROM_RATING = {"cut_reprovado": "q15", "cut_manual": "q40", "cut_restricao": "q70"}
+
+
+def score_cuts_from_sketch(sketch: KLLSketch, quantiles: dict | None = None, decimals: int | None = 0):
+    """
+    Gera score_cuts (mesmo formato do score_params) a partir do sketch.
+
+    Retorna:
+        score_cuts (dict): q90/q70/q40/q15 + cut_reprovado/cut_manual/cut_restricao
+        bounds (dict): para cada quantil, o intervalo de score compatível com
+                       o erro de rank do sketch (lo, hi) e o próprio eps
+    """
+    quantiles = quantiles or RATING_QUANTILES
+    eps = sketch.rank_error
+
+    cuts, bounds = {}, {}
+    for name, q in quantiles.items():
+        value = sketch.quantile(q)
+        cuts[name] = round(value, decimals) if decimals is not None else value
+        bounds[name] = {
+            "q": q,
+            "lo": sketch.quantile(max(q - eps, 0.0)),
+            "hi": sketch.quantile(min(q + eps, 1.0)),
+            "rank_error": eps,
+        }
+
+    for cut_name, q_name in DECISION_FROM_RATING.items():
+        if q_name in cuts:
+            cuts[cut_name] = cuts[q_name]
+
+    return cuts, bounds
@@ -0,0 +1,160 @@
+import os
+import uuid
+from datetime import date
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .dtypes import compact_dtypes
+
+
+# ------------------------------------------------------------
+# Layout
+# ------------------------------------------------------------
+# Partições hive: <root>/score_date=2026-10-19/decision=Aprovado/part-*.parquet
+DEFAULT_PARTITION_BY = ("score_date", "decision")
+
+# colunas usadas pelos gráficos do dashboard (app/app.py)
+DASHBOARD_COLUMNS = ["vintage", "score", "y_true", "decision", "years_employed", "years"]
+
+# dentro de cada partição as linhas saem ordenadas por score: o min/max de
+# cada row group fica estreito e filtros por faixa de score pulam row groups
+_SORT_BY = "score"
+
+
+def _partitioning(partition_by, schema: pa.Schema | None = None):
+    if schema is None:
+        return ds.HivePartitioning.discover()
+    return ds.partitioning(pa.schema([schema.field(c) for c in partition_by]), flavor="hive")
+
+
+# ------------------------------------------------------------
+# Escrita
+# ------------------------------------------------------------
+def write_scored_batch(
+    scored,
+    root: str = "data/results",
+    partition_by=DEFAULT_PARTITION_BY,
+    score_date: str | date | None = None,
+    row_group_size: int = 64_000,
+    compression: str = "zstd",
+) -> list[str]:
+    """
+    Grava um lote escorado (DataFrame ou pyarrow.Table) como dataset parquet
+    particionado (hive) — cada chamada acrescenta arquivos novos, sem
+    reescrever lotes anteriores.
+
+    - partition_by: ex. ("score_date", "decision") para produção ou
+      ("vintage", "decision") para bases históricas
+    - score_date: data do scoring (padrão: hoje) quando "score_date" é partição
+      e a coluna não existe no lote
+    - estatísticas min/max por row group ficam ligadas (pushdown na leitura)
+
+    Retorna a lista de arquivos escritos.
+    """
+    partition_by = list(partition_by)
+    if isinstance(scored, pd.DataFrame):
+        df = scored
+        if "score_date" in partition_by and "score_date" not in df.columns:
+            df = df.assign(score_date=str(score_date or date.today()))
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    else:
+        table = scored
+        if "score_date" in partition_by and "score_date" not in table.column_names:
+            table = table.append_column("score_date", pa.array([str(score_date or date.today())] * len(table)))
+
+    # dictionary -> string nas chaves de partição (viram nome de diretório)
+    for c in partition_by:
+        i = table.schema.get_field_index(c)
+        if pa.types.is_dictionary(table.schema.field(c).type):
+            table = table.set_column(i, c, table.column(c).cast(pa.string()))
+
+    if _SORT_BY in table.column_names:
+        table = table.sort_by([(c, "ascending") for c in partition_by] + [(_SORT_BY, "ascending")])
+
+    written = []
+    ds.write_dataset(
+        table,
+        root,
+        format="parquet",
+        partitioning=_partitioning(partition_by, table.schema),
+        basename_template=f"part-{uuid.uuid4().hex[:12]}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+        min_rows_per_group=min(row_group_size, max(len(table), 1)),
+        max_rows_per_group=row_group_size,
+        file_options=ds.ParquetFileFormat().make_write_options(
+            compression=compression, write_statistics=True,
+        ),
+        file_visitor=lambda f: written.append(f.path),
+    )
+    return written
+
+
+# ------------------------------------------------------------
+# Leitura
+# ------------------------------------------------------------
+def results_dataset(source: str = "data/results") -> ds.Dataset:
+    """
+    Dataset (lazy) de um diretório particionado ou de um parquet único.
+    """
+    if os.path.isdir(source):
+        return ds.dataset(source, format="parquet", partitioning=_partitioning(None))
+    return ds.dataset(source, format="parquet")
+
+
+def _to_expression(filters):
+    if filters is None or isinstance(filters, ds.Expression):
+        return filters
+    # mesmo formato do pandas.read_parquet: [("vintage", ">=", 30), ...]
+    return pq.filters_to_expression(filters)
+
+
+def read_results(
+    source: str = "data/results",
+    columns: list[str] | None = None,
+    filters=None,
+    compact: bool = True,
+    report: list | None = None,
+) -> pd.DataFrame:
+    """
+    Lê resultados com projeção de colunas e pushdown de predicados.
+
+    - columns: só essas colunas saem do disco (ex.: DASHBOARD_COLUMNS)
+    - filters: pyarrow Expression ou lista no formato do pandas
+      ([("vintage", ">=", 30), ("decision", "==", "Aprovado")]); partições
+      que não batem nem são abertas e row groups são pulados pelo min/max
+
+    Funciona tanto no dataset particionado quanto no score_df.parquet antigo.
+    """
+    table = results_dataset(source).to_table(columns=columns, filter=_to_expression(filters))
+    df = table.to_pandas()
+    return compact_dtypes(df, stage=f"read:{source}", report=report) if compact else df
+
+
+def iter_result_batches(source: str = "data/results", columns=None, filters=None, batch_size: int = 256_000):
+    """
+    Mesmo que read_results, em lotes (pyarrow.RecordBatch) para relatórios
+    em streaming (ex.: ScoreHistogram.update lote a lote).
+    """
+    scanner = results_dataset(source).scanner(
+        columns=columns, filter=_to_expression(filters), batch_size=batch_size,
+    )
+    yield from scanner.to_batches()
+
+
+
+# ------------------------------------------------------------
+# Migração: score_df.parquet -> dataset particionado
+# ------------------------------------------------------------
+def export_score_df(
+    source: str = "data/credit/score_df.parquet",
+    root: str = "data/results/score_df",
+    partition_by=("vintage", "decision"),
+) -> list[str]:
+    """
+    Converte o parquet único de resultados no layout particionado
+    (o app/app.py passa a ler dele quando o diretório existir).
+    """
+    return write_scored_batch(pd.read_parquet(source), root, partition_by=partition_by)
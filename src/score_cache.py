@@ -0,0 +1,203 @@
+import hashlib
+import pickle
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+# ------------------------------------------------------------
+# Hash canônico das features alinhadas
+# ------------------------------------------------------------
+def _canon_categorical(s: pd.Series) -> pd.Categorical:
+    """
+    Mesma chave do caminho string (str(valor), ausente -> "None"), mas
+    convertendo só as categorias: o hash do pandas para Categorical é o hash
+    das categorias indexado pelos códigos, igual ao da coluna de strings.
+    """
+    labels = np.array([str(v) for v in s.cat.categories] + ["None"], dtype=object)
+    uniques, slot = np.unique(labels, return_inverse=True)  # "1" e 1 viram a mesma chave
+    codes = s.cat.codes.to_numpy()
+    return pd.Categorical.from_codes(slot[np.where(codes < 0, len(labels) - 1, codes)], categories=uniques)
+
+
+def hash_feature_rows(X: pd.DataFrame) -> np.ndarray:
+    """
+    Gera um hash estável (uint64) por linha do vetor de features alinhado.
+
+    A representação é canonizada antes do hash para que o mesmo cliente
+    gere a mesma chave independente do dtype de chegada:
+      - numéricas/booleanas -> float64 (1 e 1.0 viram a mesma chave)
+      - demais (categóricas/texto) -> string
+    A ordem das colunas faz parte da chave (use sempre o schema do treino).
+    """
+    canon = {}
+    for c in X.columns:
+        s = X[c]
+        if pd.api.types.is_numeric_dtype(s) or pd.api.types.is_bool_dtype(s):
+            canon[c] = pd.to_numeric(s, errors="coerce").astype("float64")
+        elif isinstance(s.dtype, pd.CategoricalDtype):
+            canon[c] = _canon_categorical(s)
+        else:
+            canon[c] = s.astype(object).where(s.notna(), None).astype(str)
+
+    canon = pd.DataFrame(canon, index=X.index)
+    return pd.util.hash_pandas_object(canon, index=False).to_numpy(dtype=np.uint64)
+
+
+def model_fingerprint(pipeline) -> str:
+    """
+    Hash do modelo em si: bytes do booster (UBJSON) do último passo + pickle
+    dos passos de pré-processamento. Dois retreinos com os mesmos
+    score_params (A/B vêm de âncoras fixas) têm fingerprints diferentes.
+    Sem booster (outro estimador), usa o pickle do pipeline inteiro.
+    """
+    steps = getattr(pipeline, "steps", None)
+    h = hashlib.blake2b(digest_size=8)
+    if steps:
+        model = steps[-1][1]
+        model = getattr(model, "model_", model)
+        if hasattr(model, "get_booster"):
+            h.update(bytes(model.get_booster().save_raw(raw_format="ubj")))
+            h.update(pickle.dumps([step for _, step in steps[:-1]], protocol=pickle.HIGHEST_PROTOCOL))
+            return h.hexdigest()
+    h.update(pickle.dumps(pipeline, protocol=pickle.HIGHEST_PROTOCOL))
+    return h.hexdigest()
+
+
+def score_params_version(score_params: dict, model_version: str) -> str:
+    """
+    Versão do par modelo + score_params usada como prefixo da chave do cache.
+    Qualquer mudança em A/B/cortes invalida as entradas antigas; o modelo
+    entra por model_version (no apply: rótulo + model_fingerprint).
+    """
+    items = sorted((k, str(v)) for k, v in score_params.items())
+    h = pd.util.hash_pandas_object(pd.Series([repr(items)]), index=False).iloc[0]
+    return f"{model_version}:{int(h):016x}"
+
+
+# ------------------------------------------------------------
+# Cache LRU + TTL
+# ------------------------------------------------------------
+class ScoreCache:
+    """
+    Cache de proba_bad por cliente, em frente às funções de apply.
+
+    - chave: (fingerprint do modelo + score_params, hash do vetor de features);
+      o fingerprint de cada pipeline é calculado uma vez (model_key)
+    - tamanho máximo com despejo LRU
+    - TTL em segundos (None = sem expiração)
+    - contadores de hit/miss/evictions/expirations
+    - thread-safe (Streamlit roda sessões em threads)
+    """
+    def __init__(self, maxsize: int = 100_000, ttl: float | None = 3600, clock=time.monotonic):
+        self.maxsize = int(maxsize)
+        self.ttl = ttl
+        self.clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._fingerprints = weakref.WeakKeyDictionary()
+
+    def model_key(self, pipeline) -> str:
+        """
+        model_fingerprint(pipeline), memorizado por objeto de pipeline.
+        """
+        try:
+            key = self._fingerprints.get(pipeline)
+        except TypeError:  # objeto sem weakref: recalcula
+            return model_fingerprint(pipeline)
+        if key is None:
+            key = model_fingerprint(pipeline)
+            self._fingerprints[pipeline] = key
+        return key
+
+    def __len__(self):
+        return len(self._data)
+
+    def get_many(self, version: str, keys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Busca várias chaves de uma vez.
+
+        Retorna:
+            values (ndarray float64): proba em cache (NaN onde não houver)
+            found (ndarray bool): máscara das linhas encontradas
+        """
+        values = np.full(len(keys), np.nan)
+        found = np.zeros(len(keys), dtype=bool)
+        now = self.clock()
+
+        with self._lock:
+            for i, k in enumerate(keys.tolist()):
+                key = (version, k)
+                entry = self._data.get(key)
+                if entry is None:
+                    self.misses += 1
+                    continue
+                value, expires_at = entry
+                if expires_at is not None and expires_at <= now:
+                    del self._data[key]
+                    self.expirations += 1
+                    self.misses += 1
+                    continue
+                self._data.move_to_end(key)
+                values[i] = value
+                found[i] = True
+                self.hits += 1
+
+        return values, found
+
+    def put_many(self, version: str, keys: np.ndarray, values: np.ndarray) -> None:
+        expires_at = None if self.ttl is None else self.clock() + self.ttl
+
+        with self._lock:
+            for k, v in zip(keys.tolist(), np.asarray(values, dtype=float).tolist()):
+                key = (version, k)
+                self._data[key] = (v, expires_at)
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+def predict_proba_cached(pipeline, X: pd.DataFrame, cache: ScoreCache, version: str) -> np.ndarray:
+    """
+    predict_proba com cache: separa o lote em linhas já vistas e novas
+    e só roda o pipeline nas novas.
+    """
+    keys = hash_feature_rows(X)
+    proba, found = cache.get_many(version, keys)
+
+    miss = ~found
+    if miss.any():
+        # duplicatas dentro do próprio lote também só são preditas uma vez
+        miss_keys, first_idx, inverse = np.unique(keys[miss], return_index=True, return_inverse=True)
+        X_miss = X.iloc[np.flatnonzero(miss)[first_idx]]
+        proba_miss = pipeline.predict_proba(X_miss)[:, 1]
+        proba[miss] = proba_miss[inverse]
+        cache.put_many(version, miss_keys, proba_miss)
+
+    return proba
@@ -1,6 +1,13 @@
 import numpy as np
 
 
+# Cortes padrão de rating/decisão (podem ser recalibrados por quantil,
+# ver src/quantile_sketch.py)
+DEFAULT_SCORE_CUTS = {
+    "q90": 750, "q70": 650, "q40": 570, "q15": 450,
+    "cut_reprovado": 450, "cut_manual": 570, "cut_restricao": 650,
+}
+
 def fit_score_scale(p1, s1, p2, s2):
     """
     Ajusta A e B para:
@@ -13,10 +20,23 @@ def fit_score_scale(p1, s1, p2, s2):
     A = s1 + B * np.log(o1)
     return A, B
 
-def proba_to_score(p, A, B, clip_min=300, clip_max=850):
-    p = np.clip(p, 1e-6, 1 - 1e-6)
+# Diferença máxima de score entre os modos float32 e float64 (o ulp do
+# float32 perto de 850 é ~6e-5; clip/odds/log acumulam alguns ulps).
+# Decisões só mudam quando o score cai a menos disso de um corte.
+SCORE_FLOAT32_ATOL = 1e-3
+
+
+def proba_to_score(p, A, B, clip_min=300, clip_max=850, dtype=np.float64):
+    """
+    dtype: precisão do cálculo (clip, odds e log). float64 é a referência;
+    float32 é o modo rápido (ver SCORE_FLOAT32_ATOL). Series continuam Series.
+    """
+    dtype = np.dtype(dtype)
+    p = p.astype(dtype, copy=False) if hasattr(p, "astype") else np.asarray(p, dtype=dtype)
+    eps = dtype.type(1e-6)
+    p = np.clip(p, eps, 1 - eps)
     odds = p / (1 - p)
-    score = A - B * np.log(odds)
+    score = dtype.type(A) - dtype.type(B) * np.log(odds)
     return np.clip(score, clip_min, clip_max)
 
 def rating(score, cuts):
@@ -40,4 +60,40 @@ def decision_by_score(score, cuts):
     elif score < cuts["cut_restricao"]:
         return "Aprovado com Restrição"
     else:
-        return "Aprovado"
\ No newline at end of file
+        return "Aprovado"
+
+# ------------------------------------------------------------
+# Versões vetorizadas (mesmas regras de rating/decision_by_score)
+# ------------------------------------------------------------
+RATING_LABELS = ["A - Excelente", "B - Bom", "C - Regular", "D - Risco", "E - Alto Risco"]
+DECISION_LABELS = ["Reprovado", "Análise Manual", "Aprovado com Restrição", "Aprovado"]
+
+
+def rating_codes(scores, cuts) -> np.ndarray:
+    """
+    Índice (int8) em RATING_LABELS.
+    """
+    s = np.asarray(scores, dtype=float)
+    conds = [s >= cuts["q90"], s >= cuts["q70"], s >= cuts["q40"], s >= cuts["q15"]]
+    return np.select(conds, np.arange(4, dtype=np.int8), default=np.int8(4)).astype(np.int8)
+
+
+def decision_codes(scores, cuts) -> np.ndarray:
+    """
+    Índice (int8) em DECISION_LABELS.
+    """
+    s = np.asarray(scores, dtype=float)
+    conds = [s < cuts["cut_reprovado"], s < cuts["cut_manual"], s < cuts["cut_restricao"]]
+    return np.select(conds, np.arange(3, dtype=np.int8), default=np.int8(3)).astype(np.int8)
+
+
+def rating_array(scores, cuts):
+    s = np.asarray(scores, dtype=float)
+    conds = [s >= cuts["q90"], s >= cuts["q70"], s >= cuts["q40"], s >= cuts["q15"]]
+    return np.select(conds, RATING_LABELS[:4], default=RATING_LABELS[4])
+
+
+def decision_array(scores, cuts):
+    s = np.asarray(scores, dtype=float)
+    conds = [s < cuts["cut_reprovado"], s < cuts["cut_manual"], s < cuts["cut_restricao"]]
+    return np.select(conds, DECISION_LABELS[:3], default=DECISION_LABELS[3])
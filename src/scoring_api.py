@@ -0,0 +1,16 @@
+"""
+Entry point dos workers de scoring: só numpy/pandas na importação.
+
+sklearn/xgboost entram quando o pipeline é carregado (joblib.load) e
+pyarrow/duckdb só nos caminhos que usam (apply Arrow, db_loader).
+O orçamento de import deste módulo é checado por
+`python -m src.benchmarks imports`.
+"""
+from src.scoring import proba_to_score, rating_array, decision_array, rating_codes, decision_codes, DEFAULT_SCORE_CUTS, RATING_LABELS, DECISION_LABELS
+from src.features_history import build_history_features, build_history_features_multi, select_window
+from src.validation import validate_clients, validate_records, SchemaError, REASON_CODES
+from src.score_cache import ScoreCache, hash_feature_rows
+from src.dtypes import compact_dtypes, downcast_floats
+from src.train_apply import apply_pipeline_to_new_data, apply_pipeline_with_history, apply_pipeline_with_validation
+from src.lookup_scorer import LookupScorer
+from src.shared_memory import SharedScoringState, SharedScoringView, init_worker, score_batch, worker_view, unlink_stale
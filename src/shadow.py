@@ -0,0 +1,107 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .scoring import proba_to_score, rating_array, decision_array, DECISION_LABELS
+from .train_apply import _prepare_features, _align_to_training_schema
+
+
+# ------------------------------------------------------------
+# Champion / challenger (shadow scoring)
+# ------------------------------------------------------------
+def apply_shadow_scoring(
+    df_clients_new: pd.DataFrame,
+    df_record_new: pd.DataFrame,
+    models: dict,
+    feature_columns: list[str],
+    champion: str | None = None,
+    window_months: int = 12,
+    score_clip=(300, 850),
+    n_jobs: int = 1,
+):
+    """
+    Aplica N pipelines registrados sobre UMA preparação de features.
+
+    models: {nome: {"pipeline": ..., "score_params": ..., "feature_columns": ... (opcional)}}
+      O primeiro modelo (ou `champion`) é a referência de comparação.
+      feature_columns por modelo é opcional: se o challenger usa um schema
+      diferente, ele é só uma seleção de colunas do mesmo df preparado.
+
+    n_jobs > 1 roda as inferências em threads (o XGBoost libera o GIL no predict).
+
+    Retorna:
+      - df_scoring: cadastro + features + proba_bad_<nome>, score_<nome>,
+        rating_<nome>, decision_<nome> para cada modelo
+      - report: dict com
+          "disagreements": DataFrame (challenger x champion) com contagem/taxa
+                           de decisões diferentes e diferença média de score
+          "crosstabs": {challenger: crosstab de decisão champion x challenger}
+    """
+    if not models:
+        raise ValueError("models vazio: registre pelo menos um pipeline")
+
+    names = list(models)
+    champion = champion or names[0]
+    if champion not in models:
+        raise KeyError(f"champion {champion!r} não está em models")
+
+    # 1) features uma única vez (histórico, merge, alinhamento)
+    df_scoring, X = _prepare_features(df_clients_new, df_record_new, feature_columns, window_months=window_months)
+
+    # 2) só a inferência é repetida por modelo
+    def _score(name):
+        spec = models[name]
+        cols = spec.get("feature_columns")
+        X_model = X if cols is None or list(cols) == list(feature_columns) else _align_to_training_schema(df_scoring, cols)
+        proba = spec["pipeline"].predict_proba(X_model)[:, 1]
+
+        sp = spec["score_params"]
+        score = proba_to_score(proba, sp["A"], sp["B"], clip_min=score_clip[0], clip_max=score_clip[1])
+        return name, proba, score
+
+    if n_jobs > 1 and len(names) > 1:
+        with ThreadPoolExecutor(max_workers=min(n_jobs, len(names))) as ex:
+            results = list(ex.map(_score, names))
+    else:
+        results = [_score(name) for name in names]
+
+    # 3) colunas por modelo
+    outputs = {}
+    for name, proba, score in results:
+        cuts = models[name]["score_params"]["score_cuts"]
+        outputs[f"proba_bad_{name}"] = np.asarray(proba, dtype="float32")
+        outputs[f"score_{name}"] = np.asarray(score, dtype="float32")
+        outputs[f"rating_{name}"] = pd.Categorical(rating_array(score, cuts))
+        outputs[f"decision_{name}"] = pd.Categorical(decision_array(score, cuts), categories=DECISION_LABELS)
+
+    df_scoring = pd.concat([df_scoring, pd.DataFrame(outputs, index=df_scoring.index)], axis=1)
+
+    return df_scoring, _disagreement_report(df_scoring, names, champion)
+
+
+def _disagreement_report(df: pd.DataFrame, names: list[str], champion: str) -> dict:
+    ref = df[f"decision_{champion}"]
+    rows, crosstabs = [], {}
+
+    for name in names:
+        if name == champion:
+            continue
+        dec = df[f"decision_{name}"]
+        diff = ref.to_numpy() != dec.to_numpy()
+        rows.append({
+            "champion": champion,
+            "challenger": name,
+            "n": len(df),
+            "n_disagree": int(diff.sum()),
+            "disagree_rate": float(diff.mean()) if len(df) else 0.0,
+            "mean_score_diff": float((df[f"score_{name}"] - df[f"score_{champion}"]).mean()) if len(df) else 0.0,
+        })
+        crosstabs[name] = pd.crosstab(
+            ref.rename(f"decision_{champion}"), dec.rename(f"decision_{name}"), dropna=False
+        )
+
+    disagreements = pd.DataFrame(rows, columns=[
+        "champion", "challenger", "n", "n_disagree", "disagree_rate", "mean_score_diff",
+    ])
+    return {"disagreements": disagreements, "crosstabs": crosstabs}
@@ -0,0 +1,333 @@
+import atexit
+import os
+import pickle
+import sys
+import uuid
+import weakref
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+
+
+# ------------------------------------------------------------
+# Layout
+# ------------------------------------------------------------
+# Dois blocos de memória compartilhada por publicação:
+#   model:   bytes do booster (UBJSON) + pré-processamento do pipeline (pickle,
+#            poucos KB: DropCols/EnsureCategorical/...)
+#   history: colunas das features do histórico, ordenadas por ID, uma após a
+#            outra (alinhadas em ALIGN bytes); a coluna ID é o índice
+#            (searchsorted), sem hash table por worker
+#
+# O manifest (dict pequeno, picklável) diz nome dos blocos, offsets, dtypes
+# e tamanhos; é ele que vai para o initializer de cada worker.
+MANIFEST_VERSION = 1
+ALIGN = 64
+SHM_PREFIX = "credit_"
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGN) * ALIGN
+
+
+def _create(nbytes: int, prefix: str) -> shared_memory.SharedMemory:
+    name = f"{prefix}{uuid.uuid4().hex[:12]}"
+    return shared_memory.SharedMemory(name=name, create=True, size=max(nbytes, 1))
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """
+    Abre um bloco existente SEM registrá-lo no resource_tracker.
+
+    Antes do Python 3.13, todo SharedMemory(name=...) registra o bloco e o
+    tracker o apaga quando o processo sai: o primeiro worker a terminar
+    derrubaria o bloco de todos. Só quem publica registra (e faz unlink).
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args, **kwargs: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def _readonly(buf, dtype, shape, offset: int) -> np.ndarray:
+    arr = np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset)
+    arr.flags.writeable = False
+    return arr
+
+
+def _final_model(pipeline):
+    model = pipeline.steps[-1][1]
+    return getattr(model, "model_", model)
+
+
+# ------------------------------------------------------------
+# Publicação (processo pai)
+# ------------------------------------------------------------
+def _publish_model(pipeline, prefix: str) -> tuple[shared_memory.SharedMemory, dict]:
+    booster = bytes(_final_model(pipeline).get_booster().save_raw(raw_format="ubj"))
+    # só os passos (não o Pipeline fatiado, que o sklearn considera não ajustado)
+    preprocess = pickle.dumps([step for _, step in pipeline.steps[:-1]], protocol=pickle.HIGHEST_PROTOCOL)
+
+    shm = _create(len(booster) + len(preprocess), prefix)
+    shm.buf[:len(booster)] = booster
+    shm.buf[len(booster):len(booster) + len(preprocess)] = preprocess
+    return shm, {"shm": shm.name, "booster_nbytes": len(booster), "preprocess_nbytes": len(preprocess)}
+
+
+def _publish_history(hist: pd.DataFrame, prefix: str) -> tuple[shared_memory.SharedMemory, dict]:
+    """
+    Colunas numéricas do history_features em um bloco só, ordenadas por ID.
+    """
+    hist = hist.sort_values("ID", kind="stable")
+    if hist["ID"].duplicated().any():
+        raise ValueError("history_features com ID duplicado")
+
+    columns, offset = [], 0
+    arrays = {}
+    for c in hist.columns:
+        arr = hist[c].to_numpy()
+        if arr.dtype == object or not np.issubdtype(arr.dtype, np.number):
+            raise TypeError(f"coluna {c!r} não numérica ({arr.dtype}): não vai para memória compartilhada")
+        offset = _aligned(offset)
+        columns.append({"name": c, "dtype": arr.dtype.str, "offset": offset})
+        arrays[c] = arr
+        offset += arr.nbytes
+
+    shm = _create(offset, prefix)
+    for spec in columns:
+        dst = np.ndarray(len(hist), dtype=spec["dtype"], buffer=shm.buf, offset=spec["offset"])
+        dst[:] = arrays[spec["name"]]
+    return shm, {"shm": shm.name, "n_rows": len(hist), "columns": columns}
+
+
+class SharedScoringState:
+    """
+    Dono dos blocos de memória compartilhada (processo pai do pool).
+
+    - publish(pipeline, ..., history=hist): copia booster, pré-processamento
+      e history_features para memória compartilhada uma vez
+    - manifest: dict picklável para o initializer dos workers (init_worker)
+    - close(): fecha e apaga (unlink) os blocos; também roda no `with`, no
+      coletor de lixo e no atexit. Se o processo morrer sem cleanup, o
+      resource_tracker do Python apaga os blocos (ou unlink_stale()).
+
+    Uso:
+        with SharedScoringState.publish(pipeline, score_params, feature_columns, history=hist) as state:
+            with ProcessPoolExecutor(32, initializer=init_worker, initargs=(state.manifest,)) as pool:
+                parts = list(pool.map(score_batch, batches))
+    """
+    def __init__(self, blocks: list, manifest: dict):
+        self._blocks = blocks
+        self.manifest = manifest
+        self._finalizer = weakref.finalize(self, _release, blocks)
+
+    @classmethod
+    def publish(cls, pipeline, score_params: dict, feature_columns: list[str], history: pd.DataFrame | None = None,
+                window_months: int = 12, prefix: str = SHM_PREFIX) -> "SharedScoringState":
+        blocks = []
+        try:
+            shm, model = _publish_model(pipeline, prefix)
+            blocks.append(shm)
+            hist = None
+            if history is not None:
+                shm, hist = _publish_history(history, prefix)
+                blocks.append(shm)
+        except BaseException:
+            _release(blocks)
+            raise
+
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "model": model,
+            "history": hist,
+            "window_months": window_months,
+            "score_params": score_params,
+            "feature_columns": list(feature_columns),
+        }
+        return cls(blocks, manifest)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(b.size for b in self._blocks)
+
+    @property
+    def closed(self) -> bool:
+        return not self._finalizer.alive
+
+    def close(self) -> None:
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _release(blocks: list) -> None:
+    for shm in blocks:
+        try:
+            shm.close()
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def unlink_stale(prefix: str = SHM_PREFIX, names=None) -> list[str]:
+    """
+    Apaga blocos órfãos (ex.: pai morto com SIGKILL). Sem `names`, procura
+    em /dev/shm (Linux) os blocos com o prefixo. Não use com um pool ativo.
+    """
+    if names is None:
+        names = [n for n in os.listdir("/dev/shm") if n.startswith(prefix)] if os.path.isdir("/dev/shm") else []
+    removed = []
+    for name in names:
+        try:
+            shm = _attach(name)
+        except FileNotFoundError:
+            continue
+        shm.close()
+        # o unlink desregistra do tracker: registra antes para o par fechar
+        if sys.version_info < (3, 13):
+            resource_tracker.register(shm._name, "shared_memory")
+        shm.unlink()
+        removed.append(name)
+    return removed
+
+
+# ------------------------------------------------------------
+# Worker (somente leitura)
+# ------------------------------------------------------------
+class SharedScoringView:
+    """
+    Lado do worker: anexa aos blocos publicados sem copiar o histórico.
+
+    - predict_proba(X): pré-processamento + booster (recriado dos bytes
+      compartilhados; o booster em si é pequeno, o que pesava era o unpickle
+      de cada worker)
+    - history_for(ids): linhas do history_features para esses IDs (views
+      somente leitura + um take do lote)
+    - score_clients(df_clients): cadastro -> merge com o histórico
+      compartilhado -> score, igual ao apply_pipeline_with_history
+    """
+    def __init__(self, manifest: dict):
+        if manifest.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"manifest versão {manifest.get('version')} (esperado {MANIFEST_VERSION})")
+        self.manifest = manifest
+        self.score_params = manifest["score_params"]
+        self.feature_columns = manifest["feature_columns"]
+        self._blocks = []
+
+        import xgboost as xgb
+
+        spec = manifest["model"]
+        shm = _attach(spec["shm"])
+        self._blocks.append(shm)
+        n_booster = spec["booster_nbytes"]
+        self.model = xgb.XGBClassifier()
+        self.model.load_model(bytearray(shm.buf[:n_booster]))
+        self.preprocess = pickle.loads(shm.buf[n_booster:n_booster + spec["preprocess_nbytes"]])
+
+        self.history = None
+        self._ids = None
+        if manifest["history"] is not None:
+            spec = manifest["history"]
+            shm = _attach(spec["shm"])
+            self._blocks.append(shm)
+            self.history = {
+                c["name"]: _readonly(shm.buf, np.dtype(c["dtype"]), (spec["n_rows"],), c["offset"])
+                for c in spec["columns"]
+            }
+            self._ids = self.history["ID"]
+
+    # --------------------------- modelo ---------------------------
+    def predict_proba(self, X: pd.DataFrame) -> np.ndarray:
+        for step in self.preprocess:
+            X = step.transform(X)
+        return self.model.predict_proba(X)
+
+    # --------------------------- histórico ---------------------------
+    def history_for(self, ids) -> pd.DataFrame:
+        """
+        history_features só dos IDs do lote que têm histórico (mesma saída
+        do build_history_features filtrado por ID).
+        """
+        if self.history is None:
+            raise ValueError("manifest publicado sem history_features")
+        ids = np.asarray(ids)
+        if len(self._ids) == 0:
+            pos = np.zeros(0, dtype=np.intp)
+        else:
+            pos = np.searchsorted(self._ids, ids).clip(max=len(self._ids) - 1)
+            pos = np.unique(pos[self._ids[pos] == ids])
+        return pd.DataFrame({c: arr[pos] for c, arr in self.history.items()})
+
+    def score_clients(self, df_clients: pd.DataFrame, score_clip=(300, 850), dtype: str = "float64") -> pd.DataFrame:
+        from .train_apply import _merge_history, _align_to_training_schema, _attach_score_outputs
+        from .dtypes import compact_dtypes, downcast_floats, FLOAT64_COLS
+
+        df = compact_dtypes(df_clients.copy(), stage="scoring:clients")
+        df = _merge_history(df, self.history_for(df["ID"].to_numpy()))
+        df = compact_dtypes(df, stage="scoring:merged")
+        X = _align_to_training_schema(df, self.feature_columns)
+        if dtype == "float32":
+            X = downcast_floats(X, skip=FLOAT64_COLS)
+        proba = self.predict_proba(X)[:, 1]
+        return _attach_score_outputs(df, proba, self.score_params, score_clip=score_clip, dtype=dtype)
+
+    # --------------------------- ciclo de vida ---------------------------
+    def close(self) -> None:
+        # as views precisam sair antes do close (o buffer não fecha com export ativo)
+        self.history = None
+        self._ids = None
+        for shm in self._blocks:
+            shm.close()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ------------------------------------------------------------
+# Helpers para ProcessPoolExecutor / multiprocessing.Pool
+# ------------------------------------------------------------
+_WORKER_VIEW: SharedScoringView | None = None
+
+
+def init_worker(manifest: dict) -> None:
+    """
+    initializer do pool: anexa uma vez por processo.
+    """
+    global _WORKER_VIEW
+    if _WORKER_VIEW is not None:
+        _WORKER_VIEW.close()
+    _WORKER_VIEW = SharedScoringView(manifest)
+    atexit.register(_close_worker)
+
+
+def _close_worker() -> None:
+    global _WORKER_VIEW
+    if _WORKER_VIEW is not None:
+        _WORKER_VIEW.close()
+        _WORKER_VIEW = None
+
+
+def worker_view() -> SharedScoringView:
+    if _WORKER_VIEW is None:
+        raise RuntimeError("worker sem init_worker(manifest)")
+    return _WORKER_VIEW
+
+
+def score_batch(df_clients: pd.DataFrame, score_clip=(300, 850), dtype: str = "float64") -> pd.DataFrame:
+    """
+    Função de tarefa do pool: escora um lote de cadastro no worker.
+    """
+    return worker_view().score_clients(df_clients, score_clip=score_clip, dtype=dtype)
@@ -0,0 +1,230 @@
+import copy
+import os
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+
+from .features_history import BAD
+from .train_apply import _prepare_features
+from .scoring import proba_to_score, rating_codes, decision_codes, RATING_LABELS, DECISION_LABELS
+
+
+# ------------------------------------------------------------
+# Cenários (transformações vetorizadas na matriz de features)
+# ------------------------------------------------------------
+# Cada cenário é uma função X -> X' sobre a matriz já alinhada ao treino
+# (saída do _prepare_features). Renda está em log, como no model_df; para
+# matrizes com renda em R$ use income_scale="raw" (como no what_if_grid).
+def income_shock(pct: float, cols=("amt_income_month", "renda_per_capita"), income_scale: str = "log"):
+    """
+    Renda multiplicada por (1 + pct). Ex.: pct=-0.2 -> renda −20%.
+
+    income_scale: "log" (renda em log1p, como no model_df: soma log1p(pct))
+                  ou "raw" (renda em R$: multiplica por 1 + pct)
+    """
+    if income_scale == "log":
+        shift, factor = np.log1p(pct), 1.0
+    elif income_scale == "raw":
+        shift, factor = 0.0, 1.0 + pct
+    else:
+        raise ValueError("income_scale deve ser 'raw' ou 'log'")
+
+    def transform(X: pd.DataFrame) -> pd.DataFrame:
+        X = X.copy()
+        for c in cols:
+            if c in X.columns:
+                X[c] = X[c] * factor + shift
+        return X
+    return transform
+
+
+def delinquency_step(steps: int = 1):
+    """
+    Piora o STATUS do mês mais recente em `steps` níveis (teto 5) para quem
+    tem histórico; max_status e last_bad acompanham.
+    """
+    def transform(X: pd.DataFrame) -> pd.DataFrame:
+        X = X.copy()
+        has_hist = X["n_months"].to_numpy() > 0
+        last = X["last_status"].to_numpy()
+        new_last = np.where(has_hist, np.minimum(last + steps, 5), last)
+        X["last_status"] = new_last.astype(X["last_status"].dtype)
+        if "max_status" in X.columns:
+            X["max_status"] = np.maximum(X["max_status"].to_numpy(), new_last).astype(X["max_status"].dtype)
+        if "last_bad" in X.columns and "last_month" in X.columns:
+            now_bad = has_hist & np.isin(new_last, list(BAD))
+            X["last_bad"] = np.where(now_bad, X["last_month"].to_numpy(), X["last_bad"].to_numpy())
+        return X
+    return transform
+
+
+def reset_years_employed(value: float = 0.0):
+    """
+    Todos perdem o emprego atual (years_employed = value).
+    """
+    def transform(X: pd.DataFrame) -> pd.DataFrame:
+        X = X.copy()
+        X["years_employed"] = np.asarray(value, dtype=X["years_employed"].dtype)
+        return X
+    return transform
+
+
+def combine(*transforms):
+    """
+    Aplica os cenários em sequência (ex.: renda −20% + 1 atraso).
+    """
+    def transform(X: pd.DataFrame) -> pd.DataFrame:
+        for t in transforms:
+            X = t(X)
+        return X
+    return transform
+
+
+DEFAULT_SCENARIOS = {
+    "income_-20%": income_shock(-0.20),
+    "delinquency_+1": delinquency_step(1),
+    "years_employed_reset": reset_years_employed(),
+    "combined": combine(income_shock(-0.20), delinquency_step(1), reset_years_employed()),
+}
+
+# decisões que contam como aprovação (mesmo critério do dashboard: "Aprov")
+APPROVED_DECISIONS = [i for i, d in enumerate(DECISION_LABELS) if "Aprov" in d]
+
+
+# ------------------------------------------------------------
+# Shard: baseline + cenários, só agregados
+# ------------------------------------------------------------
+def _aggregate(proba: np.ndarray, score: np.ndarray, rating: np.ndarray, decision: np.ndarray,
+               base_rating: np.ndarray, base_decision: np.ndarray) -> dict:
+    n_r, n_d = len(RATING_LABELS), len(DECISION_LABELS)
+    approved = np.isin(decision, APPROVED_DECISIONS)
+    return {
+        "n": len(proba),
+        "sum_proba": float(proba.sum()),
+        "sum_score": float(score.sum()),
+        "n_approved": int(approved.sum()),
+        "sum_proba_approved": float(proba[approved].sum()),
+        "rating_migration": np.bincount(base_rating * n_r + rating, minlength=n_r * n_r).reshape(n_r, n_r),
+        "decision_migration": np.bincount(base_decision * n_d + decision, minlength=n_d * n_d).reshape(n_d, n_d),
+    }
+
+
+def _run_shard(pipeline, X: pd.DataFrame, scenarios: dict, score_params: dict, score_clip) -> dict:
+    cuts = score_params["score_cuts"]
+
+    def score_of(Xs):
+        proba = pipeline.predict_proba(Xs)[:, 1].astype(np.float64)
+        score = proba_to_score(proba, score_params["A"], score_params["B"],
+                               clip_min=score_clip[0], clip_max=score_clip[1])
+        return proba, score, rating_codes(score, cuts), decision_codes(score, cuts)
+
+    base = score_of(X)
+    out = {"baseline": _aggregate(*base, base[2], base[3])}
+    for name, transform in scenarios.items():
+        # só o shard do cenário atual fica em memória
+        out[name] = _aggregate(*score_of(transform(X)), base[2], base[3])
+    return out
+
+
+def _limit_threads(pipeline, threads: int):
+    """
+    Cópia do pipeline com o XGBoost limitado a `threads` (evita que N shards
+    em paralelo disputem todos os núcleos cada um).
+    """
+    model = getattr(pipeline.steps[-1][1], "model_", None) if hasattr(pipeline, "steps") else None
+    if model is None or not hasattr(model, "set_params"):
+        return pipeline
+    pipeline = copy.deepcopy(pipeline)
+    pipeline.steps[-1][1].model_.set_params(n_jobs=threads)
+    return pipeline
+
+
+def _merge(parts: list[dict]) -> dict:
+    total = {}
+    for part in parts:
+        for name, agg in part.items():
+            if name not in total:
+                total[name] = {k: (v.copy() if isinstance(v, np.ndarray) else v) for k, v in agg.items()}
+            else:
+                for k, v in agg.items():
+                    total[name][k] += v
+    return total
+
+
+# ------------------------------------------------------------
+# API
+# ------------------------------------------------------------
+def run_stress_test(
+    df_clients: pd.DataFrame,
+    df_record: pd.DataFrame,
+    pipeline,
+    score_params: dict,
+    feature_columns: list[str],
+    scenarios: dict | None = None,
+    window_months: int = 12,
+    score_clip=(300, 850),
+    shard_size: int = 100_000,
+    n_jobs: int = -1,
+) -> dict:
+    """
+    Stress test da carteira: re-escora todos os cenários e agrega só as
+    migrações e taxas (nenhuma saída completa de cenário é guardada).
+
+    - as features são preparadas UMA vez (histórico + merge + schema)
+    - a carteira é dividida em shards de `shard_size` linhas; cada shard roda
+      baseline + cenários em paralelo (threads: o predict do XGBoost solta o
+      GIL; cada worker usa cpu_count / n_jobs threads do XGBoost)
+    - cada shard devolve contagens/somas, que são somadas no final
+
+    scenarios: {nome: função X -> X'} (padrão: DEFAULT_SCENARIOS; ver
+    income_shock, delinquency_step, reset_years_employed, combine)
+
+    Retorna:
+        summary (DataFrame): por cenário -> approval_rate, expected_default_rate,
+                             expected_default_rate_approved, mean_score e deltas
+                             vs. baseline
+        rating_migration / decision_migration: {cenário: DataFrame baseline x cenário}
+    """
+    scenarios = DEFAULT_SCENARIOS if scenarios is None else scenarios
+    _, X = _prepare_features(df_clients, df_record, feature_columns, window_months=window_months)
+
+    bounds = range(0, len(X), shard_size)
+    workers = os.cpu_count() if n_jobs in (None, -1) else n_jobs
+    workers = max(1, min(workers, len(bounds)))
+    if workers > 1:
+        pipeline = _limit_threads(pipeline, threads=max(1, (os.cpu_count() or 1) // workers))
+
+    parts = Parallel(n_jobs=workers, prefer="threads")(
+        delayed(_run_shard)(pipeline, X.iloc[i:i + shard_size], scenarios, score_params, score_clip)
+        for i in bounds
+    )
+    total = _merge(parts)
+
+    rows = []
+    for name, agg in total.items():
+        n = max(agg["n"], 1)
+        rows.append({
+            "scenario": name,
+            "n": agg["n"],
+            "approval_rate": agg["n_approved"] / n,
+            "expected_default_rate": agg["sum_proba"] / n,
+            "expected_default_rate_approved": agg["sum_proba_approved"] / max(agg["n_approved"], 1),
+            "mean_score": agg["sum_score"] / n,
+        })
+    summary = pd.DataFrame(rows)
+    base = summary.iloc[0]
+    for c in ["approval_rate", "expected_default_rate", "mean_score"]:
+        summary[f"delta_{c}"] = summary[c] - base[c]
+
+    return {
+        "summary": summary,
+        "rating_migration": {
+            name: pd.DataFrame(agg["rating_migration"], index=RATING_LABELS, columns=RATING_LABELS)
+            for name, agg in total.items()
+        },
+        "decision_migration": {
+            name: pd.DataFrame(agg["decision_migration"], index=DECISION_LABELS, columns=DECISION_LABELS)
+            for name, agg in total.items()
+        },
+    }
@@ -1,11 +1,15 @@
 import numpy as np
 import pandas as pd
 
-from sklearn.metrics import roc_auc_score, classification_report
-
-from .build_pipeline import build_pipeline
-from .scoring import fit_score_scale, proba_to_score, rating, decision_by_score
+from .scoring import fit_score_scale, proba_to_score, rating, decision_by_score, rating_array, decision_array, DEFAULT_SCORE_CUTS
+from .quantile_sketch import KLLSketch, score_cuts_from_sketch
 from .features_history import build_history_features
+from .score_cache import predict_proba_cached, score_params_version, hash_feature_rows
+from .dtypes import compact_dtypes, downcast_floats, _is_arrow, COMPACT_SCHEMA, FLOAT64_COLS
+from .metrics import ScoreHistogram
+
+# sklearn/xgboost (build_pipeline, métricas, bootstrap) só são importados
+# dentro do treino: workers de scoring não pagam esse import.
 
 
 # ------------------------------------------------------------
@@ -15,31 +19,45 @@ def _build_scoring_dataset(
     df_clients: pd.DataFrame,
     df_record: pd.DataFrame | None = None,
     window_months: int = 12,
+    report: list | None = None,
+    validated: bool = False,
 ) -> pd.DataFrame:
     """
     Junta cadastro + features derivadas do histórico.
     Se df_record=None, retorna df_clients como está (útil p/ debug).
+
+    validated=True: entradas já passaram por src/validation.py (tipadas e
+    limpas), então não há coerção de novo — só merge e defaults.
     """
     df = df_clients.copy()
 
     if df_record is None:
         return df
 
-    hist = build_history_features(df_record, window_months=window_months)
+    if not validated:
+        df = compact_dtypes(df, stage="scoring:clients", report=report)
+    hist = build_history_features(df_record, window_months=window_months, report=report, validated=validated)
+
+    return compact_dtypes(_merge_history(df, hist, validated=validated), stage="scoring:merged", report=report)
+
 
+def _merge_history(df: pd.DataFrame, hist: pd.DataFrame, validated: bool = False) -> pd.DataFrame:
+    """
+    Left join cadastro x history_features + defaults para quem não tem histórico.
+    """
     df = df.merge(hist, on="ID", how="left")
 
     # Defaults para quem NÃO tem histórico (muito comum em produção)
     if "n_months" in df.columns:
-        df["n_months"] = df["n_months"].fillna(0).astype(int)
+        df["n_months"] = df["n_months"].fillna(0)
     if "vintage" in df.columns:
-        df["vintage"] = df["vintage"].fillna(0).astype(int)
+        df["vintage"] = df["vintage"].fillna(0)
 
 # status numérico: preencher ausência de histórico com 0
     for c in ["max_status", "last_status"]:
         if c in df.columns:
             # Garante que seja numérico e preenche NaNs (o seu "X") com 0
-            df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0).astype(int)
+            df[c] = df[c].fillna(0) if validated else pd.to_numeric(df[c], errors="coerce").fillna(0)
 
     return df
 
@@ -70,10 +88,20 @@ def train_score_pipeline(
     p_cut=0.90, s_cut=350,
     p_good=0.05, s_good=850,
     score_clip=(300, 850),
+    n_bootstrap=0,
+    bootstrap_alpha=0.05,
+    score_cuts=None,
 ):
     """
     Treina o pipeline, avalia, e gera outputs de score no conjunto de teste.
 
+    n_bootstrap > 0 adiciona metrics["ci"] com intervalos de confiança
+    bootstrap de auc_train, auc_test, gap_auc e ks_test (src/bootstrap.py).
+
+    score_cuts: None (DEFAULT_SCORE_CUTS), um dict de cortes, ou "quantile"
+    para derivar os cortes dos quantis do score no treino (sketch KLL);
+    nesse caso os limites de erro vão em metrics["score_cuts_bounds"].
+
     Retorna:
       - pipeline
       - df_new (teste com score)
@@ -81,6 +109,9 @@ def train_score_pipeline(
       - score_params
       - feature_columns (schema do treino)
     """
+    from sklearn.metrics import roc_auc_score, classification_report
+    from .build_pipeline import build_pipeline
+    from .bootstrap import bootstrap_metrics_ci
 
     cat_cols = cat_cols or []
     drop_cols_model = drop_cols_model or []
@@ -114,15 +145,24 @@ def train_score_pipeline(
     proba_test = pipeline.predict_proba(X_test)[:, 1]
     pred_test = (proba_test >= threshold).astype(int)
     auc_test = roc_auc_score(y_test, proba_test)
+    hist_test = ScoreHistogram.from_arrays(proba_test, y_test)
 
     metrics = {
         "threshold": float(threshold),
         "auc_train": float(auc_train),
         "auc_test": float(auc_test),
         "gap_auc": float(auc_train - auc_test),
+        "ks_test": hist_test.ks(),
+        "gini_test": float(2 * auc_test - 1),
+        "pr_auc_test": hist_test.pr_auc(),
         "report_train": classification_report(y_train, pred_train, zero_division=0),
         "report_test": classification_report(y_test, pred_test, zero_division=0),
     }
+    if n_bootstrap:
+        metrics["ci"] = bootstrap_metrics_ci(
+            y_train, proba_train, y_test, proba_test,
+            n_boot=n_bootstrap, alpha=bootstrap_alpha,
+        )
 
     # 5) Score (A/B) e outputs de negócio (no TEST)
     A, B = fit_score_scale(p_cut, s_cut, p_good, s_good)
@@ -135,10 +175,13 @@ def train_score_pipeline(
         clip_min=score_clip[0], clip_max=score_clip[1]
     )
     
-    score_cuts = {
-        "q90": 750, "q70": 650, "q40": 570, "q15": 450,
-        "cut_reprovado": 450, "cut_manual": 570, "cut_restricao": 650,
-    }
+    if isinstance(score_cuts, str) and score_cuts == "quantile":
+        sketch = KLLSketch(k=2000).update(
+            proba_to_score(proba_train, A, B, clip_min=score_clip[0], clip_max=score_clip[1])
+        )
+        score_cuts, metrics["score_cuts_bounds"] = score_cuts_from_sketch(sketch)
+    else:
+        score_cuts = dict(score_cuts or DEFAULT_SCORE_CUTS)
     df_new["rating"] = df_new["score"].apply(lambda s: rating(s, score_cuts))
     df_new["decision"] = df_new["score"].apply(lambda s: decision_by_score(s, score_cuts))
 
@@ -157,25 +200,22 @@ def train_score_pipeline(
 # ------------------------------------------------------------
 # Apply (jeito antigo - só funciona se df_new já vier completo)
 # ------------------------------------------------------------
-def apply_pipeline_to_new_data(df_new, pipeline, score_params, score_clip=(300, 850)):
+def apply_pipeline_to_new_data(df_new, pipeline, score_params, score_clip=(300, 850),
+                               cache=None, model_version: str | None = None, dtype: str = "float64"):
     """
     df_new: DataFrame só com features (sem target).
     (⚠️ Pressupõe que df_new já tenha as features do histórico.)
-    """
-    df_new = df_new.copy()
-    proba = pipeline.predict_proba(df_new)[:, 1]
-    A, B = score_params["A"], score_params["B"]
-    cuts = score_params["score_cuts"]
 
-    df_new["proba_bad"] = proba
-    df_new["score"] = proba_to_score(
-        df_new["proba_bad"], A, B,
-        clip_min=score_clip[0], clip_max=score_clip[1]
-    )
-    df_new["rating"] = df_new["score"].apply(lambda s: rating(s, cuts))
-    df_new["decision"] = df_new["score"].apply(lambda s: decision_by_score(s, cuts))
+    cache: ScoreCache opcional; linhas já vistas (mesmo vetor de features,
+    mesmo modelo e mesmos score_params) não passam pelo pipeline de novo. O
+    modelo entra na chave pelo fingerprint do pipeline; model_version é só
+    um rótulo opcional.
 
-    return df_new
+    dtype: "float64" (padrão) ou "float32" (ver apply_pipeline_with_history).
+    """
+    df_new = df_new.copy()
+    proba = _predict_proba(pipeline, df_new, score_params, cache=cache, model_version=model_version, dtype=dtype)
+    return _attach_score_outputs(df_new, proba, score_params, score_clip=score_clip, dtype=dtype)
 
 
 # ------------------------------------------------------------
@@ -189,28 +229,183 @@ def apply_pipeline_with_history(
     feature_columns: list[str],
     window_months: int = 12,
     score_clip=(300, 850),
+    cache=None,
+    model_version: str | None = None,
+    dtype: str = "float64",
+    dedup: bool = False,
+    report: list | None = None,
 ):
     """
     Produção realista:
       - chega df_clients_new (cadastro)
       - chega df_record_new (histórico)
       - gera history_features, merge, alinha schema e aplica pipeline
+
+    cache: ScoreCache opcional (ver src/score_cache.py). Reenvios idênticos
+    reaproveitam a proba já calculada; só as linhas novas vão ao pipeline.
+
+    Entrada pyarrow.Table/RecordBatch -> caminho Arrow de ponta a ponta
+    (src/arrow_apply.py), com saída em pyarrow.Table.
+
+    dtype="float32": modo rápido, metade da banda de memória em lotes grandes
+      - matriz de features e saída do pré-processamento em float32 (a proba
+        não muda: o booster já converte tudo para float32)
+      - clip/odds/log do proba_to_score em float32
+    O score difere do float64 em no máximo SCORE_FLOAT32_ATOL; a decisão só
+    muda quando o score está a menos disso de um corte.
+
+    dedup=True: clientes com o mesmo vetor de features (comum nesta base:
+    cadastros repetidos que só mudam o ID) são preditos uma vez e a proba é
+    replicada para todos os IDs. Com `report`, entra a linha
+    {"stage": "scoring:dedup", "rows", "unique_rows", "dedup_ratio"}.
+    (Com cache o lote já é deduplicado nas linhas que não estão no cache.)
+    """
+    if _is_arrow(df_clients_new):
+        from .arrow_apply import apply_pipeline_arrow
+        return apply_pipeline_arrow(df_clients_new, df_record_new, pipeline, score_params, feature_columns,
+                                    window_months=window_months, score_clip=score_clip,
+                                    cache=cache, model_version=model_version, dtype=dtype,
+                                    dedup=dedup, report=report)
+
+    df_scoring, X = _prepare_features(df_clients_new, df_record_new, feature_columns,
+                                      window_months=window_months, dtype=dtype)
+
+    proba = _predict_proba(pipeline, X, score_params, cache=cache, model_version=model_version, dtype=dtype,
+                           dedup=dedup, report=report)
+
+    return _attach_score_outputs(df_scoring, proba, score_params, score_clip=score_clip, dtype=dtype)
+
+
+def apply_pipeline_with_validation(
+    df_clients_new: pd.DataFrame,
+    df_record_new: pd.DataFrame,
+    pipeline,
+    score_params,
+    feature_columns: list[str],
+    window_months: int = 12,
+    score_clip=(300, 850),
+    cache=None,
+    model_version: str | None = None,
+    on_unknown_category: str = "quarantine",
+    dtype: str = "float64",
+    dedup: bool = False,
+    report: list | None = None,
+):
     """
-    df_scoring = _build_scoring_dataset(df_clients_new, df_record_new, window_months=window_months)
+    Igual ao apply_pipeline_with_history, com a etapa de validação na frente
+    (src/validation.py):
+      - linhas inválidas do cadastro/histórico vão para a quarentena com
+        código de motivo (o cliente em quarentena não é escorado; um mês
+        inválido do histórico só sai da janela)
+      - as linhas limpas seguem sem nova coerção
+
+    Retorna:
+        df_scored (DataFrame)
+        quarantine (dict): {"clients": DataFrame, "records": DataFrame}
+    """
+    from .validation import validate_clients, validate_records
+
+    clients, q_clients = validate_clients(df_clients_new, on_unknown_category=on_unknown_category)
+    records, q_records = validate_records(df_record_new)
+
+    df_scoring, X = _prepare_features(clients, records, feature_columns,
+                                      window_months=window_months, validated=True, dtype=dtype)
+    proba = _predict_proba(pipeline, X, score_params, cache=cache, model_version=model_version, dtype=dtype,
+                           dedup=dedup, report=report)
+    out = _attach_score_outputs(df_scoring, proba, score_params, score_clip=score_clip, dtype=dtype)
+
+    return out, {"clients": q_clients, "records": q_records}
+
+
+# ------------------------------------------------------------
+# Helpers de apply (compartilhados pelos modos de scoring)
+# ------------------------------------------------------------
+_SCORE_OUTPUT_COLS = ["proba_bad", "score", "rating", "decision"]
+
+
+def _prepare_features(
+    df_clients_new: pd.DataFrame,
+    df_record_new: pd.DataFrame,
+    feature_columns: list[str],
+    window_months: int = 12,
+    validated: bool = False,
+    dtype: str = "float64",
+):
+    """
+    Histórico -> merge -> alinhamento ao schema do treino.
+    dtype="float32": X sai sem float64 (menos FLOAT64_COLS, que ainda passam
+    pelo LogTransform do pipeline).
+
+    Retorna:
+        df_scoring (DataFrame): cadastro + features (recebe as colunas de score)
+        X (DataFrame): matriz alinhada que entra no pipeline
+    """
+    df_scoring = _build_scoring_dataset(df_clients_new, df_record_new, window_months=window_months,
+                                        validated=validated)
 
     # alinha colunas e ordem igual ao treino
     X = _align_to_training_schema(df_scoring, feature_columns)
+    if dtype == "float32":
+        X = downcast_floats(X, skip=FLOAT64_COLS)
+    return df_scoring, X
+
+
+def _unique_rows(X: pd.DataFrame, report: list | None = None):
+    """
+    Linhas distintas de X pelo hash do vetor de features.
 
+    Retorna (first, inverse): X.iloc[first] são as linhas únicas e
+    resultado_unico[inverse] volta para a ordem original.
+    """
+    keys = hash_feature_rows(X)
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    if report is not None:
+        report.append({
+            "stage": "scoring:dedup",
+            "rows": len(X),
+            "unique_rows": len(first),
+            "dedup_ratio": 1 - len(first) / max(len(X), 1),
+        })
+    return first, inverse
+
+
+def _predict_proba(pipeline, X: pd.DataFrame, score_params, cache=None, model_version=None, dtype="float64",
+                   dedup=False, report=None):
+    if cache is None and dedup:
+        first, inverse = _unique_rows(X, report=report)
+        return _predict_proba(pipeline, X.iloc[first], score_params, dtype=dtype)[inverse]
+
+    if cache is None:
+        if dtype == "float32" and hasattr(pipeline, "steps") and len(pipeline.steps) > 1:
+            # pré-processamento -> float32 -> só o estimador final (passo a
+            # passo: o Pipeline fatiado é "não ajustado" para o sklearn)
+            for _, step in pipeline.steps[:-1]:
+                X = step.transform(X)
+            return pipeline.steps[-1][1].predict_proba(downcast_floats(X))[:, 1]
+        return pipeline.predict_proba(X)[:, 1]
+
+    # a chave identifica o modelo pelo fingerprint (bytes do booster), não só
+    # pelo rótulo: retreinos com os mesmos score_params não se misturam
+    fingerprint = cache.model_key(pipeline)
+    label = f"{model_version}@{fingerprint}" if model_version else fingerprint
+    version = score_params_version(score_params, model_version=label)
+    return predict_proba_cached(pipeline, X, cache, version)
+
+
+def _attach_score_outputs(df: pd.DataFrame, proba, score_params, score_clip=(300, 850),
+                          dtype="float64") -> pd.DataFrame:
+    """
+    Adiciona proba_bad, score, rating e decision ao DataFrame.
+    """
     cuts = score_params["score_cuts"]
-    proba = pipeline.predict_proba(X)[:, 1]
     A, B = score_params["A"], score_params["B"]
 
-    df_scoring["proba_bad"] = proba
-    df_scoring["score"] = proba_to_score(
-        df_scoring["proba_bad"], A, B,
-        clip_min=score_clip[0], clip_max=score_clip[1]
+    df["proba_bad"] = proba
+    df["score"] = proba_to_score(
+        df["proba_bad"], A, B,
+        clip_min=score_clip[0], clip_max=score_clip[1], dtype=dtype
     )
-    df_scoring["rating"] = df_scoring["score"].apply(lambda s: rating(s, cuts))
-    df_scoring["decision"] = df_scoring["score"].apply(lambda s: decision_by_score(s, cuts))
+    df["rating"] = rating_array(df["score"], cuts)
+    df["decision"] = decision_array(df["score"], cuts)
 
-    return df_scoring
+    return compact_dtypes(df, schema={c: COMPACT_SCHEMA[c] for c in _SCORE_OUTPUT_COLS})
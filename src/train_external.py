@@ -0,0 +1,236 @@
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import xgboost as xgb
+from sklearn.pipeline import Pipeline
+
+from .build_pipeline import build_pipeline
+from .pipeline_components import EnsureCategorical, DropCols, XGBWithAutoSPW
+from .scoring import fit_score_scale, DEFAULT_SCORE_CUTS
+from .metrics import ScoreHistogram
+
+
+# ------------------------------------------------------------
+# Leitura em row groups
+# ------------------------------------------------------------
+def _row_groups(path):
+    """
+    Lista (arquivo, índice do row group) de um parquet ou diretório de parquets.
+    """
+    files = ds.dataset(os.fspath(path), format="parquet").files
+    return [(f, i) for f in files for i in range(pq.ParquetFile(f).num_row_groups)]
+
+
+def _read_row_group(file, i, columns=None) -> pd.DataFrame:
+    return pq.ParquetFile(file).read_row_group(i, columns=columns).to_pandas()
+
+
+def _quantile_from_counts(values: np.ndarray, counts: np.ndarray, q: float) -> float:
+    """
+    Mesmo resultado de Series.quantile(q) (interpolação linear), calculado a
+    partir da contagem de cada valor distinto (vintage é inteiro: poucas chaves).
+    """
+    order = np.argsort(values)
+    values, counts = values[order], counts[order]
+    cum = np.cumsum(counts)
+    h = (cum[-1] - 1) * q
+    lo, hi = int(np.floor(h)), int(np.ceil(h))
+    v_lo = values[np.searchsorted(cum, lo, side="right")]
+    v_hi = values[np.searchsorted(cum, hi, side="right")]
+    return float(v_lo + (v_hi - v_lo) * (h - lo))
+
+
+def _scan_dataset(row_groups, target_col, vintage_col, cat_cols):
+    """
+    1ª passada (só colunas pequenas): contagem por vintage, níveis das
+    categóricas e contagem de classes por vintage (para o scale_pos_weight).
+    """
+    vintage_counts, vintage_pos = {}, {}
+    levels = {c: set() for c in cat_cols}
+
+    for f, i in row_groups:
+        part = _read_row_group(f, i, columns=[vintage_col, target_col, *cat_cols])
+        g = part.groupby(vintage_col)[target_col].agg(["size", "sum"])
+        for v, (n, pos) in zip(g.index, g.to_numpy()):
+            vintage_counts[v] = vintage_counts.get(v, 0) + int(n)
+            vintage_pos[v] = vintage_pos.get(v, 0) + int(pos)
+        for c in cat_cols:
+            levels[c].update(part[c].dropna().astype(str).unique())
+
+    return vintage_counts, vintage_pos, {c: sorted(v) for c, v in levels.items()}
+
+
+# ------------------------------------------------------------
+# DataIter (external memory)
+# ------------------------------------------------------------
+class ParquetSplitIter(xgb.DataIter):
+    """
+    Itera row group por row group entregando só as linhas de um lado do
+    split temporal (train: vintage <= cut, test: vintage > cut).
+    Só um row group fica em memória por vez; o XGBoost guarda as páginas
+    quantizadas no cache em disco (cache_prefix).
+    """
+    def __init__(self, row_groups, prepare, split, cut, vintage_col, target_col, cache_prefix):
+        self.row_groups = row_groups
+        self.prepare = prepare
+        self.split = split
+        self.cut = cut
+        self.vintage_col = vintage_col
+        self.target_col = target_col
+        self._it = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data) -> bool:
+        while self._it < len(self.row_groups):
+            f, i = self.row_groups[self._it]
+            self._it += 1
+            batch = _split_rows(_read_row_group(f, i), self.vintage_col, self.cut, self.split)
+            if len(batch) == 0:
+                continue
+            X, y = self.prepare(batch)
+            input_data(data=X, label=y)
+            return True
+        return False
+
+    def reset(self) -> None:
+        self._it = 0
+
+
+def _split_rows(df: pd.DataFrame, vintage_col, cut, split) -> pd.DataFrame:
+    mask = df[vintage_col] <= cut
+    return df[mask] if split == "train" else df[~mask]
+
+
+# ------------------------------------------------------------
+# Train (out-of-core)
+# ------------------------------------------------------------
+def train_score_pipeline_external(
+    parquet_path,
+    target_col="target",
+    vintage_col="vintage",
+    vintage_quantile=0.7,
+    cat_cols=None,
+    drop_cols_model=None,
+    # âncoras do score
+    p_cut=0.90, s_cut=350,
+    p_good=0.05, s_good=850,
+    score_clip=(300, 850),
+    max_bin=256,
+    n_hist_bins=10_000,
+    cache_dir=None,
+):
+    """
+    Versão out-of-core de train_score_pipeline para bases que não cabem em memória.
+
+    - split temporal por quantil de vintage (mesmo corte do treino em memória,
+      calculado pela contagem de cada vintage)
+    - treino com ExtMemQuantileDMatrix alimentado row group a row group
+    - AUC de treino/teste também em streaming (histograma de `n_hist_bins`)
+
+    A memória de pico depende do tamanho do row group, não da base.
+
+    Retorna:
+      - pipeline (sklearn, mesmo formato do build_pipeline -> serve no apply)
+      - metrics
+      - score_params
+      - feature_columns (schema do treino)
+    """
+    cat_cols = list(cat_cols or [])
+    drop_cols_model = list(drop_cols_model or [])
+    row_groups = _row_groups(parquet_path)
+    if not row_groups:
+        raise ValueError(f"nenhum row group encontrado em {parquet_path}")
+
+    schema_cols = pq.ParquetFile(row_groups[0][0]).schema_arrow.names
+    feature_columns = [c for c in schema_cols if c != target_col]
+
+    # 1) corte temporal + níveis das categóricas (1ª passada, colunas pequenas)
+    v_counts, v_pos, levels = _scan_dataset(row_groups, target_col, vintage_col, cat_cols)
+    values = np.array(list(v_counts), dtype=float)
+    cut = _quantile_from_counts(values, np.array(list(v_counts.values())), vintage_quantile)
+
+    n_train = sum(n for v, n in v_counts.items() if v <= cut)
+    pos_train = sum(p for v, p in v_pos.items() if v <= cut)
+    scale_pos_weight = ((n_train - pos_train) / pos_train) if pos_train > 0 else 1.0
+
+    # 2) mesmo pré-processamento do build_pipeline, com categorias fixas
+    #    (os códigos precisam ser os mesmos em todos os row groups)
+    template = build_pipeline(cat_cols=cat_cols, drop_cols_model=drop_cols_model)
+    cat_dtypes = {c: pd.CategoricalDtype(levels[c]) for c in cat_cols}
+    model_cols = [c for c in feature_columns if c not in drop_cols_model]
+
+    def prepare(batch: pd.DataFrame):
+        X = batch[feature_columns].copy()
+        for c, dtype in cat_dtypes.items():
+            X[c] = X[c].astype(str).where(X[c].notna()).astype(dtype)
+        return X[model_cols], batch[target_col].astype(int).to_numpy()
+
+    xgb_params = dict(template.named_steps["model"].xgb_params)
+    num_boost_round = xgb_params.pop("n_estimators", 100)
+    xgb_params.pop("enable_categorical", None)
+    xgb_params.setdefault("scale_pos_weight", scale_pos_weight)
+    xgb_params.setdefault("tree_method", "hist")
+
+    with tempfile.TemporaryDirectory(dir=cache_dir) as tmp:
+        it_train = ParquetSplitIter(
+            row_groups, prepare, "train", cut, vintage_col, target_col,
+            cache_prefix=os.path.join(tmp, "train"),
+        )
+        dtrain = xgb.ExtMemQuantileDMatrix(it_train, max_bin=max_bin, enable_categorical=True)
+        booster = xgb.train(xgb_params, dtrain, num_boost_round=num_boost_round)
+        del dtrain
+
+    # 3) avaliação em streaming
+    hist = {split: ScoreHistogram(n_hist_bins) for split in ("train", "test")}
+    for f, i in row_groups:
+        df = _read_row_group(f, i)
+        for split in ("train", "test"):
+            batch = _split_rows(df, vintage_col, cut, split)
+            if len(batch) == 0:
+                continue
+            X, y = prepare(batch)
+            hist[split].update(booster.predict(xgb.DMatrix(X, enable_categorical=True)), y)
+
+    auc_train = hist["train"].auc()
+    auc_test = hist["test"].auc()
+    n_test = hist["test"].n_pos + hist["test"].n_neg
+
+    metrics = {
+        "auc_train": auc_train,
+        "auc_test": auc_test,
+        "gap_auc": float(auc_train - auc_test),
+        "vintage_cut": cut,
+        "n_train": int(n_train),
+        "n_test": n_test,
+        "ks_test": hist["test"].ks(),
+        "auc_bin_width": 1.0 / n_hist_bins,
+    }
+
+    # 4) empacota como o pipeline padrão (serve direto no apply)
+    clf = xgb.XGBClassifier(enable_categorical=True)
+    clf.load_model(bytearray(booster.save_raw(raw_format="ubj")))
+    model = XGBWithAutoSPW(**template.named_steps["model"].xgb_params)
+    model.model_ = clf
+    model.scale_pos_weight_ = scale_pos_weight
+
+    pipeline = Pipeline([
+        ("ensure_cat", EnsureCategorical(cat_cols=cat_cols)),
+        ("drop", DropCols(cols_to_drop=drop_cols_model)),
+        ("model", model),
+    ])
+
+    A, B = fit_score_scale(p_cut, s_cut, p_good, s_good)
+    score_params = {
+        "A": float(A), "B": float(B),
+        "p_cut": float(p_cut), "s_cut": float(s_cut),
+        "p_good": float(p_good), "s_good": float(s_good),
+        "score_clip_min": float(score_clip[0]),
+        "score_clip_max": float(score_clip[1]),
+        "score_cuts": dict(DEFAULT_SCORE_CUTS),
+    }
+
+    return pipeline, metrics, score_params, feature_columns
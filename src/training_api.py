@@ -0,0 +1,17 @@
+"""
+Entry point de treino: ABT dos arquivos brutos, pipeline, treino (em
+memória e externo), backtest, métricas, intervalos de confiança e curvas de
+safra (carga/updates mensais do credit_record).
+Importa sklearn/xgboost.
+"""
+from src.build_pipeline import build_pipeline
+from src.train_apply import train_score_pipeline
+from src.train_external import train_score_pipeline_external
+from src.backtest import rolling_origin_folds, run_vintage_backtest
+from src.metrics import ScoreHistogram
+from src.bootstrap import bootstrap_auc_ks, bootstrap_metrics_ci
+from src.quantile_sketch import KLLSketch, score_cuts_from_sketch
+from src.scoring import fit_score_scale, DEFAULT_SCORE_CUTS
+from src.model_registry import ModelRegistry, ModelBundle
+from src.abt_builder import build_abt, build_history_target, read_abt, abt_diff
+from src.vintage_analytics import VintageEngine
@@ -0,0 +1,248 @@
+import numpy as np
+import pandas as pd
+
+from .dtypes import compact_dtypes, _downcast_int
+from .features_history import STATUS_MAP
+
+
+# ------------------------------------------------------------
+# Regras
+# ------------------------------------------------------------
+# Níveis vistos no treino (model_df.parquet / booster v3)
+ALLOWED_CATEGORIES = {
+    "NAME_INCOME_TYPE": ["Commercial associate", "Pensioner", "State servant", "Student", "Working"],
+    "NAME_EDUCATION_TYPE": [
+        "Academic degree", "Higher education", "Incomplete higher",
+        "Lower secondary", "Secondary / secondary special",
+    ],
+    "NAME_FAMILY_STATUS": ["Civil marriage", "Married", "Separated", "Single / not married", "Widow"],
+    "NAME_HOUSING_TYPE": [
+        "Co-op apartment", "House / apartment", "Municipal apartment",
+        "Office apartment", "Rented apartment", "With parents",
+    ],
+    "OCCUPATION_TYPE": [
+        "Accountants", "Cleaning staff", "Cooking staff", "Core staff", "Drivers",
+        "HR staff", "High skill tech staff", "IT staff", "Laborers", "Low-skill Laborers",
+        "Managers", "Medicine staff", "Missing", "Private service staff", "Realty agents",
+        "Sales staff", "Secretaries", "Security staff", "Waiters/barmen staff",
+    ],
+}
+
+# colunas numéricas do cadastro -> (mínimo, máximo) aceitos (None = sem limite)
+CLIENT_NUMERIC_RANGES = {
+    "CODE_GENDER": (0, 1),
+    "years": (18, 100),
+    "CNT_CHILDREN": (0, None),
+    "CNT_FAM_MEMBERS": (1, None),
+    "FLAG_OWN_CAR": (0, 1),
+    "FLAG_OWN_REALTY": (0, 1),
+    "years_employed": (0, None),
+    "amt_income_month": (0, None),
+    "renda_per_capita": (0, None),
+    "no_formal_employment": (0, 1),
+    "unclassified_occupation": (0, 1),
+}
+
+RECORD_COLUMNS = ["ID", "MONTHS_BALANCE", "STATUS"]
+
+# códigos de motivo (bit a bit: uma linha pode ter vários)
+REASON_CODES = {
+    "ID_MISSING": 1 << 0,
+    "MONTHS_BALANCE_INVALID": 1 << 1,
+    "MONTHS_BALANCE_FUTURE": 1 << 2,
+    "STATUS_INVALID": 1 << 3,
+    "NUMERIC_INVALID": 1 << 4,
+    "OUT_OF_RANGE": 1 << 5,
+    "CATEGORY_UNKNOWN": 1 << 6,
+    "ID_DUPLICATED": 1 << 7,
+}
+
+
+class SchemaError(ValueError):
+    """Entrada sem as colunas obrigatórias (erro do lote inteiro, não de linhas)."""
+
+
+def _require(df: pd.DataFrame, cols, what: str) -> None:
+    missing = [c for c in cols if c not in df.columns]
+    if missing:
+        raise SchemaError(f"{what}: colunas obrigatórias ausentes: {missing}")
+
+
+def _as_numeric(s: pd.Series) -> pd.Series:
+    # única coerção: já numérico passa direto
+    if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+        return s
+    return pd.to_numeric(s, errors="coerce")
+
+
+def _isin(s: pd.Series, allowed) -> np.ndarray:
+    """
+    isin vetorizado; em categóricas testa só as categorias e indexa pelos códigos.
+    """
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        ok_cat = np.asarray(s.cat.categories.isin(allowed))
+        codes = s.cat.codes.to_numpy()
+        return np.where(codes >= 0, ok_cat[np.maximum(codes, 0)], False)
+    return s.isin(allowed).to_numpy()
+
+
+def _split(df: pd.DataFrame, reasons: np.ndarray):
+    bad = reasons != 0
+    clean = df[~bad]
+    return clean, _quarantine(df, reasons)
+
+
+def _quarantine(df: pd.DataFrame, reasons: np.ndarray) -> pd.DataFrame:
+    bad = reasons != 0
+    quarantine = df[bad].copy()
+    quarantine["reason_mask"] = reasons[bad]
+    quarantine["reasons"] = describe_reasons(reasons[bad])
+    return quarantine
+
+
+def _factorize_status(s: pd.Series):
+    """
+    STATUS -> (códigos, categorias em texto) com uma única fatoração.
+    Valores não-texto (ex.: 0 inteiro) viram "0", como no astype(str).
+    """
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        codes, uniques = s.cat.codes.to_numpy(), s.cat.categories
+    else:
+        codes, uniques = pd.factorize(s, use_na_sentinel=True)
+    labels = np.array([str(u) for u in uniques], dtype=object)
+    ucodes, labels = pd.factorize(labels)
+    codes = np.where(codes >= 0, ucodes[np.maximum(codes, 0)], -1) if len(ucodes) else codes
+    return codes, pd.Index(labels, dtype=object)
+
+
+def describe_reasons(mask) -> np.ndarray:
+    """
+    Converte a máscara de bits em texto ("STATUS_INVALID|OUT_OF_RANGE").
+    """
+    mask = np.asarray(mask, dtype=np.int64)
+    out = np.full(len(mask), "", dtype=object)
+    for name, bit in REASON_CODES.items():
+        hit = (mask & bit) != 0
+        out[hit] = out[hit] + np.where(out[hit] == "", "", "|") + name
+    return out
+
+
+# ------------------------------------------------------------
+# Histórico (credit_record)
+# ------------------------------------------------------------
+def validate_records(df_record: pd.DataFrame):
+    """
+    Valida o histórico antes do build_history_features.
+
+    - ID presente
+    - MONTHS_BALANCE numérico inteiro e <= 0
+    - STATUS no conjunto permitido (0-5, C, X)
+
+    Tudo em arrays numpy (uma fatoração do STATUS, sem cópia do DataFrame
+    de entrada). Retorna (clean, quarantine): `clean` sai tipado
+    (ID int32, MONTHS_BALANCE int8, STATUS category) e pode ir para
+    build_history_features(..., validated=True) sem nova coerção.
+    """
+    _require(df_record, RECORD_COLUMNS, "credit_record")
+    reasons = np.zeros(len(df_record), dtype=np.int64)
+
+    ids = _as_numeric(df_record["ID"])
+    if ids.hasnans:
+        reasons |= np.where(ids.isna().to_numpy(), REASON_CODES["ID_MISSING"], 0)
+
+    months = _as_numeric(df_record["MONTHS_BALANCE"])
+    m = months.to_numpy()
+    # Int64 (nullable) também é "integer": só vai pelo atalho sem NA
+    if pd.api.types.is_integer_dtype(months) and not months.hasnans:
+        valid = np.ones(len(m), dtype=bool)
+    else:
+        m = months.to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = ~np.isnan(m) & (m == np.floor(m))
+        reasons |= np.where(valid, 0, REASON_CODES["MONTHS_BALANCE_INVALID"])
+    reasons |= np.where(valid & (m > 0), REASON_CODES["MONTHS_BALANCE_FUTURE"], 0)
+
+    codes, labels = _factorize_status(df_record["STATUS"])
+    ok_label = np.asarray(labels.isin(list(STATUS_MAP)))
+    ok_status = np.where(codes >= 0, ok_label[np.maximum(codes, 0)], False)
+    reasons |= np.where(ok_status, 0, REASON_CODES["STATUS_INVALID"])
+
+    keep = reasons == 0
+    all_clean = bool(keep.all())
+    pick = (lambda a: a) if all_clean else (lambda a: a[keep])
+
+    # categorias inválidas não sobram no clean
+    labels_ok = labels[ok_label]
+    remap = np.cumsum(ok_label) - 1
+    status = pd.Categorical.from_codes(remap[pick(codes)], categories=labels_ok)
+
+    index = df_record.index if all_clean else df_record.index[keep]
+    clean = pd.DataFrame({
+        "ID": _downcast_int(pd.Series(pick(ids.to_numpy()), index=index), "int32"),
+        "MONTHS_BALANCE": _downcast_int(pd.Series(pick(m), index=index).astype(np.int64), "int8"),
+        "STATUS": pd.Series(status, index=index),
+    })
+    quarantine = _quarantine(df_record, reasons)
+    return clean, quarantine
+
+
+# ------------------------------------------------------------
+# Cadastro
+# ------------------------------------------------------------
+def validate_clients(
+    df_clients: pd.DataFrame,
+    allowed_categories: dict | None = None,
+    numeric_ranges: dict | None = None,
+    on_unknown_category: str = "quarantine",
+):
+    """
+    Valida o cadastro antes do build_scoring_df.
+
+    - ID presente e único
+    - colunas numéricas numéricas e dentro do range (renda >= 0, etc.)
+    - categóricas dentro dos níveis vistos no treino
+      (on_unknown_category="pass" só marca, sem mandar para quarentena)
+
+    Retorna (clean, quarantine); `clean` já está no schema compacto.
+    """
+    allowed_categories = ALLOWED_CATEGORIES if allowed_categories is None else allowed_categories
+    numeric_ranges = CLIENT_NUMERIC_RANGES if numeric_ranges is None else numeric_ranges
+    _require(df_clients, ["ID"], "cadastro")
+
+    df = df_clients.copy()
+    reasons = np.zeros(len(df), dtype=np.int64)
+
+    ids = _as_numeric(df["ID"])
+    reasons |= np.where(ids.isna().to_numpy(), REASON_CODES["ID_MISSING"], 0)
+    reasons |= np.where(ids.duplicated(keep="first").to_numpy() & ids.notna().to_numpy(),
+                        REASON_CODES["ID_DUPLICATED"], 0)
+    df["ID"] = ids
+
+    for c, (lo, hi) in numeric_ranges.items():
+        if c not in df.columns:
+            continue
+        raw = df[c]
+        num = _as_numeric(raw)
+        v = num.to_numpy(dtype=np.float64, na_value=np.nan)
+        reasons |= np.where(np.isnan(v) & raw.notna().to_numpy(), REASON_CODES["NUMERIC_INVALID"], 0)
+        out = np.zeros(len(v), dtype=bool)
+        if lo is not None:
+            out |= v < lo
+        if hi is not None:
+            out |= v > hi
+        reasons |= np.where(out, REASON_CODES["OUT_OF_RANGE"], 0)
+        df[c] = num
+
+    unknown = np.zeros(len(df), dtype=bool)
+    for c, allowed in allowed_categories.items():
+        if c not in df.columns:
+            continue
+        s = df[c].astype("category")
+        unknown |= ~_isin(s, allowed) & s.notna().to_numpy()
+        df[c] = s
+    if on_unknown_category == "quarantine":
+        reasons |= np.where(unknown, REASON_CODES["CATEGORY_UNKNOWN"], 0)
+    elif on_unknown_category != "pass":
+        raise ValueError("on_unknown_category deve ser 'quarantine' ou 'pass'")
+
+    clean, quarantine = _split(df, reasons)
+    return compact_dtypes(clean), quarantine
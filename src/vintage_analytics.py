@@ -0,0 +1,298 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from .features_history import BAD, STATUS_MAP
+
+
+# ------------------------------------------------------------
+# Definições
+# ------------------------------------------------------------
+# Meses absolutos: mês = as_of + MONTHS_BALANCE, onde as_of é o índice do mês
+# de extração do lote (0 na carga inicial do credit_record; +1 a cada mês).
+#   safra (origin)  primeiro mês observado da conta
+#   MOB             months on book = mês - safra
+#   first_bad       primeiro mês com STATUS ruim (2-5)
+# Curva da safra o: bad rate acumulada(o, m) = contas com first_bad - o <= m
+# / contas da safra, definida até m = as_of - o.
+#
+# Estado por conta (origin, first_bad, last_month) só combina por min/max:
+# aplicar o mesmo delta duas vezes ou fora de ordem dá o mesmo resultado.
+NO_BAD = np.iinfo(np.int32).max
+FORMAT_VERSION = 1
+COHORTS_FILE = "cohorts.json"
+ACCOUNTS_FILE = "accounts.parquet"
+
+
+_BAD_LABELS = sorted(k for k, v in STATUS_MAP.items() if v in BAD)
+
+
+def _status_bad(status: pd.Series) -> np.ndarray:
+    # Categorical (parquet lido com dicionário): testa só as categorias
+    if isinstance(status.dtype, pd.CategoricalDtype):
+        bad = status.cat.categories.astype(str).isin(_BAD_LABELS)
+        codes = status.cat.codes.to_numpy()
+        return np.where(codes >= 0, bad[codes], False)
+    return status.astype(str).isin(_BAD_LABELS).to_numpy()
+
+
+def _account_deltas(records: pd.DataFrame, as_of: int) -> pd.DataFrame:
+    """
+    Lote de registros -> (origin, first_bad, last_month) por ID.
+    """
+    month = as_of + pd.to_numeric(records["MONTHS_BALANCE"], errors="coerce").to_numpy(dtype=float)
+    keep = ~np.isnan(month)
+    month = month[keep].astype(np.int32)
+    bad = _status_bad(records["STATUS"])[keep]
+
+    frame = pd.DataFrame({
+        "origin": month,
+        "first_bad": np.where(bad, month, NO_BAD).astype(np.int32),
+        "last_month": month,
+    }, index=pd.Index(records["ID"].to_numpy()[keep], name="ID"))
+    return frame.groupby(level=0).agg({"origin": "min", "first_bad": "min", "last_month": "max"})
+
+
+# ------------------------------------------------------------
+# Matriz de safras (estado pequeno, o que o app carrega)
+# ------------------------------------------------------------
+class CohortMatrix:
+    """
+    Contagens por safra: contas (n_accounts[o]) e primeiros maus por MOB
+    (bad_counts[o, m]). Alguns KB em JSON; curves()/summary() derivam as
+    taxas na hora.
+    """
+    def __init__(self, origin0: int = 0, n_accounts=None, bad_counts=None, as_of: int | None = None):
+        self.origin0 = int(origin0)
+        self.n_accounts = np.zeros(0, dtype=np.int64) if n_accounts is None else np.asarray(n_accounts, dtype=np.int64)
+        self.bad_counts = (np.zeros((len(self.n_accounts), 0), dtype=np.int64) if bad_counts is None
+                           else np.asarray(bad_counts, dtype=np.int64).reshape(len(self.n_accounts), -1))
+        self.as_of = as_of
+
+    @property
+    def origins(self) -> np.ndarray:
+        return self.origin0 + np.arange(len(self.n_accounts))
+
+    def _grow(self, origins: np.ndarray, mobs: np.ndarray) -> None:
+        if len(origins) == 0:
+            return
+        lo = min(int(origins.min()), self.origin0) if len(self.n_accounts) else int(origins.min())
+        hi = max(int(origins.max()), self.origin0 + len(self.n_accounts) - 1)
+        n_mob = max(int(mobs.max()) + 1 if len(mobs) else 0, self.bad_counts.shape[1])
+        if lo == self.origin0 and hi - lo + 1 == len(self.n_accounts) and n_mob == self.bad_counts.shape[1]:
+            return
+        n_accounts = np.zeros(hi - lo + 1, dtype=np.int64)
+        bad_counts = np.zeros((hi - lo + 1, n_mob), dtype=np.int64)
+        shift = self.origin0 - lo
+        n_accounts[shift:shift + len(self.n_accounts)] = self.n_accounts
+        bad_counts[shift:shift + len(self.n_accounts), :self.bad_counts.shape[1]] = self.bad_counts
+        self.origin0, self.n_accounts, self.bad_counts = lo, n_accounts, bad_counts
+
+    def add(self, accounts: pd.DataFrame, sign: int = 1) -> None:
+        """
+        Soma (sign=+1) ou retira (-1) a contribuição dessas contas.
+        """
+        origin = accounts["origin"].to_numpy(dtype=np.int64)
+        first_bad = accounts["first_bad"].to_numpy(dtype=np.int64)
+        is_bad = first_bad != NO_BAD
+        mob = first_bad[is_bad] - origin[is_bad]
+        self._grow(origin, mob)
+        np.add.at(self.n_accounts, origin - self.origin0, sign)
+        np.add.at(self.bad_counts, (origin[is_bad] - self.origin0, mob), sign)
+
+    # --------------------------- leitura ---------------------------
+    def _grouped(self, group_months: int):
+        origins = self.origins
+        if group_months <= 1:
+            return origins, self.n_accounts, self.bad_counts
+        key = (origins - self.origin0) // group_months
+        n = np.bincount(key, weights=self.n_accounts).astype(np.int64)
+        bad = np.zeros((len(n), self.bad_counts.shape[1]), dtype=np.int64)
+        np.add.at(bad, key, self.bad_counts)
+        # safra agrupada começa no seu mês mais antigo (horizonte mais longo)
+        return self.origin0 + np.arange(len(n)) * group_months, n, bad
+
+    def curves(self, group_months: int = 1, min_accounts: int = 1, max_mob: int | None = None) -> pd.DataFrame:
+        """
+        Bad rate acumulada por safra (linhas) x MOB (colunas). NaN depois do
+        último mês observável da safra. group_months>1 junta safras
+        consecutivas (taxa ponderada, horizonte da safra mais recente do grupo).
+        """
+        origins, n, bad = self._grouped(group_months)
+        horizon = (self.as_of if self.as_of is not None else origins.max()) - origins
+        if group_months > 1:
+            horizon = horizon - (group_months - 1)
+        # bad_counts só vai até o maior MOB com bad; as colunas vão até o
+        # horizonte da safra mais antiga (a acumulada repete o último valor)
+        n_mob = max(bad.shape[1], int(horizon.max()) + 1 if len(horizon) else 0)
+        bad = np.pad(bad, ((0, 0), (0, n_mob - bad.shape[1])))
+        cum = np.cumsum(bad, axis=1) / np.maximum(n, 1)[:, None]
+        mob = np.arange(cum.shape[1])
+        cum = np.where(mob[None, :] <= horizon[:, None], cum, np.nan)
+
+        out = pd.DataFrame(cum, index=pd.Index(origins, name="origin"), columns=pd.Index(mob, name="mob"))
+        out = out[n >= min_accounts]
+        if max_mob is not None:
+            out = out.loc[:, out.columns <= max_mob]
+        return out
+
+    def summary(self, mobs=(3, 6, 12)) -> pd.DataFrame:
+        """
+        Uma linha por safra: contas, idade (vintage = as_of - safra, mesma
+        escala do score_df), bad rate até hoje e em MOBs fixos.
+        """
+        curves = self.curves(min_accounts=0)
+        cum = np.cumsum(self.bad_counts, axis=1)
+        out = pd.DataFrame({
+            "origin": self.origins,
+            "vintage": (self.as_of if self.as_of is not None else self.origins.max()) - self.origins,
+            "n_accounts": self.n_accounts,
+            "n_bad": cum[:, -1] if cum.shape[1] else 0,
+        })
+        out["bad_rate"] = out["n_bad"] / out["n_accounts"].clip(lower=1)
+        for m in mobs:
+            out[f"bad_rate_mob{m}"] = curves[m].to_numpy() if m in curves.columns else np.nan
+        return out[out["n_accounts"] > 0].reset_index(drop=True)
+
+    # --------------------------- artefato ---------------------------
+    def to_dict(self) -> dict:
+        return {
+            "version": FORMAT_VERSION,
+            "bad_status": sorted(BAD),
+            "as_of": self.as_of,
+            "origin0": self.origin0,
+            "n_accounts": self.n_accounts.tolist(),
+            "bad_counts": self.bad_counts.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "CohortMatrix":
+        if d.get("version") != FORMAT_VERSION:
+            raise ValueError(f"cohorts versão {d.get('version')} (esperado {FORMAT_VERSION})")
+        return cls(d["origin0"], d["n_accounts"], d["bad_counts"], as_of=d["as_of"])
+
+    def to_json(self, path) -> None:
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(self.to_dict(), fh, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, path) -> "CohortMatrix":
+        with open(path, encoding="utf-8") as fh:
+            return cls.from_dict(json.load(fh))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, CohortMatrix):
+            return NotImplemented
+        a, b = self._trimmed(), other._trimmed()
+        return a[0] == b[0] and self.as_of == other.as_of and np.array_equal(a[1], b[1]) and np.array_equal(a[2], b[2])
+
+    def _trimmed(self):
+        # ignora linhas/colunas vazias nas bordas (crescimento e retiradas)
+        rows = np.flatnonzero(self.n_accounts)
+        if len(rows) == 0:
+            return 0, self.n_accounts[:0], self.bad_counts[:0, :0]
+        lo, hi = rows[0], rows[-1] + 1
+        cols = np.flatnonzero(self.bad_counts[lo:hi].any(axis=0))
+        n_mob = cols[-1] + 1 if len(cols) else 0
+        return self.origin0 + lo, self.n_accounts[lo:hi], self.bad_counts[lo:hi, :n_mob]
+
+
+def load_cohorts(state_dir: str) -> CohortMatrix:
+    """
+    Só a matriz de safras (o app não precisa do estado por conta).
+    """
+    return CohortMatrix.from_json(os.path.join(state_dir, COHORTS_FILE))
+
+
+# ------------------------------------------------------------
+# Motor incremental
+# ------------------------------------------------------------
+class VintageEngine:
+    """
+    Mantém as curvas de safra a partir dos deltas mensais do credit_record.
+
+    - from_records(records, as_of=0): carga inicial (histórico completo)
+    - update(delta, as_of): registros novos (normalmente o mês as_of, com
+      MONTHS_BALANCE=0); só as contas do delta mexem na matriz: a
+      contribuição antiga sai e a nova entra
+    - save(state_dir): accounts.parquet (estado por conta, para o próximo
+      update) + cohorts.json (matriz pequena, o que o app lê com load_cohorts)
+
+    Registros atrasados (meses antigos que chegam depois) também funcionam:
+    a safra/first_bad da conta é recalculada por min/max.
+    """
+    def __init__(self, accounts: pd.DataFrame | None = None, matrix: CohortMatrix | None = None):
+        if accounts is None:
+            accounts = pd.DataFrame({c: pd.Series(dtype=np.int32) for c in ["origin", "first_bad", "last_month"]})
+            accounts.index.name = "ID"
+        self.accounts = accounts
+        if matrix is None:
+            matrix = CohortMatrix()
+            matrix.add(accounts)
+        self.matrix = matrix
+
+    @classmethod
+    def from_records(cls, records: pd.DataFrame, as_of: int = 0) -> "VintageEngine":
+        engine = cls()
+        return engine.update(records, as_of=as_of)
+
+    def update(self, records: pd.DataFrame, as_of: int, report: list | None = None) -> "VintageEngine":
+        delta = _account_deltas(records, as_of)
+        cols = ["origin", "first_bad", "last_month"]
+
+        # um get_indexer só; o resto é posicional
+        pos = self.accounts.index.get_indexer(delta.index)
+        known = pos >= 0
+        state = self.accounts[cols].to_numpy()
+        old = state[pos[known]]
+        new = delta[cols].to_numpy()
+        merged = new.copy()
+        merged[known, 0] = np.minimum(new[known, 0], old[:, 0])
+        merged[known, 1] = np.minimum(new[known, 1], old[:, 1])
+        merged[known, 2] = np.maximum(new[known, 2], old[:, 2])
+
+        # só contas cuja safra ou first_bad mudou mexem na matriz
+        changed = (merged[known, :2] != old[:, :2]).any(axis=1)
+        frame = lambda values: pd.DataFrame(values, columns=cols)  # noqa: E731
+        self.matrix.add(frame(old[changed]), sign=-1)
+        self.matrix.add(frame(merged[known][changed]))
+        self.matrix.add(frame(merged[~known]))
+
+        state[pos[known]] = merged[known]
+        accounts = pd.DataFrame(state, index=self.accounts.index, columns=cols)
+        if (~known).any():
+            accounts = pd.concat([accounts, pd.DataFrame(merged[~known], index=delta.index[~known], columns=cols)])
+        self.accounts = accounts.astype(np.int32)
+        self.matrix.as_of = as_of if self.matrix.as_of is None else max(self.matrix.as_of, as_of)
+
+        if report is not None:
+            report.append({
+                "stage": "vintage:update",
+                "as_of": as_of,
+                "records": len(records),
+                "accounts_in_delta": len(delta),
+                "new_accounts": int((~known).sum()),
+                "changed_accounts": int(changed.sum()),
+                "total_accounts": len(self.accounts),
+            })
+        return self
+
+    # --------------------------- leitura ---------------------------
+    def curves(self, **kwargs) -> pd.DataFrame:
+        return self.matrix.curves(**kwargs)
+
+    def summary(self, **kwargs) -> pd.DataFrame:
+        return self.matrix.summary(**kwargs)
+
+    # --------------------------- artefato ---------------------------
+    def save(self, state_dir: str) -> None:
+        os.makedirs(state_dir, exist_ok=True)
+        self.accounts.reset_index().to_parquet(os.path.join(state_dir, ACCOUNTS_FILE), index=False)
+        self.matrix.to_json(os.path.join(state_dir, COHORTS_FILE))
+
+    @classmethod
+    def load(cls, state_dir: str) -> "VintageEngine":
+        accounts = pd.read_parquet(os.path.join(state_dir, ACCOUNTS_FILE)).set_index("ID")
+        return cls(accounts, load_cohorts(state_dir))
@@ -0,0 +1,244 @@
+import numpy as np
+import pandas as pd
+
+from .features_history import build_history_features, STATUS_MAP
+from .dataset_builder import build_scoring_df, prepare_X_for_model
+from .scoring import proba_to_score, rating_array, decision_array, DECISION_LABELS
+
+
+# ------------------------------------------------------------
+# Grade de perturbações
+# ------------------------------------------------------------
+# income: fator multiplicativo sobre a renda; demais: valores absolutos.
+# STATUS: status do mês mais recente do histórico.
+DEFAULT_PERTURBATIONS = {
+    "income": [0.5, 0.75, 0.9, 1.1, 1.25, 1.5, 2.0],
+    "years_employed": [0, 1, 2, 3, 5, 10],
+    "CNT_FAM_MEMBERS": [1, 2, 3, 4, 5],
+    "STATUS": [0, 1, 2, 3, 4, 5],
+}
+
+# fronteiras de decisão (score_cuts) -> decisão alcançada ao cruzar para cima
+DECISION_BOUNDARIES = {
+    "cut_reprovado": DECISION_LABELS[1],
+    "cut_manual": DECISION_LABELS[2],
+    "cut_restricao": DECISION_LABELS[3],
+}
+
+
+def _base_value(dim: str, client: pd.Series, records: pd.DataFrame | None):
+    if dim == "income":
+        return 1.0
+    if dim == "STATUS":
+        if records is None or len(records) == 0:
+            return np.nan
+        # "C"/"X" (e desconhecidos) valem 0, como no build_history_features
+        status = records.loc[records["MONTHS_BALANCE"].idxmax(), "STATUS"]
+        return float(STATUS_MAP.get(str(status), 0))
+    return float(client[dim])
+
+
+def _grid(perturbations: dict, client: pd.Series, records) -> tuple[pd.DataFrame, dict]:
+    """
+    Produto cartesiano das perturbações (o valor base entra em todas as dimensões).
+    """
+    base, axes = {}, {}
+    for dim, values in perturbations.items():
+        base[dim] = _base_value(dim, client, records)
+        # sem histórico, o valor base de STATUS é NaN ("nenhum registro")
+        axes[dim] = np.unique(np.r_[np.asarray(values, dtype=float), base[dim]])
+
+    mesh = np.meshgrid(*axes.values(), indexing="ij")
+    grid = pd.DataFrame({dim: m.ravel() for dim, m in zip(axes, mesh)})
+    return grid, base
+
+
+# ------------------------------------------------------------
+# Variantes -> matriz única
+# ------------------------------------------------------------
+def _variant_clients(client: pd.Series, grid: pd.DataFrame, income_scale: str) -> pd.DataFrame:
+    n = len(grid)
+    df = pd.DataFrame({c: np.repeat(np.asarray([v], dtype=object), n) for c, v in client.items()})
+    df = df.infer_objects()
+    df["ID"] = np.arange(n)
+
+    fam_base = float(client.get("CNT_FAM_MEMBERS", 1) or 1)
+    fam = grid["CNT_FAM_MEMBERS"].to_numpy() if "CNT_FAM_MEMBERS" in grid else np.full(n, fam_base)
+    factor = grid["income"].to_numpy() if "income" in grid else np.ones(n)
+
+    if "CNT_FAM_MEMBERS" in grid:
+        df["CNT_FAM_MEMBERS"] = fam
+    if "years_employed" in grid:
+        df["years_employed"] = grid["years_employed"].to_numpy()
+        # flags derivadas do tempo de emprego (mesma regra do simulador)
+        if "OCCUPATION_TYPE" in df.columns:
+            occ_missing = df["OCCUPATION_TYPE"].astype(str).str.upper().eq("MISSING").to_numpy()
+            ye = df["years_employed"].to_numpy(dtype=float)
+            if "no_formal_employment" in df.columns:
+                df["no_formal_employment"] = (occ_missing & (ye == 0)).astype(int)
+            if "unclassified_occupation" in df.columns:
+                df["unclassified_occupation"] = (occ_missing & (ye > 0)).astype(int)
+
+    # renda e renda per capita acompanham fator de renda e tamanho da família
+    if "amt_income_month" in df.columns:
+        income = float(client["amt_income_month"])
+        if income_scale == "raw":
+            df["amt_income_month"] = income * factor
+            if "renda_per_capita" in df.columns:
+                df["renda_per_capita"] = np.where(fam > 0, income * factor / np.maximum(fam, 1e-12), 0.0)
+        elif income_scale == "log":
+            df["amt_income_month"] = income + np.log(factor)
+            if "renda_per_capita" in df.columns:
+                df["renda_per_capita"] = float(client["renda_per_capita"]) + np.log(factor) + np.log(fam_base / fam)
+        else:
+            raise ValueError("income_scale deve ser 'raw' ou 'log'")
+    return df
+
+
+def _variant_history(records, grid: pd.DataFrame, window_months: int) -> pd.DataFrame:
+    """
+    Features do histórico por variante. Só depende de STATUS, então calcula
+    uma vez por status distinto e replica.
+    """
+    n = len(grid)
+    records = records if records is not None else pd.DataFrame(columns=["ID", "MONTHS_BALANCE", "STATUS"])
+
+    if "STATUS" not in grid:
+        statuses, inverse = np.array([np.nan]), np.zeros(n, dtype=int)
+    else:
+        statuses, inverse = np.unique(grid["STATUS"].to_numpy(), return_inverse=True)
+
+    parts = []
+    for j, s in enumerate(statuses):
+        r = records[["ID", "MONTHS_BALANCE", "STATUS"]].copy()
+        if not np.isnan(s):
+            if len(r):
+                r.loc[r["MONTHS_BALANCE"].idxmax(), "STATUS"] = int(s)
+            else:
+                r = pd.DataFrame({"ID": [j], "MONTHS_BALANCE": [0], "STATUS": [int(s)]})
+        r["ID"] = j
+        parts.append(r)
+
+    hist = build_history_features(pd.concat(parts, ignore_index=True), window_months=window_months)
+    hist = hist.set_index("ID").reindex(np.arange(len(statuses)))
+    out = hist.iloc[inverse].reset_index(drop=True)
+    out.insert(0, "ID", np.arange(n))
+    return out
+
+
+# ------------------------------------------------------------
+# Fronteiras
+# ------------------------------------------------------------
+def _is(values: np.ndarray, v: float) -> np.ndarray:
+    return np.isnan(values) if np.isnan(v) else values == v
+
+
+def _delta(values: np.ndarray, v: float) -> np.ndarray:
+    # a partir de "sem histórico", qualquer registro é mudança (pior status, maior)
+    if np.isnan(v):
+        return np.where(np.isnan(values), 0.0, values + 1)
+    return np.abs(values - v)
+
+
+def _min_changes(surface: pd.DataFrame, base: dict, base_score: float, cuts: dict) -> pd.DataFrame:
+    """
+    Para cada fronteira de decisão e cada dimensão (demais no valor base),
+    a menor mudança da grade que leva o score para o outro lado do corte.
+    "joint" = variante mais próxima (distância normalizada) que cruza o corte.
+    """
+    dims = list(base)
+    at_base = {d: _is(surface[d].to_numpy(), base[d]) for d in dims}
+    deltas = {d: _delta(surface[d].to_numpy(), base[d]) for d in dims}
+    spans = {d: max(deltas[d].max(), 1e-12) for d in dims}
+    score = surface["score"].to_numpy()
+
+    rows = []
+    for cut_name, above_label in DECISION_BOUNDARIES.items():
+        cut = cuts[cut_name]
+        direction = "up" if base_score < cut else "down"
+        crossed = score >= cut if direction == "up" else score < cut
+
+        for d in dims + ["joint"]:
+            if d == "joint":
+                mask = crossed
+                dist = sum(deltas[k] / spans[k] for k in dims)
+            else:
+                others = [at_base[k] for k in dims if k != d]
+                mask = crossed & np.logical_and.reduce(others) if others else crossed
+                dist = deltas[d]
+
+            row = {"boundary": cut_name, "cut": cut, "direction": direction,
+                   "decision_above": above_label, "dimension": d, "reachable": bool(mask.any())}
+            if mask.any():
+                i = np.flatnonzero(mask)[np.argmin(np.where(mask, dist, np.inf)[mask])]
+                row.update({"score": float(score[i]), "decision": surface["decision"].iloc[i]})
+                row.update({f"to_{k}": surface[k].iloc[i] for k in dims})
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+# ------------------------------------------------------------
+# API
+# ------------------------------------------------------------
+def what_if_grid(
+    client,
+    records: pd.DataFrame | None,
+    pipeline,
+    score_params: dict,
+    perturbations: dict | None = None,
+    window_months: int = 12,
+    score_clip=(300, 850),
+    income_scale: str = "raw",
+) -> dict:
+    """
+    Sensibilidade do score de UM cliente a uma grade de perturbações.
+
+    client: cadastro do cliente (dict, Series ou DataFrame de 1 linha, no
+            formato do simulador do app)
+    records: histórico do cliente (ID, MONTHS_BALANCE, STATUS) ou None
+    perturbations: {dimensão: valores} (padrão: DEFAULT_PERTURBATIONS)
+      - "income": fatores sobre a renda (renda_per_capita acompanha)
+      - "years_employed", "CNT_FAM_MEMBERS": valores absolutos
+      - "STATUS": status do mês mais recente
+    income_scale: "raw" (renda em R$, como no simulador) ou "log"
+                  (renda já em log, como no model_df)
+
+    Todas as variantes viram UMA matriz e passam por UM predict_proba.
+
+    Retorna:
+        surface (DataFrame): grade + proba_bad, score, rating, decision
+        base (dict): valores base de cada dimensão + score/decision base
+        min_change (DataFrame): menor mudança para cruzar cada corte de decisão
+    """
+    if isinstance(client, pd.DataFrame):
+        client = client.iloc[0]
+    client = pd.Series(client)
+    perturbations = DEFAULT_PERTURBATIONS if perturbations is None else perturbations
+
+    grid, base = _grid(perturbations, client, records)
+
+    clients = _variant_clients(client, grid, income_scale)
+    hist = _variant_history(records, grid, window_months)
+    df_scoring = build_scoring_df(clients, hist)
+    X, _ = prepare_X_for_model(df_scoring)
+
+    proba = pipeline.predict_proba(X)[:, 1]
+    cuts = score_params["score_cuts"]
+    score = proba_to_score(proba, score_params["A"], score_params["B"],
+                           clip_min=score_clip[0], clip_max=score_clip[1])
+
+    surface = grid.copy()
+    surface["proba_bad"] = proba
+    surface["score"] = score
+    surface["rating"] = rating_array(score, cuts)
+    surface["decision"] = decision_array(score, cuts)
+
+    is_base = np.logical_and.reduce([_is(surface[d].to_numpy(), v) for d, v in base.items()])
+    i = int(np.flatnonzero(is_base)[0])
+    base_info = {**base, "score": float(score[i]), "decision": surface["decision"].iloc[i]}
+
+    return {
+        "surface": surface,
+        "base": base_info,
+        "min_change": _min_changes(surface, base, float(score[i]), cuts),
+    }
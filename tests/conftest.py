@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# mesmo ajuste do app/app.py: `src` importável rodando da raiz do repo
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+MODELS_DIR = os.path.join(ROOT_DIR, "models")
+SCORE_DF = os.path.join(ROOT_DIR, "data", "credit", "score_df.parquet")
+
+
+@pytest.fixture(scope="session")
+def pipeline_v3():
+    """
+    (pipeline, score_params) v3; pula se os artefatos não estiverem no checkout.
+    """
+    if not os.path.exists(os.path.join(MODELS_DIR, "credit_pipeline_v3.pkl")):
+        pytest.skip("models/credit_pipeline_v3.pkl ausente")
+    from src.benchmarks import _load_pipeline_v3
+    return _load_pipeline_v3(MODELS_DIR)
+
+
+@pytest.fixture(scope="session")
+def score_df():
+    if not os.path.exists(SCORE_DF):
+        pytest.skip("data/credit/score_df.parquet ausente")
+    return pd.read_parquet(SCORE_DF)
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from src.cohort_index import CohortIndex
+
+
+def _score_df(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "years": rng.uniform(20, 70, n),
+        "years_employed": rng.uniform(0, 30, n),
+        "amt_income_month": np.log1p(rng.uniform(1_000, 20_000, n)),
+        "NAME_HOUSING_TYPE": rng.choice(["House / apartment", "Rented apartment", "With parents"], n),
+        "y_true": rng.integers(0, 2, n),
+        "score": rng.uniform(300, 850, n),
+    })
+
+
+def test_cohort_igual_query_e_neighbors():
+    score_df = _score_df()
+    index = CohortIndex.build(score_df)
+    client = score_df.iloc[[7]]
+    stats, nb = index.cohort(client, k=25)
+    pd.testing.assert_series_equal(stats, index.query(client, k=25).iloc[0])
+    pd.testing.assert_frame_equal(nb, index.neighbors(client, k=25))
+
+
+def test_fingerprint_vai_no_artefato(tmp_path):
+    fingerprint = {"model_version": "v3.1", "results_mtime": 123.0}
+    index = CohortIndex.build(_score_df(), fingerprint=fingerprint)
+    path = tmp_path / "cohort.joblib"
+    index.save(path)
+    assert CohortIndex.load(path).fingerprint == fingerprint
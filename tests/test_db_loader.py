@@ -0,0 +1,104 @@
+import sqlite3
+
+import pandas as pd
+
+from src.db_loader import (
+    ConnectionPool, RECORD_COLUMNS, _records_sql, load_clients, load_records, iter_scoring_batches,
+)
+
+
+# ------------------------------------------------------------
+# PostgreSQL falso: só o suficiente para o _dialect e o _stream
+# ------------------------------------------------------------
+class _Cursor:
+    def __init__(self, con):
+        self.con = con
+        self.description = None
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        self.con.executed.append((sql, params))
+        # como o PostgreSQL devolveria colunas criadas sem aspas
+        self.description = [(c.lower(),) for c in self.con.columns]
+        self._rows = list(self.con.rows)
+
+    def fetchmany(self, n):
+        out, self._rows = self._rows[:n], self._rows[n:]
+        return out
+
+    def close(self):
+        pass
+
+
+class _PgConnection:
+    def __init__(self, columns, rows):
+        self.columns, self.rows, self.executed = columns, rows, []
+
+    def cursor(self, name=None):
+        return _Cursor(self)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+_PgConnection.__module__ = "psycopg.connection"
+
+
+def _pg_pool(columns, rows):
+    con = _PgConnection(columns, rows)
+    return ConnectionPool(lambda: con, size=1), con
+
+
+def test_records_sql_postgres_usa_aspas():
+    con = _PgConnection(RECORD_COLUMNS, [])
+    sql, params = _records_sql(con, "credit_record", (-12, 0), id_count=2)
+    assert 'SELECT "ID", "MONTHS_BALANCE", "STATUS" FROM credit_record' in sql
+    assert '"MONTHS_BALANCE" BETWEEN %s AND %s' in sql
+    assert '"ID" IN (%s, %s)' in sql
+    assert sql.endswith('ORDER BY "ID"')
+    assert params == [-12, 0]
+
+
+def test_records_sql_sqlite_sem_aspas():
+    con = sqlite3.connect(":memory:")
+    sql, _ = _records_sql(con, "credit_record", (-12, 0), id_count=1)
+    assert "SELECT ID, MONTHS_BALANCE, STATUS FROM credit_record" in sql
+    assert "ID IN (?)" in sql
+    con.close()
+
+
+def test_postgres_colunas_voltam_canonicas():
+    pool, con = _pg_pool(RECORD_COLUMNS, [(1, -1, "0"), (1, 0, "C"), (2, 0, "X")])
+    df = load_records(pool, ids=[1, 2])
+    assert list(df.columns) == RECORD_COLUMNS
+    assert df["ID"].tolist() == [1, 1, 2]
+    assert '"ID" IN (%s, %s)' in con.executed[0][0]
+
+
+def test_postgres_clients_e_ids():
+    pool, con = _pg_pool(["ID", "CODE_GENDER"], [(1, "F"), (2, "M")])
+    df = load_clients(pool, ids=[1, 2], columns=["ID", "CODE_GENDER"])
+    # só as colunas do pipeline (ID, MONTHS_BALANCE, STATUS) são normalizadas
+    assert list(df.columns) == ["ID", "code_gender"]
+    assert con.executed[0][0].startswith('SELECT "ID", "CODE_GENDER" FROM clients WHERE "ID" IN')
+
+    pool, con = _pg_pool(["ID"], [(1,), (2,)])
+    batches = iter_scoring_batches(pool, batch_ids=10)
+    next(batches, None)
+    assert con.executed[0][0] == 'SELECT "ID" FROM clients ORDER BY "ID"'
+
+
+def test_sqlite_roundtrip(tmp_path):
+    path = str(tmp_path / "credit.db")
+    con = sqlite3.connect(path)
+    pd.DataFrame({"ID": [2, 1, 1], "MONTHS_BALANCE": [0, -13, -1], "STATUS": ["1", "0", "C"]}).to_sql(
+        "credit_record", con, index=False)
+    con.close()
+    pool = ConnectionPool(lambda: sqlite3.connect(path, check_same_thread=False), size=2)
+    with pool:
+        df = load_records(pool, ids=[1, 2])
+    assert list(df.columns) == RECORD_COLUMNS
+    assert df["ID"].tolist() == [1, 2]
@@ -0,0 +1,41 @@
+import numpy as np
+
+from src.dtypes import compact_dtypes, COMPACT_PROBA_ATOL, FLOAT64_COLS
+from src.scoring import proba_to_score, decision_codes, SCORE_FLOAT32_ATOL
+
+FEATURES_EXCLUDED = {"y_true", "proba_bad", "score", "rating", "decision"}
+
+
+def _score(pipeline, score_params, X):
+    proba = pipeline.predict_proba(X)[:, 1]
+    return proba, proba_to_score(proba, score_params["A"], score_params["B"], clip_min=300, clip_max=850)
+
+
+def test_compact_schema_keeps_scores_within_tolerance(pipeline_v3, score_df):
+    pipeline, score_params = pipeline_v3
+    wide = score_df[[c for c in score_df.columns if c not in FEATURES_EXCLUDED]]
+    compact = compact_dtypes(wide)
+    assert (compact.dtypes != wide.dtypes).any()
+
+    p_wide, s_wide = _score(pipeline, score_params, wide)
+    p_compact, s_compact = _score(pipeline, score_params, compact)
+
+    np.testing.assert_allclose(p_compact, p_wide, rtol=0, atol=COMPACT_PROBA_ATOL)
+    np.testing.assert_allclose(s_compact, s_wide, rtol=0, atol=SCORE_FLOAT32_ATOL)
+    cuts = score_params["score_cuts"]
+    assert (decision_codes(s_compact, cuts) == decision_codes(s_wide, cuts)).all()
+
+
+def test_compact_schema_matches_stored_scores(pipeline_v3, score_df):
+    # proba_bad/score do parquet foram escorados antes do schema compacto
+    pipeline, score_params = pipeline_v3
+    compact = compact_dtypes(score_df[[c for c in score_df.columns if c not in FEATURES_EXCLUDED]])
+    p_compact, s_compact = _score(pipeline, score_params, compact)
+
+    np.testing.assert_allclose(p_compact, score_df["proba_bad"], rtol=0, atol=COMPACT_PROBA_ATOL)
+    np.testing.assert_allclose(s_compact, score_df["score"], rtol=0, atol=SCORE_FLOAT32_ATOL)
+
+
+def test_income_columns_stay_float64(score_df):
+    compact = compact_dtypes(score_df)
+    assert all(compact[c].dtype == np.float64 for c in FLOAT64_COLS)
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.features_history import build_history_features
+from src.features_history_sql import build_history_features_sql
+
+ENGINES = ["duckdb", "sqlite"]
+
+
+def _require(engine: str) -> None:
+    # sqlite3 é da stdlib; duckdb é opcional
+    if engine == "duckdb":
+        pytest.importorskip("duckdb")
+
+
+def _records(seed: int = 0, n: int = 5_000) -> pd.DataFrame:
+    """
+    Histórico pequeno com os casos de borda:
+      - STATUS C/X (e 0-5) misturados
+      - meses repetidos no mesmo ID com STATUS diferentes
+      - IDs só com registros fora da janela (e meses > 0)
+    """
+    rng = np.random.default_rng(seed)
+    base = pd.DataFrame({
+        "ID": rng.integers(0, 400, n),
+        "MONTHS_BALANCE": -rng.integers(0, 30, n),
+        "STATUS": rng.choice(list("012345CX"), n),
+    })
+    dup = base.sample(800, random_state=seed).assign(STATUS=rng.choice(list("012345CX"), 800))
+    outside = pd.DataFrame({
+        "ID": np.repeat([10_001, 10_002], 3),
+        "MONTHS_BALANCE": [-20, -25, -30, 1, -13, -40],
+        "STATUS": ["2", "C", "X", "5", "1", "0"],
+    })
+    return pd.concat([base, dup, outside], ignore_index=True)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("window_months", [3, 12])
+def test_sql_matches_pandas(engine, window_months):
+    _require(engine)
+    records = _records()
+    expected = build_history_features(records, window_months=window_months)
+    out = build_history_features_sql(records, window_months=window_months, engine=engine)
+
+    assert not out["ID"].isin([10_001, 10_002]).any()
+    pd.testing.assert_frame_equal(out, expected)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_sql_matches_pandas_from_parquet(engine, tmp_path):
+    _require(engine)
+    records = _records(seed=1)
+    path = tmp_path / "credit_record.parquet"
+    records.to_parquet(path, index=False, row_group_size=1_000)
+
+    out = build_history_features_sql(path, engine=engine, batch_size=700)
+    pd.testing.assert_frame_equal(out, build_history_features(records))
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_sql_backend_fills_report(engine):
+    _require(engine)
+    report = []
+    build_history_features(_records(), backend=engine, report=report)
+    assert [r["stage"] for r in report] == ["history:features"]
+    assert report[0]["rows"] > 0
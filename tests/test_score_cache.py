@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.pipeline import Pipeline
+
+from src.scoring import DEFAULT_SCORE_CUTS
+from src.score_cache import ScoreCache, model_fingerprint
+from src.train_apply import apply_pipeline_to_new_data
+
+xgb = pytest.importorskip("xgboost")
+
+SCORE_PARAMS = {"A": 600.0, "B": 20 / np.log(2), "score_cuts": DEFAULT_SCORE_CUTS}
+
+
+def _pipeline(seed: int) -> Pipeline:
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({"a": rng.normal(size=400), "b": rng.normal(size=400)})
+    y = (X["a"] + rng.normal(scale=0.5, size=400) > 0).astype(int)
+    model = xgb.XGBClassifier(n_estimators=5, max_depth=2, random_state=seed)
+    return Pipeline([("model", model)]).fit(X, y)
+
+
+def test_retrained_pipelines_do_not_share_cache_entries():
+    # mesmos score_params, modelos diferentes, mesmo cache, sem model_version
+    X = pd.DataFrame({"a": [0.1, -0.3, 1.2], "b": [0.5, 0.0, -1.0]})
+    old, new = _pipeline(0), _pipeline(1)
+    cache = ScoreCache()
+
+    out_old = apply_pipeline_to_new_data(X, old, SCORE_PARAMS, cache=cache)
+    out_new = apply_pipeline_to_new_data(X, new, SCORE_PARAMS, cache=cache)
+
+    np.testing.assert_allclose(out_new["proba_bad"], new.predict_proba(X)[:, 1], rtol=0, atol=1e-7)
+    assert not np.allclose(out_old["proba_bad"], out_new["proba_bad"])
+    assert cache.stats()["hits"] == 0
+
+
+def test_fingerprint_is_stable_and_memoized():
+    pipe = _pipeline(0)
+    cache = ScoreCache()
+    assert cache.model_key(pipe) == model_fingerprint(pipe) == model_fingerprint(_pipeline(0))
+    assert model_fingerprint(pipe) != model_fingerprint(_pipeline(1))
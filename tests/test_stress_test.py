@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.stress_test import income_shock
+
+
+def _X():
+    return pd.DataFrame({
+        "amt_income_month": [1000.0, 2500.0],
+        "renda_per_capita": [500.0, 2500.0],
+        "years_employed": [1.0, 3.0],
+    })
+
+
+def test_income_shock_raw_multiplica():
+    X = _X()
+    out = income_shock(-0.2, income_scale="raw")(X)
+    np.testing.assert_allclose(out["amt_income_month"], X["amt_income_month"] * 0.8)
+    np.testing.assert_allclose(out["renda_per_capita"], X["renda_per_capita"] * 0.8)
+    pd.testing.assert_series_equal(out["years_employed"], X["years_employed"])
+
+
+def test_income_shock_log_soma_log1p():
+    X = np.log1p(_X())
+    out = income_shock(-0.2, income_scale="log")(X)
+    np.testing.assert_allclose(out["amt_income_month"], X["amt_income_month"] + np.log1p(-0.2))
+    # padrão continua "log" (matriz do _prepare_features, como no model_df)
+    pd.testing.assert_frame_equal(income_shock(-0.2)(X), out)
+
+
+def test_income_shock_scale_invalido():
+    with pytest.raises(ValueError):
+        income_shock(-0.2, income_scale="R$")
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from src.vintage_analytics import VintageEngine
+
+
+def _records():
+    # ID 1: safra -3, bad no MOB 1; ID 2: safra -5, nunca bad
+    return pd.DataFrame({
+        "ID": [1, 1, 1, 2, 2, 2, 2, 2],
+        "MONTHS_BALANCE": [-3, -2, -1, -5, -4, -3, -2, -1],
+        "STATUS": ["0", "2", "0", "0", "C", "X", "1", "0"],
+    })
+
+
+def test_curvas_vao_ate_o_horizonte():
+    engine = VintageEngine.from_records(_records().query("ID == 1"), as_of=0)
+    curves = engine.curves()
+    assert list(curves.columns) == [0, 1, 2, 3]
+    np.testing.assert_allclose(curves.loc[-3].to_numpy(), [0.0, 1.0, 1.0, 1.0])
+    assert engine.summary()["bad_rate_mob3"].iloc[0] == 1.0
+
+
+def test_curvas_nan_depois_do_horizonte_da_safra():
+    curves = VintageEngine.from_records(_records(), as_of=0).curves()
+    assert curves.columns.max() == 5
+    assert curves.loc[-5].notna().all() and (curves.loc[-5] == 0).all()
+    assert curves.loc[-3, [4, 5]].isna().all()
+
+
+def test_update_igual_recalculo():
+    # MONTHS_BALANCE é relativo ao as_of de cada carga
+    records = _records()
+    month = records["MONTHS_BALANCE"]
+    first = records[month <= -2].assign(MONTHS_BALANCE=month[month <= -2] + 2)
+    delta = records[month == -1].assign(MONTHS_BALANCE=0)
+    engine = VintageEngine.from_records(first, as_of=-2).update(delta, as_of=-1)
+    full = VintageEngine.from_records(records.assign(MONTHS_BALANCE=month + 1), as_of=-1)
+    pd.testing.assert_frame_equal(engine.curves(), full.curves())
+    pd.testing.assert_frame_equal(engine.summary(), full.summary())